@@ -0,0 +1,104 @@
+"""Histórico colunar de seleções e análises de calorias e macros vetorizadas.
+
+Todo o histórico guardado no SQLite é materializado em um arquivo Parquet
+(uma linha por usuário × data × categoria, com colunas dictionary-encoded).
+As agregações por dia, semana e mês são feitas sobre essas colunas com
+pandas/NumPy, usando a matriz de nutrientes do catálogo compilado, sem laços
+em Python sobre os planos.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from catalogo import NUTRIENTES
+
+ESQUEMA_HISTORICO = pa.schema([
+    ("usuario", pa.dictionary(pa.int32(), pa.string())),
+    ("data", pa.date32()),
+    ("categoria", pa.dictionary(pa.int32(), pa.string())),
+    ("refeicao", pa.dictionary(pa.int32(), pa.string())),
+    ("pessoas", pa.int32()),
+])
+
+# Frequências do pandas para cada período de agregação. Com closed/label "left", cada período é
+# rotulado pelo primeiro dia: semanas de segunda a domingo, rotuladas pela segunda-feira (como o
+# planner e a hidratação), e meses pelo dia 1
+PERIODOS = {"dia": "D", "semana": "W-MON", "mes": "MS"}
+
+
+def _lote_para_tabela(linhas):
+    usuarios, datas, categorias, refeicoes, pessoas = zip(*linhas)
+    return pa.table({
+        "usuario": pa.array(usuarios).dictionary_encode(),
+        "data": pc.cast(pa.array(datas), pa.timestamp("s")).cast(pa.date32()),
+        "categoria": pa.array(categorias).dictionary_encode(),
+        "refeicao": pa.array(refeicoes).dictionary_encode(),
+        "pessoas": pa.array(pessoas, pa.int32()),
+    }).cast(ESQUEMA_HISTORICO)
+
+
+def exportar_historico(armazenamento, destino, usuario=None):
+    """Materializa o histórico do backend SQLite em Parquet, lote a lote. Devolve o número de linhas."""
+    tmp = f"{destino}.tmp"
+    total = 0
+    with pq.ParquetWriter(tmp, ESQUEMA_HISTORICO, compression="zstd") as writer:
+        for linhas in armazenamento.iterar_selecoes(usuario):
+            writer.write_table(_lote_para_tabela(linhas))
+            total += len(linhas)
+    os.replace(tmp, destino)
+    return total
+
+
+def carregar_historico(caminho, usuario=None):
+    """Lê o Parquet do histórico como DataFrame (colunas de texto viram category)."""
+    filtros = [("usuario", "=", usuario)] if usuario is not None else None
+    df = pq.read_table(caminho, filters=filtros).to_pandas()
+    df["data"] = pd.to_datetime(df["data"])
+    return df
+
+
+def nutrientes_por_selecao(df, catalogo):
+    """Nutrientes de cada linha do histórico (por pessoa): array (linhas, len(NUTRIENTES)).
+
+    Lookup vetorizado nas categorias: cada refeição distinta é resolvida uma única
+    vez e as linhas indexam a matriz de nutrientes; fora do catálogo vale zero.
+    """
+    refeicoes = df["refeicao"].astype("category")
+    ids = pd.Index(catalogo.receitas).get_indexer(refeicoes.cat.categories)
+    por_categoria = np.where((ids >= 0)[:, None], catalogo.nutrientes[np.maximum(ids, 0)], 0.0)
+    codigos = refeicoes.cat.codes.to_numpy()
+    return np.where((codigos >= 0)[:, None], por_categoria[codigos], 0.0)
+
+
+def rollup_calorias(df, catalogo, periodo="dia"):
+    """Calorias e macros por período ("dia", "semana" ou "mes").
+
+    - kcal: consumo por pessoa somado no período;
+    - kcal_total: kcal × pessoas (o que foi preparado);
+    - proteina, carboidratos, gorduras, fibras: gramas por pessoa somados no período;
+    - dias: dias com registro no período;
+    - kcal_media_diaria: média do consumo por pessoa nos dias com registro.
+    """
+    nutrientes = nutrientes_por_selecao(df, catalogo)
+    kcal = nutrientes[:, 0]
+    base = pd.DataFrame({
+        "data": df["data"].to_numpy(),
+        "kcal": kcal,
+        "kcal_total": kcal * df["pessoas"].to_numpy(),
+        **{nome: nutrientes[:, i] for i, nome in enumerate(NUTRIENTES) if i},
+    })
+    # Slots vazios ("Nenhuma") não contam como dia registrado
+    base = base[kcal > 0]
+    diario = base.groupby("data", sort=True).sum()
+    diario["dias"] = 1
+    if periodo == "dia":
+        diario["kcal_media_diaria"] = diario["kcal"]
+        return diario
+    agrupado = diario.resample(PERIODOS[periodo], closed="left", label="left")
+    resultado = agrupado.sum()
+    resultado["kcal_media_diaria"] = agrupado["kcal"].mean()
+    return resultado.dropna(subset=["kcal_media_diaria"])
@@ -0,0 +1,676 @@
+"""Persistência do plano semanal.
+
+Os backends compartilham a mesma interface (`carregar` / `salvar`):
+
+- ArmazenamentoJSON: modo da versão anterior, uma única semana reescrita por
+  inteiro com `salvar_dados`;
+- ArmazenamentoDiario: o mesmo arquivo JSON como snapshot, mais um diário
+  (journal) append-only com uma linha compacta por slot (dia, categoria)
+  alterado. De tempos em tempos o diário é compactado no snapshot, escrito com
+  rename atômico; na carga o snapshot é lido e o diário é reaplicado por cima.
+  Cada linha tem o formato "<crc32> TAB <json>"; uma linha incompleta ou com
+  CRC inválido encerra a leitura e é descartada, então uma queda no meio da
+  escrita perde no máximo o último registro;
+- ArmazenamentoSQLite: histórico completo em SQLite, com chave (usuário, data
+  ISO, categoria). Carregar uma semana ou um dia é uma leitura por intervalo
+  no índice da chave primária;
+- ArmazenamentoPorUsuario: um arquivo (shard) por usuário. Salvar é um
+  ler-mesclar-gravar sob trava de arquivo (entre processos) que aplica só os
+  slots alterados sobre a versão em disco, então duas sessões salvando ao
+  mesmo tempo não perdem as alterações uma da outra. As leituras passam por um
+  cache do processo, invalidado na escrita ou quando o arquivo muda em disco.
+
+GravadorAutomatico envolve qualquer backend para o salvamento automático: as
+alterações são enfileiradas e gravadas por uma thread em segundo plano.
+"""
+import atexit
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+USUARIO_PADRAO = "padrao"
+
+
+def carregar_dados(filepath):
+    if os.path.exists(filepath):
+        try:
+            with open(filepath, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            return {}
+    return {}
+
+
+def salvar_dados(data, filepath):
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+
+def escrever_atomico(filepath, data):
+    """Escreve o JSON em um arquivo temporário, faz fsync e troca pelo definitivo com rename atômico."""
+    _substituir_atomico(filepath, lambda f: json.dump(data, f, ensure_ascii=False, indent=4), "w", ".json")
+
+
+def escrever_bytes_atomico(filepath, conteudo):
+    """A mesma troca atômica para um conteúdo binário já pronto (ex.: CSV ou PDF)."""
+    _substituir_atomico(filepath, lambda f: f.write(conteudo), "wb", "")
+
+
+def _substituir_atomico(filepath, escrever, modo, sufixo):
+    pasta = os.path.dirname(filepath) or "."
+    fd, tmp = tempfile.mkstemp(dir=pasta, prefix=".tmp_", suffix=sufixo)
+    try:
+        with os.fdopen(fd, modo, encoding=None if "b" in modo else "utf-8") as f:
+            escrever(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, filepath)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _fsync_pasta(pasta)
+
+
+def _fsync_pasta(pasta):
+    # Garante que o rename chegou ao disco (não suportado em todas as plataformas).
+    try:
+        fd = os.open(pasta, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def ler_snapshot(filepath):
+    """Lê o snapshot JSON; um arquivo corrompido é preservado ao lado em vez de ser descartado."""
+    if not os.path.exists(filepath):
+        return {}
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        destino = f"{filepath}.corrompido-{int(time.time())}"
+        os.replace(filepath, destino)
+        logger.warning("Snapshot corrompido movido para %s; carregando apenas o diário.", destino)
+        return {}
+
+
+def _codificar_registro(dia, categoria, valor):
+    corpo = json.dumps([dia, categoria, valor], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return b"%08x\t%s\n" % (zlib.crc32(corpo), corpo)
+
+
+def _aplicar_registro(estado, dia, categoria, valor):
+    if valor is None:
+        estado.get(dia, {}).pop(categoria, None)
+    else:
+        estado.setdefault(dia, {})[categoria] = valor
+
+
+class DiarioPlanner:
+    """Plano semanal persistido como snapshot JSON + diário append-only.
+
+    O custo de salvar depende só do número de slots alterados. As escritas vão
+    para o sistema operacional a cada registro; o fsync é feito em lotes (a cada
+    `lote_fsync` registros ou `intervalo_fsync` segundos) e sempre em `sincronizar()`.
+    """
+
+    def __init__(self, snapshot_path, lote_fsync=32, intervalo_fsync=1.0, limite_compactacao=1000):
+        self.snapshot_path = snapshot_path
+        self.journal_path = f"{snapshot_path}.journal"
+        self.lote_fsync = lote_fsync
+        self.intervalo_fsync = intervalo_fsync
+        self.limite_compactacao = limite_compactacao
+        self._lock = threading.RLock()
+        self._estado = None
+        self._arquivo = None
+        self._registros = 0
+        self._sem_fsync = 0
+        self._ultimo_fsync = time.monotonic()
+
+    # --- CARGA ---
+    def _replay(self, estado):
+        """Reaplica o diário sobre o snapshot e corta qualquer cauda inválida."""
+        if not os.path.exists(self.journal_path):
+            return 0
+        aplicados = 0
+        valido_ate = 0
+        with open(self.journal_path, "rb") as f:
+            for linha in f:
+                if not linha.endswith(b"\n"):
+                    break
+                crc, _, corpo = linha[:-1].partition(b"\t")
+                try:
+                    if int(crc, 16) != zlib.crc32(corpo):
+                        break
+                    dia, categoria, valor = json.loads(corpo)
+                except ValueError:
+                    break
+                _aplicar_registro(estado, dia, categoria, valor)
+                aplicados += 1
+                valido_ate += len(linha)
+        if valido_ate < os.path.getsize(self.journal_path):
+            logger.warning("Diário %s com registro incompleto no fim; descartando a cauda.", self.journal_path)
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(valido_ate)
+        return aplicados
+
+    def carregar(self):
+        """Devolve uma cópia do plano (snapshot + diário)."""
+        with self._lock:
+            if self._estado is None:
+                estado = ler_snapshot(self.snapshot_path)
+                self._registros = self._replay(estado)
+                self._estado = estado
+            return copy.deepcopy(self._estado)
+
+    # --- ESCRITA ---
+    def registrar(self, dia, categoria, valor):
+        """Acrescenta ao diário a nova seleção de um slot (None remove o slot)."""
+        self.registrar_varios([(dia, categoria, valor)])
+
+    def registrar_varios(self, alteracoes):
+        with self._lock:
+            if self._estado is None:
+                self.carregar()
+            if self._arquivo is None:
+                self._arquivo = open(self.journal_path, "ab")
+            for dia, categoria, valor in alteracoes:
+                valor = copy.deepcopy(valor)
+                self._arquivo.write(_codificar_registro(dia, categoria, valor))
+                _aplicar_registro(self._estado, dia, categoria, valor)
+                self._registros += 1
+                self._sem_fsync += 1
+            self._arquivo.flush()
+            if self._sem_fsync >= self.lote_fsync or time.monotonic() - self._ultimo_fsync >= self.intervalo_fsync:
+                self._fsync()
+            if self._registros >= self.limite_compactacao:
+                self.compactar()
+
+    def _fsync(self):
+        if self._arquivo is not None and self._sem_fsync:
+            os.fsync(self._arquivo.fileno())
+        self._sem_fsync = 0
+        self._ultimo_fsync = time.monotonic()
+
+    def sincronizar(self):
+        """Força o fsync dos registros pendentes (ex.: ao clicar em salvar)."""
+        with self._lock:
+            self._fsync()
+
+    def compactar(self):
+        """Grava o estado atual como snapshot (rename atômico) e zera o diário.
+
+        Se o processo cair entre as duas etapas, o diário antigo é apenas
+        reaplicado sobre o snapshot novo, o que não altera o resultado.
+        """
+        with self._lock:
+            if self._estado is None:
+                return
+            self._fsync()
+            escrever_atomico(self.snapshot_path, self._estado)
+            if self._arquivo is not None:
+                self._arquivo.close()
+                self._arquivo = None
+            with open(self.journal_path, "wb") as f:
+                os.fsync(f.fileno())
+            self._registros = 0
+
+    def fechar(self):
+        with self._lock:
+            self._fsync()
+            if self._arquivo is not None:
+                self._arquivo.close()
+                self._arquivo = None
+
+
+# --- BACKENDS ---
+class ArmazenamentoJSON:
+    """Uma única semana (chaveada pelo nome do dia), arquivo reescrito a cada salvamento.
+
+    Um plano só para todos: o `usuario` recebido é ignorado.
+    """
+
+    por_data = False
+    por_usuario = False
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+
+    def carregar(self, inicio_semana=None, usuario=USUARIO_PADRAO):
+        return carregar_dados(self.filepath)
+
+    def salvar(self, plano, slots_alterados, inicio_semana=None, usuario=USUARIO_PADRAO):
+        salvar_dados(plano, self.filepath)
+
+
+class ArmazenamentoDiario:
+    """Uma única semana em snapshot JSON + diário append-only (ver DiarioPlanner).
+
+    Um plano só para todos: o `usuario` recebido é ignorado.
+    """
+
+    por_data = False
+    por_usuario = False
+
+    def __init__(self, filepath):
+        self.diario = DiarioPlanner(filepath)
+
+    def carregar(self, inicio_semana=None, usuario=USUARIO_PADRAO):
+        return self.diario.carregar()
+
+    def salvar(self, plano, slots_alterados, inicio_semana=None, usuario=USUARIO_PADRAO):
+        # Só os slots alterados vão para o diário: o custo depende da edição, não do plano
+        # O fsync fica com o lote do diário; um salvamento explícito chama `sincronizar`
+        self.diario.registrar_varios(
+            (dia, categoria, plano[dia][categoria]) for dia, categoria in sorted(slots_alterados)
+        )
+
+    def sincronizar(self):
+        self.diario.sincronizar()
+
+
+def inicio_da_semana(dia):
+    """Segunda-feira da semana que contém `dia`."""
+    return dia - timedelta(days=dia.weekday())
+
+
+class ArmazenamentoSQLite:
+    """Histórico de planos em SQLite, uma linha por (usuário, data ISO, categoria).
+
+    A interface continua usando o plano semanal chaveado pelo nome do dia
+    (`dias`, na ordem de segunda a domingo); a conversão para datas reais é
+    feita a partir da segunda-feira da semana.
+    """
+
+    por_data = True
+    por_usuario = True
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS selecoes (
+            usuario   TEXT    NOT NULL,
+            data      TEXT    NOT NULL,  -- ISO 8601 (AAAA-MM-DD)
+            categoria TEXT    NOT NULL,
+            refeicao  TEXT    NOT NULL,
+            pessoas   INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (usuario, data, categoria)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_selecoes_data ON selecoes (data);
+    """
+
+    def __init__(self, db_path, dias):
+        self.db_path = db_path
+        self.dias = list(dias)
+        self._lock = threading.Lock()
+        # Uma conexão por processo, protegida por lock (as sessões do Streamlit rodam em threads).
+        self._conexao = sqlite3.connect(db_path, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        self._conexao.executescript(self.ESQUEMA)
+
+    def carregar_periodo(self, inicio, fim, usuario=USUARIO_PADRAO):
+        """Seleções de `inicio` a `fim` (inclusive) como {data ISO: {categoria: {meal, people}}}."""
+        with self._lock:
+            linhas = self._conexao.execute(
+                "SELECT data, categoria, refeicao, pessoas FROM selecoes"
+                " WHERE usuario = ? AND data BETWEEN ? AND ? ORDER BY data",
+                (usuario, inicio.isoformat(), fim.isoformat()),
+            ).fetchall()
+        periodo = {}
+        for data_iso, categoria, refeicao, pessoas in linhas:
+            periodo.setdefault(data_iso, {})[categoria] = {"meal": refeicao, "people": pessoas}
+        return periodo
+
+    def iterar_selecoes(self, usuario=None, lote=50_000):
+        """Percorre todo o histórico em lotes de tuplas (usuario, data, categoria, refeicao, pessoas)."""
+        consulta = "SELECT usuario, data, categoria, refeicao, pessoas FROM selecoes"
+        parametros = ()
+        if usuario is not None:
+            consulta += " WHERE usuario = ?"
+            parametros = (usuario,)
+        # Conexão própria (somente leitura) para não segurar o lock durante uma exportação longa.
+        conexao = sqlite3.connect(f"{Path(self.db_path).resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            cursor = conexao.execute(consulta + " ORDER BY usuario, data", parametros)
+            while linhas := cursor.fetchmany(lote):
+                yield linhas
+        finally:
+            conexao.close()
+
+    def carregar(self, inicio_semana=None, usuario=USUARIO_PADRAO):
+        inicio = inicio_da_semana(inicio_semana or date.today())
+        periodo = self.carregar_periodo(inicio, inicio + timedelta(days=len(self.dias) - 1), usuario)
+        return {
+            dia: periodo[(inicio + timedelta(days=i)).isoformat()]
+            for i, dia in enumerate(self.dias)
+            if (inicio + timedelta(days=i)).isoformat() in periodo
+        }
+
+    def salvar(self, plano, slots_alterados, inicio_semana=None, usuario=USUARIO_PADRAO):
+        inicio = inicio_da_semana(inicio_semana or date.today())
+        datas = {dia: (inicio + timedelta(days=i)).isoformat() for i, dia in enumerate(self.dias)}
+        linhas = [
+            (usuario, datas[dia], categoria, plano[dia][categoria]["meal"], plano[dia][categoria].get("people", 1))
+            for dia, categoria in sorted(slots_alterados)
+        ]
+        with self._lock, self._conexao:
+            self._conexao.executemany(
+                "INSERT INTO selecoes (usuario, data, categoria, refeicao, pessoas) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (usuario, data, categoria)"
+                " DO UPDATE SET refeicao = excluded.refeicao, pessoas = excluded.pessoas",
+                linhas,
+            )
+
+    def fechar(self):
+        with self._lock:
+            self._conexao.close()
+
+
+class TravaArquivo:
+    """Trava exclusiva consultiva (advisory) em um arquivo `.lock`, válida entre processos e threads."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        # flock/locking valem por descritor; a trava de thread serializa as sessões do mesmo processo.
+        self._lock = threading.Lock()
+        self._fd = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            self._fd = os.open(self.caminho, os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue  # LK_LOCK desiste após ~10 s; continua esperando
+        except BaseException:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            self._lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            self._lock.release()
+        return False
+
+
+def nome_shard(usuario):
+    """Nome de arquivo seguro para o usuário ("Ana Lú" -> "ana_l_-<hash>")."""
+    base = re.sub(r"[^a-z0-9_-]", "_", usuario.strip().lower()) or "_"
+    if base != usuario:
+        # Nomes diferentes podem virar o mesmo texto seguro; o hash os mantém separados.
+        base += "-" + hashlib.sha1(usuario.encode("utf-8")).hexdigest()[:8]
+    return base
+
+
+class ArmazenamentoPorUsuario:
+    """Uma semana por usuário, cada uma no próprio arquivo JSON ({"versao": n, "plano": {...}}).
+
+    Um único objeto atende todas as sessões do processo: ele guarda o último
+    plano lido de cada usuário junto com a assinatura (mtime, tamanho) do
+    arquivo, e só volta ao disco quando o arquivo mudou.
+    """
+
+    por_data = False
+    por_usuario = True
+
+    def __init__(self, pasta, arquivo_legado=None):
+        self.pasta = pasta
+        # O antigo arquivo único vira o plano inicial do usuário padrão
+        self.arquivo_legado = arquivo_legado
+        os.makedirs(pasta, exist_ok=True)
+        self._lock = threading.Lock()
+        self._travas = {}
+        self._cache = {}
+
+    def _caminho(self, usuario):
+        return os.path.join(self.pasta, f"{nome_shard(usuario)}.json")
+
+    def _trava(self, usuario):
+        with self._lock:
+            trava = self._travas.get(usuario)
+            if trava is None:
+                trava = self._travas[usuario] = TravaArquivo(self._caminho(usuario) + ".lock")
+            return trava
+
+    @staticmethod
+    def _assinatura(caminho):
+        try:
+            stat = os.stat(caminho)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _ler(self, usuario):
+        """(versão, plano) do usuário, vindo do cache enquanto o arquivo não mudar. Não alterar o plano."""
+        caminho = self._caminho(usuario)
+        assinatura = self._assinatura(caminho)
+        em_cache = self._cache.get(usuario)
+        if em_cache is not None and em_cache[0] == assinatura:
+            return em_cache[1], em_cache[2]
+
+        if assinatura is not None:
+            dados = ler_snapshot(caminho)
+            versao, plano = dados.get("versao", 0), dados.get("plano", {})
+        elif usuario == USUARIO_PADRAO and self.arquivo_legado:
+            versao, plano = 0, carregar_dados(self.arquivo_legado)
+        else:
+            versao, plano = 0, {}
+        self._cache[usuario] = (assinatura, versao, plano)
+        return versao, plano
+
+    def carregar(self, inicio_semana=None, usuario=USUARIO_PADRAO):
+        versao, plano = self._ler(usuario)
+        return copy.deepcopy(plano)
+
+    def salvar(self, plano, slots_alterados, inicio_semana=None, usuario=USUARIO_PADRAO):
+        """Aplica os slots alterados sobre a versão em disco e grava; devolve a nova versão."""
+        caminho = self._caminho(usuario)
+        with self._trava(usuario):
+            # Relê sob a trava: o que outra sessão (ou processo) salvou antes continua lá.
+            versao, atual = self._ler(usuario)
+            novo = copy.deepcopy(atual)
+            for dia, categoria in slots_alterados:
+                novo.setdefault(dia, {})[categoria] = copy.deepcopy(plano[dia][categoria])
+            escrever_atomico(caminho, {"versao": versao + 1, "plano": novo})
+            self._cache[usuario] = (self._assinatura(caminho), versao + 1, novo)
+        return versao + 1
+
+
+class GravadorAutomatico:
+    """Salvamento automático em segundo plano (write-behind) com debounce.
+
+    `agendar` só copia a alteração para a fila e retorna: quem grava é uma
+    thread própria. Alterações do mesmo plano (usuário, semana) dentro da
+    janela de `debounce` segundos viram uma única gravação com a união dos
+    slots; uma sequência contínua de edições é gravada no máximo a cada
+    `espera_maxima` segundos. A fila é descarregada no fim do processo, e
+    `antecipar` adianta as gravações pendentes (ex.: quando a sessão termina).
+
+    Uma gravação que falha é tentada de novo com espera exponencial (`debounce`,
+    2 × `debounce`, 4 × ...). Depois de `max_tentativas` falhas seguidas, a thread
+    desiste daquele plano: ele fica parado, com o erro em `falha`, até o próximo
+    salvamento explícito (`descarregar`) ou uma nova alteração.
+    """
+
+    def __init__(self, armazenamento, debounce=2.0, espera_maxima=10.0, max_tentativas=5):
+        self.armazenamento = armazenamento
+        self.debounce = debounce
+        self.espera_maxima = espera_maxima
+        self.max_tentativas = max_tentativas
+        self._cond = threading.Condition()
+        # A gravação (retirar da fila + salvar) é serializada: um plano mais novo nunca é
+        # gravado antes de um mais antigo do mesmo usuário/semana.
+        self._escrita = threading.Lock()
+        self._pendentes = {}
+        self._parados = {}  # tentativas esgotadas: só voltam à fila com um novo salvamento
+        self._fechado = False
+        self._thread = threading.Thread(target=self._executar, name="planner-autosave", daemon=True)
+        self._thread.start()
+        atexit.register(self.fechar)
+
+    def agendar(self, plano, slots_alterados, inicio_semana=None, usuario=USUARIO_PADRAO):
+        """Enfileira os slots alterados; `plano` deve ser uma cópia que o chamador não altera mais."""
+        if not slots_alterados:
+            return
+        agora = time.monotonic()
+        with self._cond:
+            item = self._pendentes.get((usuario, inicio_semana))
+            if item is None:
+                # Uma alteração nova leva junto os slots de uma gravação que tinha desistido
+                parado = self._parados.pop((usuario, inicio_semana), None)
+                item = self._pendentes[(usuario, inicio_semana)] = {
+                    "slots": parado["slots"] if parado else set(), "limite": agora + self.espera_maxima, "tentativas": 0,
+                }
+            item["plano"] = plano
+            item["slots"] |= set(slots_alterados)
+            item["prazo"] = min(agora + self.debounce, item["limite"])
+            self._cond.notify()
+
+    def antecipar(self):
+        """Marca tudo o que está na fila para gravação imediata, sem esperar a gravação."""
+        with self._cond:
+            for item in self._pendentes.values():
+                item["prazo"] = 0.0
+            self._cond.notify()
+
+    def falha(self, usuario=USUARIO_PADRAO, inicio_semana=None):
+        """Erro da última tentativa se a thread desistiu de gravar este plano; None caso contrário."""
+        with self._cond:
+            item = self._parados.get((usuario, inicio_semana))
+            return item["erro"] if item else None
+
+    def descarregar(self, usuario=None, inicio_semana=None):
+        """Grava agora (na thread de quem chamou) o que está na fila; sem filtro, grava tudo.
+
+        É o caminho do salvamento explícito (botão salvar, fim do processo): inclui os
+        planos parados e recomeça a contagem de tentativas. Depois de gravar, os backends
+        que adiam o fsync (`sincronizar`, ex.: o diário) são sincronizados. Devolve as
+        exceções das gravações que falharam (vazio = tudo gravado); o que falhou volta
+        para a fila e é tentado de novo pela thread.
+        """
+        with self._escrita:
+            with self._cond:
+                lote = []
+                for fila in (self._pendentes, self._parados):
+                    chaves = [chave for chave in fila if usuario is None or chave == (usuario, inicio_semana)]
+                    lote += [(chave, fila.pop(chave)) for chave in chaves]
+                for _, item in lote:
+                    item["tentativas"] = 0
+                    item.pop("erro", None)
+            falhas = self._gravar(lote)
+            sincronizar = getattr(self.armazenamento, "sincronizar", None)
+            if sincronizar is not None:
+                try:
+                    sincronizar()
+                except OSError as erro:
+                    logger.exception("Falha ao sincronizar o armazenamento com o disco.")
+                    falhas.append(erro)
+            return falhas
+
+    def fechar(self):
+        with self._cond:
+            self._fechado = True
+            self._cond.notify()
+        self.descarregar()
+
+    def _executar(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._fechado:
+                        return
+                    agora = time.monotonic()
+                    if any(item["prazo"] <= agora for item in self._pendentes.values()):
+                        break
+                    espera = min((item["prazo"] for item in self._pendentes.values()), default=None)
+                    self._cond.wait(None if espera is None else espera - agora)
+            with self._escrita:
+                with self._cond:
+                    agora = time.monotonic()
+                    chaves = [chave for chave, item in self._pendentes.items() if item["prazo"] <= agora]
+                    lote = [(chave, self._pendentes.pop(chave)) for chave in chaves]
+                self._gravar(lote)
+
+    def _gravar(self, lote):
+        falhas = []
+        for (usuario, inicio_semana), item in lote:
+            try:
+                self.armazenamento.salvar(item["plano"], item["slots"], inicio_semana, usuario)
+            except Exception as erro:
+                falhas.append(erro)
+                item["tentativas"] += 1
+                with self._cond:
+                    novo = self._pendentes.get((usuario, inicio_semana))
+                    if novo is not None:
+                        # Volta para a fila sem passar por cima de alterações mais novas
+                        novo["slots"] |= item["slots"]
+                    elif item["tentativas"] >= self.max_tentativas:
+                        item["erro"] = erro
+                        self._parados[(usuario, inicio_semana)] = item
+                    else:
+                        espera = self.debounce * 2 ** (item["tentativas"] - 1)
+                        item["prazo"] = item["limite"] = time.monotonic() + espera
+                        self._pendentes[(usuario, inicio_semana)] = item
+                # O traceback completo só na primeira falha; as novas tentativas ficam em uma linha
+                if item["tentativas"] == 1:
+                    logger.exception("Falha no salvamento automático de %s.", usuario)
+                if "erro" in item:
+                    logger.error("Salvamento automático de %s interrompido após %d tentativas: %s",
+                                 usuario, item["tentativas"], erro)
+                elif novo is None:
+                    logger.warning("Salvamento automático de %s: tentativa %d de %d falhou (%s); próxima em %.0f s.",
+                                   usuario, item["tentativas"], self.max_tentativas, erro, espera)
+        return falhas
+
+
+def criar_armazenamento(modo, planner_file, db_file, dias, pasta_usuarios=None):
+    """Cria o backend de persistência do plano ("json", "diario", "sqlite" ou "usuarios")."""
+    if modo == "usuarios":
+        return ArmazenamentoPorUsuario(pasta_usuarios, arquivo_legado=planner_file)
+    if modo == "json":
+        return ArmazenamentoJSON(planner_file)
+    if modo == "diario":
+        return ArmazenamentoDiario(planner_file)
+    if modo == "sqlite":
+        return ArmazenamentoSQLite(db_file, dias)
+    raise ValueError(f"Modo de armazenamento desconhecido: {modo!r}")
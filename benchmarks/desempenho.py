@@ -0,0 +1,360 @@
+"""Benchmarks do planner com catálogos e históricos sintéticos.
+
+Mede os caminhos de que o app depende:
+
+- carga do catálogo (compilação, cache frio e cache quente) e a mesclagem com
+  os pratos customizados feita na inicialização da sessão;
+- agregação da lista de compras (uma semana, histórico inteiro e lista incremental);
+- totais de nutrientes por dia do histórico inteiro (seleções × matriz de nutrientes);
+- leitura da série de hidratação e rollups (médias semanais e sequências);
+- generate_pdf_list;
+- busca aproximada de texto livre (índice de trigramas) no catálogo;
+- salvar_dados / carregar_dados com históricos de 1 a 1000 semanas;
+- uma execução completa do versao4.py pelo AppTest do Streamlit (carga e rerun),
+  em um processo à parte e sobre uma cópia temporária do app.
+
+Uso (a partir da raiz do repositório):
+
+    python benchmarks/desempenho.py                    # perfil "rapido", compara com a baseline
+    python benchmarks/desempenho.py --perfil completo  # até 100k receitas e 1000 semanas
+    python benchmarks/desempenho.py --salvar-baseline  # grava os resultados como nova baseline
+
+A baseline (benchmarks/baseline.json) guarda a mediana de cada medida e os
+limites de regressão: uma medida mais lenta que `mediana_baseline × limite`
+(e pelo menos MARGEM_MS mais lenta) é reportada como regressão e o script
+termina com código 1.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from armazenamento import carregar_dados, salvar_dados  # noqa: E402
+from busca import BuscaAproximada  # noqa: E402
+from catalogo import CardapioEmCamadas, IndiceOpcoes, ListaComprasIncremental, RegrasExclusao, abrir_catalogo, compilar_catalogo  # noqa: E402
+from compartilhado import DIAS_SEMANA, SHOPPING_LIST_EXCLUSIONS  # noqa: E402
+from exportacao import generate_pdf_list  # noqa: E402
+from hidratacao import ArmazenamentoHidratacao, medias_semanais, sequencias  # noqa: E402
+
+BASELINE_FILE = os.path.join(RAIZ, "benchmarks", "baseline.json")
+
+CATEGORIAS = ["Café da manhã 🍳", "Lanche da manhã 🍎", "Almoço 🍲", "Lanche da tarde 🥪", "Jantar 🥗", "Doce ou extra 🍬"]
+UNIDADES = ["g", "g (1 colher)", "unidade", "unidades", "fatias (50g)", "fatia", "porção", "ml", "xícara", "pitada"]
+
+PERFIS = {
+    "rapido": {"receitas": [100, 1_000, 10_000], "semanas": [1, 52], "repeticoes": 5},
+    "completo": {"receitas": [100, 1_000, 10_000, 100_000], "semanas": [1, 52, 1000], "repeticoes": 5},
+}
+# Limite de regressão padrão (mediana atual / mediana da baseline) e exceções por medida
+LIMITE_PADRAO = 1.5
+LIMITES = {
+    # Medidas muito curtas ou dominadas por E/S variam mais entre execuções
+    "app.rerun": 2.0,
+    "dados.salvar": 2.0,
+    "dados.carregar": 2.0,
+}
+# Diferenças absolutas abaixo disto são ruído de medição, não regressão
+MARGEM_MS = 1.0
+
+
+# --- DADOS SINTÉTICOS ---
+def gerar_catalogo(n_receitas, semente=0):
+    """Catálogo no formato de receitas.json, com ~5 ingredientes por receita."""
+    rng = np.random.default_rng(semente)
+    n_ingredientes = max(50, n_receitas // 4)
+    nomes_ingredientes = [f"Ingrediente {i}" for i in range(n_ingredientes)]
+    refeicoes = {}
+    for r in range(n_receitas):
+        ingredientes = []
+        for i in rng.choice(n_ingredientes, size=int(rng.integers(2, 9)), replace=False):
+            unidade = UNIDADES[int(i) % len(UNIDADES)]
+            ingredientes.append({"name": nomes_ingredientes[i], "quantity": int(rng.integers(1, 200)), "unit": unidade})
+        refeicoes[f"Receita {r}"] = {"calories": int(rng.integers(40, 700)), "ingredients": ingredientes}
+    nomes = list(refeicoes)
+    categorias = {categoria: nomes[i::len(CATEGORIAS)] for i, categoria in enumerate(CATEGORIAS)}
+    return refeicoes, categorias
+
+
+def gerar_historico(n_semanas, categorias, semente=0):
+    """{início da semana ISO: plano semanal} com todas as 42 escolhas preenchidas."""
+    rng = np.random.default_rng(semente)
+    inicio = date(2024, 1, 1)
+    historico = {}
+    for s in range(n_semanas):
+        plano = {}
+        for dia in DIAS_SEMANA:
+            plano[dia] = {}
+            for categoria, pratos in categorias.items():
+                plano[dia][categoria] = {"meal": pratos[int(rng.integers(len(pratos)))], "people": int(rng.integers(1, 4))}
+        historico[(inicio + timedelta(weeks=s)).isoformat()] = plano
+    return historico
+
+
+def gerar_customizadas(categorias, n=20):
+    return {categoria: [f"Prato customizado {categoria} {i}" for i in range(n)] for categoria in categorias}
+
+
+# --- MEDIÇÃO ---
+def medir(funcao, repeticoes, preparar=None):
+    """Executa `funcao` `repeticoes` vezes e devolve mediana e mínimo em ms.
+
+    `preparar` (opcional) roda antes de cada repetição, fora do tempo medido.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return resumir(tempos)
+
+
+def resumir(tempos):
+    """Mediana e mínimo (ms) de uma lista de tempos já medidos."""
+    return {"mediana_ms": round(statistics.median(tempos), 3), "min_ms": round(min(tempos), 3), "repeticoes": len(tempos)}
+
+
+def mesclar_customizadas(catalogo, customizadas):
+    """Mesma mesclagem feita quando o versao4.py monta as opções (cache vazio): camadas + IndiceOpcoes."""
+    cardapio = CardapioEmCamadas.base(catalogo.categorias).com_pratos(customizadas)
+    return IndiceOpcoes(cardapio, catalogo)
+
+
+def bench_catalogo(n_receitas, repeticoes, pasta, resultados):
+    refeicoes, categorias = gerar_catalogo(n_receitas)
+    regras = RegrasExclusao(substrings=SHOPPING_LIST_EXCLUSIONS)
+    sufixo = f"[{n_receitas}]"
+
+    resultados[f"catalogo.compilar{sufixo}"] = medir(lambda: compilar_catalogo(refeicoes, regras, categorias), repeticoes)
+
+    caminho = os.path.join(pasta, f"receitas_{n_receitas}.json")
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump({"refeicoes": refeicoes, "categorias": categorias}, f, ensure_ascii=False)
+    cache = os.path.join(pasta, ".cache")
+
+    def limpar_cache():
+        for nome in os.listdir(cache) if os.path.isdir(cache) else ():
+            os.remove(os.path.join(cache, nome))
+
+    resultados[f"catalogo.abrir_frio{sufixo}"] = medir(lambda: abrir_catalogo(caminho, regras), repeticoes, limpar_cache)
+    catalogo = abrir_catalogo(caminho, regras)
+    resultados[f"catalogo.abrir_cache{sufixo}"] = medir(lambda: abrir_catalogo(caminho, regras), repeticoes)
+
+    customizadas = gerar_customizadas(categorias)
+    resultados[f"catalogo.mesclar{sufixo}"] = medir(lambda: mesclar_customizadas(catalogo, customizadas), repeticoes)
+    # Só a camada de um usuário com milhares de pratos (o resto vem do cache compartilhado)
+    base = CardapioEmCamadas.base(catalogo.categorias)
+    muitas = gerar_customizadas(categorias, n=5_000)
+    resultados[f"catalogo.camada_usuario{sufixo}"] = medir(lambda: base.com_pratos(muitas), repeticoes)
+
+    plano = next(iter(gerar_historico(1, categorias).values()))
+    resultados[f"lista.semana{sufixo}"] = medir(
+        lambda: catalogo.lista_compras(catalogo.vetor_selecoes(plano, DIAS_SEMANA, CATEGORIAS)), repeticoes
+    )
+    resultados[f"lista.incremental{sufixo}"] = medir(
+        lambda: ListaComprasIncremental(catalogo).carregar(plano, DIAS_SEMANA, CATEGORIAS).lista_compras(), repeticoes
+    )
+
+    lista = catalogo.lista_compras(catalogo.vetor_selecoes(plano, DIAS_SEMANA, CATEGORIAS))
+    resultados[f"pdf.generate_pdf_list{sufixo}"] = medir(lambda: generate_pdf_list(lista, "01/01/2024"), repeticoes)
+
+    # Uma consulta com erro de digitação a partir de um nome do catálogo (o índice é montado uma vez)
+    busca = BuscaAproximada.do_catalogo(catalogo)
+    consulta = catalogo.receitas[n_receitas // 2][:-1] + "x"
+    resultados[f"busca.aproximada{sufixo}"] = medir(lambda: busca.buscar(consulta), repeticoes)
+
+
+def bench_historico(n_semanas, repeticoes, pasta, resultados):
+    # Catálogo fixo para isolar o efeito do tamanho do histórico
+    refeicoes, categorias = gerar_catalogo(1_000)
+    catalogo = compilar_catalogo(refeicoes, RegrasExclusao(substrings=SHOPPING_LIST_EXCLUSIONS), categorias)
+    historico = gerar_historico(n_semanas, categorias)
+    sufixo = f"[{n_semanas} semanas]"
+
+    planos = list(historico.values())
+    resultados[f"lista.historico{sufixo}"] = medir(
+        lambda: catalogo.lista_compras(catalogo.vetor_selecoes(planos, DIAS_SEMANA, CATEGORIAS)), repeticoes
+    )
+
+    resultados[f"nutrientes.historico{sufixo}"] = medir(
+        lambda: catalogo.nutrientes_por_dia(planos, DIAS_SEMANA, CATEGORIAS), repeticoes
+    )
+
+    # Série de hidratação com um registro por dia do histórico
+    hidratacao = ArmazenamentoHidratacao(os.path.join(pasta, f"hidratacao_{n_semanas}"))
+    inicio = date(2020, 1, 6)
+    for i, mascara in enumerate(np.random.default_rng(0).integers(0, 256, n_semanas * 7).tolist()):
+        hidratacao.registrar(inicio + timedelta(days=i), mascara)
+    fim = inicio + timedelta(days=n_semanas * 7 - 1)
+
+    def rollups_hidratacao():
+        origem, mascaras = hidratacao.serie()
+        return medias_semanais(origem, mascaras, fim), sequencias(origem, mascaras, fim)
+
+    resultados[f"hidratacao.rollups{sufixo}"] = medir(rollups_hidratacao, repeticoes)
+
+    caminho = os.path.join(pasta, f"historico_{n_semanas}.json")
+    resultados[f"dados.salvar{sufixo}"] = medir(lambda: salvar_dados(historico, caminho), repeticoes)
+    resultados[f"dados.carregar{sufixo}"] = medir(lambda: carregar_dados(caminho), repeticoes)
+
+
+def copiar_app(destino):
+    """Copia o que o versao4.py lê (módulos, catálogo, plano, fonte e imagens) para `destino`."""
+    for nome in os.listdir(RAIZ):
+        if nome.endswith(".py"):
+            shutil.copy2(os.path.join(RAIZ, nome), destino)
+    for pasta in ("fonte", "assets"):
+        shutil.copytree(os.path.join(RAIZ, pasta), os.path.join(destino, pasta))
+    # Só os arquivos de "banco de dados": caches, planos e históricos locais ficam de fora
+    dados = os.path.join(RAIZ, "banco de dados")
+    os.makedirs(os.path.join(destino, "banco de dados"))
+    for nome in os.listdir(dados):
+        if os.path.isfile(os.path.join(dados, nome)) and nome.endswith(".json"):
+            shutil.copy2(os.path.join(dados, nome), os.path.join(destino, "banco de dados"))
+
+
+def bench_app(repeticoes, resultados):
+    """Execução completa do versao4.py (catálogo real do repositório) pelo AppTest.
+
+    Roda em um processo à parte sobre uma cópia temporária do app: os caches,
+    diários e pastas que o versao4.py cria não tocam a árvore de trabalho.
+    """
+    # Backend "json" só lê o arquivo do plano (como no uso padrão do app)
+    ambiente = {**os.environ, "PLANNER_ARMAZENAMENTO": "json"}
+    with tempfile.TemporaryDirectory(prefix="planner_bench_app_") as pasta:
+        copiar_app(pasta)
+        ambiente["PYTHONPATH"] = pasta
+        codigo = _EXECUCOES_APP.format(app=os.path.join(pasta, "versao4.py"), repeticoes=repeticoes)
+        processo = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, cwd=pasta,
+                                  env=ambiente)
+    if processo.returncode:
+        raise RuntimeError(f"versao4.py falhou no AppTest:\n{processo.stderr.strip()}")
+    tempos = json.loads(processo.stdout.strip().splitlines()[-1])
+    resultados["app.primeira_execucao"] = resumir(tempos["primeira_execucao"])
+    resultados["app.rerun"] = resumir(tempos["rerun"])
+
+
+# Executado no processo à parte: imprime uma linha JSON com os tempos (ms) de cada repetição
+_EXECUCOES_APP = """
+import json, time
+from streamlit.testing.v1 import AppTest
+
+def tempos(funcao):
+    medidos = []
+    for _ in range({repeticoes}):
+        inicio = time.perf_counter()
+        funcao()
+        medidos.append((time.perf_counter() - inicio) * 1000)
+    return medidos
+
+primeira_execucao = tempos(lambda: AppTest.from_file({app!r}, default_timeout=120).run())
+app = AppTest.from_file({app!r}, default_timeout=120)
+app.run()
+if app.exception:
+    raise SystemExit(f"versao4.py falhou no AppTest: {{app.exception}}")
+print(json.dumps({{"primeira_execucao": primeira_execucao, "rerun": tempos(app.run)}}))
+"""
+
+
+# --- BASELINE ---
+def limite_de(nome):
+    return LIMITES.get(nome.split("[")[0], LIMITE_PADRAO)
+
+
+def comparar(resultados, baseline):
+    """Lista de (nome, razão, limite) das medidas que passaram do limite de regressão."""
+    regressoes = []
+    for nome, medida in resultados.items():
+        anterior = baseline["resultados"].get(nome)
+        if anterior is None:
+            continue
+        razao = medida["mediana_ms"] / max(anterior["mediana_ms"], 1e-6)
+        limite = baseline.get("limites", {}).get(nome, limite_de(nome))
+        if razao > limite and medida["mediana_ms"] - anterior["mediana_ms"] > MARGEM_MS:
+            regressoes.append((nome, razao, limite))
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do Planner Alimentar Inteligente")
+    parser.add_argument("--perfil", choices=sorted(PERFIS), default="rapido")
+    parser.add_argument("--repeticoes", type=int, help="repetições por medida (padrão: a do perfil)")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--salvar-baseline", action="store_true", help="grava os resultados como nova baseline")
+    parser.add_argument("--sem-app", action="store_true", help="pula as medidas com o AppTest")
+    parser.add_argument("--saida", help="também grava os resultados desta execução neste arquivo JSON")
+    args = parser.parse_args(argv)
+
+    perfil = PERFIS[args.perfil]
+    repeticoes = args.repeticoes or perfil["repeticoes"]
+    resultados = {}
+    with tempfile.TemporaryDirectory(prefix="planner_bench_") as pasta:
+        for n_receitas in perfil["receitas"]:
+            print(f"catálogo com {n_receitas} receitas...", flush=True)
+            bench_catalogo(n_receitas, repeticoes, pasta, resultados)
+        for n_semanas in perfil["semanas"]:
+            print(f"histórico com {n_semanas} semanas...", flush=True)
+            bench_historico(n_semanas, repeticoes, pasta, resultados)
+    if not args.sem_app:
+        print("AppTest do versao4.py...", flush=True)
+        bench_app(repeticoes, resultados)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    largura = max(len(nome) for nome in resultados)
+    for nome, medida in resultados.items():
+        linha = f"{nome:<{largura}}  {medida['mediana_ms']:>10.2f} ms"
+        anterior = baseline and baseline["resultados"].get(nome)
+        if anterior:
+            linha += f"  ({medida['mediana_ms'] / max(anterior['mediana_ms'], 1e-6):.2f}x baseline)"
+        print(linha)
+
+    execucao = {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "perfil": args.perfil,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "limite_padrao": LIMITE_PADRAO,
+        "limites": {nome: limite_de(nome) for nome in resultados},
+        "resultados": resultados,
+    }
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(execucao, f, ensure_ascii=False, indent=4)
+    if args.salvar_baseline:
+        if baseline:
+            # Mantém medidas de outros perfis que não rodaram agora
+            execucao["resultados"] = {**baseline["resultados"], **resultados}
+            execucao["limites"] = {**baseline.get("limites", {}), **execucao["limites"]}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(execucao, f, ensure_ascii=False, indent=4)
+        print(f"Baseline gravada em {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print("Nenhuma baseline encontrada; use --salvar-baseline para criar uma.")
+        return 0
+    regressoes = comparar(resultados, baseline)
+    for nome, razao, limite in regressoes:
+        print(f"REGRESSÃO: {nome} está {razao:.2f}x mais lento que a baseline (limite {limite:.2f}x)")
+    return 1 if regressoes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Perfil de inicialização a frio do versao4.py.
+
+Simula o que acontece quando uma réplica nova do app sobe: cada medida roda em
+um interpretador novo, sem nada importado nem em cache no processo.
+
+- imports: `python -X importtime` do Streamlit e dos módulos do planner, com
+  os módulos de maior tempo acumulado;
+- primeira renderização: uma execução completa do versao4.py pelo AppTest em
+  um processo novo, sobre uma cópia temporária do app (os caches, planos e
+  pastas que ele cria não tocam a árvore de trabalho) (import do Streamlit à parte) e os módulos pesados
+  (pandas, pyarrow, fpdf...) que ela acabou importando. O esperado é nenhum:
+  eles só devem ser carregados no primeiro uso (histórico, gráficos, PDF).
+
+Uso (a partir da raiz do repositório):
+
+    python benchmarks/inicializacao.py
+    python benchmarks/inicializacao.py --repeticoes 5 --saida inicializacao.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from desempenho import copiar_app  # noqa: E402
+from instrumentacao import MODULOS_PESADOS, perfil_importacao  # noqa: E402
+
+MODULOS_APP = [
+    "armazenamento", "busca", "catalogo", "compartilhado", "exportacao", "hidratacao", "instrumentacao", "otimizador",
+]
+
+# Executado em um processo novo: imprime uma linha JSON com os tempos e os módulos pesados carregados
+_PRIMEIRA_RENDERIZACAO = """
+import json, sys, time
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+importado = time.perf_counter()
+app = AppTest.from_file({app!r}, default_timeout=120)
+app.run()
+fim = time.perf_counter()
+if app.exception:
+    raise SystemExit(f"versao4.py falhou no AppTest: {{app.exception}}")
+print(json.dumps({{
+    "import_streamlit_ms": (importado - inicio) * 1000,
+    "primeira_execucao_ms": (fim - importado) * 1000,
+    "modulos_pesados": [m for m in {pesados!r} if m in sys.modules],
+}}))
+"""
+
+
+def primeira_renderizacao(pasta):
+    """Primeira execução do versao4.py copiado em `pasta` (cada chamada em um processo e uma cópia novos)."""
+    copiar_app(pasta)
+    codigo = _PRIMEIRA_RENDERIZACAO.format(app=os.path.join(pasta, "versao4.py"), pesados=MODULOS_PESADOS)
+    ambiente = {**os.environ, "PYTHONPATH": pasta}
+    processo = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, cwd=pasta, env=ambiente,
+                              check=True)
+    return json.loads(processo.stdout.strip().splitlines()[-1])
+
+
+def imprimir_perfil(titulo, total_ms, entradas):
+    print(f"\n{titulo}: {total_ms:.0f} ms")
+    print(f"  {'módulo':<45} {'acumulado':>10} {'próprio':>9}")
+    for nome, acumulado, proprio in entradas:
+        print(f"  {nome:<45} {acumulado:>8.1f}ms {proprio:>7.1f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perfil de inicialização a frio do Planner Alimentar Inteligente")
+    parser.add_argument("--repeticoes", type=int, default=3, help="primeiras renderizações medidas (um processo novo cada)")
+    parser.add_argument("--limite", type=int, default=15, help="módulos listados em cada perfil de imports")
+    parser.add_argument("--saida", help="também grava o relatório neste arquivo JSON")
+    args = parser.parse_args(argv)
+
+    relatorio = {"imports": {}}
+    for titulo, modulos in (("streamlit", ["streamlit"]), ("planner", MODULOS_APP)):
+        total_ms, entradas = perfil_importacao(modulos, args.limite, cwd=RAIZ)
+        imprimir_perfil(f"Imports ({titulo})", total_ms, entradas)
+        relatorio["imports"][titulo] = {"total_ms": total_ms, "modulos": entradas}
+
+    print(f"\nPrimeira renderização do versao4.py ({args.repeticoes} processos novos)...", flush=True)
+    execucoes = []
+    for _ in range(args.repeticoes):
+        with tempfile.TemporaryDirectory(prefix="planner_inicializacao_") as pasta:
+            execucoes.append(primeira_renderizacao(pasta))
+    relatorio["primeira_renderizacao"] = {
+        "import_streamlit_ms": statistics.median(e["import_streamlit_ms"] for e in execucoes),
+        "primeira_execucao_ms": statistics.median(e["primeira_execucao_ms"] for e in execucoes),
+        "modulos_pesados": sorted({m for e in execucoes for m in e["modulos_pesados"]}),
+    }
+    resumo = relatorio["primeira_renderizacao"]
+    print(f"  import do Streamlit: {resumo['import_streamlit_ms']:.0f} ms (mediana)")
+    print(f"  primeira execução do script: {resumo['primeira_execucao_ms']:.0f} ms (mediana)")
+    print(f"  módulos pesados carregados: {', '.join(resumo['modulos_pesados']) or 'nenhum'}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
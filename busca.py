@@ -0,0 +1,325 @@
+"""Buscas sobre o catálogo compilado.
+
+- IndiceIngredientes: índice invertido (ingrediente normalizado -> ids das
+  receitas que o usam) e uma trie de prefixos para sugestões enquanto o usuário
+  digita. Filtros "com X" / "sem Y" viram interseções e diferenças de conjuntos,
+  sem percorrer as listas de ingredientes.
+- CorrespondenciaReceitas: associa texto livre a receitas de uma categoria
+  (usada na migração dos planos da versao2).
+- BuscaAproximada: busca tolerante a erros ("banana c/ whey") por n-gramas de
+  caracteres dos nomes e ingredientes das receitas, com ranking.
+"""
+import re
+import unicodedata
+
+import numpy as np
+
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e com espaços simples ("Pão  Integral" -> "pao integral")."""
+    decomposto = unicodedata.normalize("NFKD", texto.lower())
+    return " ".join("".join(c for c in decomposto if not unicodedata.combining(c)).split())
+
+
+class TriePrefixos:
+    """Trie de prefixos; cada nó guarda os valores das chaves que passam por ele."""
+
+    def __init__(self, max_por_no=50):
+        self.max_por_no = max_por_no
+        self._raiz = {}
+
+    def inserir(self, chave, valor):
+        no = self._raiz
+        for letra in chave:
+            no = no.setdefault(letra, {})
+            valores = no.setdefault("", [])
+            # Limita o que cada nó guarda: prefixos curtos não precisam de todas as chaves.
+            if len(valores) < self.max_por_no and valor not in valores:
+                valores.append(valor)
+
+    def buscar(self, prefixo):
+        no = self._raiz
+        for letra in prefixo:
+            no = no.get(letra)
+            if no is None:
+                return []
+        return no.get("", [])
+
+    def completo(self, prefixo):
+        """Todos os valores abaixo do prefixo (sem o limite por nó)."""
+        no = self._raiz
+        for letra in prefixo:
+            no = no.get(letra)
+            if no is None:
+                return set()
+        encontrados, pilha = set(), [no]
+        while pilha:
+            atual = pilha.pop()
+            for letra, filho in atual.items():
+                if letra == "":
+                    encontrados.update(filho)
+                else:
+                    pilha.append(filho)
+        return encontrados
+
+
+class IndiceIngredientes:
+    """Índice invertido ingrediente -> receitas, com sugestões por prefixo."""
+
+    def __init__(self, catalogo):
+        self.catalogo = catalogo
+        self.todas = frozenset(range(len(catalogo.receitas)))
+
+        # Agrupa as entradas da matriz por coluna (ingrediente) de uma vez, ordenando os ids.
+        ordem = np.argsort(catalogo.indices, kind="stable")
+        colunas = catalogo.indices[ordem]
+        receitas = catalogo.linhas[ordem]
+        limites = np.flatnonzero(np.diff(colunas)) + 1
+        por_coluna = {}
+        for grupo_cols, grupo_receitas in zip(np.split(colunas, limites), np.split(receitas, limites)):
+            if len(grupo_cols):
+                por_coluna[int(grupo_cols[0])] = grupo_receitas
+
+        self.receitas_por_ingrediente = {}
+        self.nomes = {}
+        self.trie = TriePrefixos()
+        for col, nome in enumerate(catalogo.ingredientes):
+            chave = normalizar(nome)
+            ids = frozenset(por_coluna.get(col, ()).tolist())
+            self.receitas_por_ingrediente[chave] = self.receitas_por_ingrediente.get(chave, frozenset()) | ids
+            if chave not in self.nomes:
+                self.nomes[chave] = nome
+                # Cada palavra do nome é um ponto de entrada ("prot" encontra "Whey Protein").
+                palavras = chave.split()
+                for i in range(len(palavras)):
+                    self.trie.inserir(" ".join(palavras[i:]), chave)
+
+    def sugerir(self, prefixo, limite=8):
+        """Nomes de ingredientes cujo nome (ou alguma palavra dele) começa com o prefixo."""
+        return [self.nomes[chave] for chave in self.trie.buscar(normalizar(prefixo))[:limite]]
+
+    def receitas_com(self, termo):
+        """Ids das receitas com algum ingrediente que case com o termo.
+
+        Vale o nome exato e também qualquer ingrediente cujo nome (ou uma palavra
+        dele) comece com o termo: "arroz" pega "Arroz integral" e "Arroz (RU)".
+        """
+        ids = set()
+        for ingrediente in self.trie.completo(normalizar(termo)):
+            ids |= self.receitas_por_ingrediente[ingrediente]
+        return ids
+
+    def filtrar(self, incluir=(), excluir=()):
+        """Receitas que têm todos os ingredientes de `incluir` e nenhum de `excluir`."""
+        resultado = self.todas
+        for termo in incluir:
+            resultado = resultado & self.receitas_com(termo)
+        for termo in excluir:
+            resultado = resultado - self.receitas_com(termo)
+        return resultado
+
+
+# Palavras que não ajudam a distinguir receitas ("pão com ovo" ~ "pão ovo")
+PALAVRAS_VAZIAS = frozenset({"a", "o", "as", "os", "com", "de", "da", "do", "das", "dos", "e", "em", "ou", "para", "sem"})
+
+
+def palavras_chave(texto):
+    return frozenset(normalizar(texto).replace("/", " ").replace("(", " ").replace(")", " ").split()) - PALAVRAS_VAZIAS
+
+
+class BuscaAproximada:
+    """Busca aproximada de receitas por trigramas de caracteres (nome e ingredientes).
+
+    Os trigramas de cada receita são calculados uma vez e guardados como listas
+    invertidas em CSR (trigrama -> ids das receitas), com peso IDF: trigramas
+    raros ("whe") pesam mais que os comuns ("de "). Uma busca soma, com
+    np.bincount, os pesos das listas dos trigramas do texto, então o custo
+    depende do tamanho dessas listas e não de comparar o texto com cada receita.
+
+    Pontuação: semelhança de cosseno (com pesos IDF) entre o texto e o nome da
+    receita, mais `peso_ingredientes` × a fração do texto encontrada nos
+    ingredientes ("banana c/ whey" acha a receita cujo nome não cita whey).
+
+    Os trigramas do texto entram na soma do mais raro para o mais comum até
+    `max_postagens` entradas; os comuns que ficam de fora têm IDF baixo e mudam
+    pouco o ranking, mas dominariam o tempo em catálogos grandes.
+    """
+
+    def __init__(self, nomes, ingredientes_por_receita, peso_ingredientes=0.5, max_postagens=20_000):
+        self.nomes = list(nomes)
+        self.peso_ingredientes = peso_ingredientes
+        self.max_postagens = max_postagens
+        self._trigrama_id = {}
+        postagens_nome = self._postagens([self.trigramas(nome) for nome in self.nomes])
+        postagens_ingr = self._postagens([
+            set().union(*(self.trigramas(i) for i in ingredientes)) if ingredientes else set()
+            for ingredientes in ingredientes_por_receita
+        ])
+        self._nome = self._csr(postagens_nome)
+        self._ingredientes = self._csr(postagens_ingr)
+
+        # IDF pelo número de receitas com o trigrama (no nome ou nos ingredientes)
+        n = max(len(self.nomes), 1)
+        frequencia = np.diff(self._nome[0]) + np.diff(self._ingredientes[0])
+        self._frequencia = frequencia
+        self._idf = np.log1p(n / np.maximum(frequencia, 1))
+        # Norma IDF dos trigramas do nome de cada receita (denominador do cosseno)
+        pesos = np.repeat(self._idf ** 2, np.diff(self._nome[0]))
+        norma = np.sqrt(np.bincount(self._nome[1], weights=pesos, minlength=len(self.nomes)))
+        self._inverso_norma_nome = (1.0 / np.maximum(norma, 1e-12)).astype(np.float32)
+
+    @classmethod
+    def do_catalogo(cls, catalogo, **opcoes):
+        ingredientes = [
+            [catalogo.ingredientes[c] for c in catalogo.indices[catalogo.indptr[r]:catalogo.indptr[r + 1]]]
+            for r in range(len(catalogo.receitas))
+        ]
+        return cls(catalogo.receitas, ingredientes, **opcoes)
+
+    @classmethod
+    def do_dicionario(cls, refeicoes_com_detalhes, **opcoes):
+        """A partir do formato de receitas.json / REFEICOES_COM_DETALHES."""
+        nomes = list(refeicoes_com_detalhes)
+        ingredientes = [[ing['name'] for ing in refeicoes_com_detalhes[n]['ingredients']] for n in nomes]
+        return cls(nomes, ingredientes, **opcoes)
+
+    @staticmethod
+    def trigramas(texto):
+        """Trigramas das palavras-chave do texto, com as bordas das palavras ("ovo" -> " ov", "ovo", "vo ")."""
+        texto = _ABREVIACOES.sub(lambda m: _EXPANSOES[m.group(1)], normalizar(texto))
+        trigramas = set()
+        for palavra in re.findall(r"\w+", texto):
+            if palavra in PALAVRAS_VAZIAS:
+                continue
+            palavra = f" {palavra} "
+            trigramas.update(palavra[i:i + 3] for i in range(len(palavra) - 2))
+        return trigramas
+
+    def _postagens(self, trigramas_por_receita):
+        postagens = {}
+        for rid, trigramas in enumerate(trigramas_por_receita):
+            for trigrama in trigramas:
+                tid = self._trigrama_id.setdefault(trigrama, len(self._trigrama_id))
+                postagens.setdefault(tid, []).append(rid)
+        return postagens
+
+    def _csr(self, postagens):
+        """(indptr, ids das receitas) por trigrama; chamado com o vocabulário já completo."""
+        tamanhos = np.zeros(len(self._trigrama_id), dtype=np.int64)
+        for tid, receitas in postagens.items():
+            tamanhos[tid] = len(receitas)
+        indptr = np.zeros(len(tamanhos) + 1, dtype=np.int64)
+        np.cumsum(tamanhos, out=indptr[1:])
+        receitas_por_trigrama = np.empty(indptr[-1], dtype=np.int32)
+        for tid, receitas in postagens.items():
+            receitas_por_trigrama[indptr[tid]:indptr[tid + 1]] = receitas
+        return indptr, receitas_por_trigrama
+
+    def buscar(self, texto, limite=5, candidatas=None, minimo=0.0):
+        """[(receita, pontuação)] em ordem decrescente; `candidatas` restringe a ids de receitas."""
+        ids = [self._trigrama_id[t] for t in self.trigramas(texto) if t in self._trigrama_id]
+        if not ids:
+            return []
+        ids = np.array(ids, dtype=np.int64)
+        idf = self._idf[ids]
+        norma_texto = np.sqrt(np.sum(idf ** 2))
+        soma_idf = np.sum(idf)
+
+        # Do trigrama mais raro ao mais comum, dentro do orçamento de postagens (sempre ao menos um)
+        ordem = np.argsort(self._frequencia[ids], kind="stable")
+        ids, idf = ids[ordem], idf[ordem]
+        usados = max(int(np.searchsorted(np.cumsum(self._frequencia[ids]), self.max_postagens, side="right")), 1)
+        ids, idf = ids[:usados], idf[:usados]
+
+        # Cada postagem já com seu peso final; uma única soma por receita
+        receitas, pesos = self._postagens_do_texto(self._nome, ids, idf ** 2 / norma_texto)
+        pesos *= self._inverso_norma_nome[receitas]
+        if self.peso_ingredientes:
+            receitas_ingr, pesos_ingr = self._postagens_do_texto(
+                self._ingredientes, ids, idf * (self.peso_ingredientes / soma_idf))
+            receitas = np.concatenate((receitas, receitas_ingr))
+            pesos = np.concatenate((pesos, pesos_ingr))
+        if candidatas is not None:
+            mascara = np.zeros(len(self.nomes), dtype=bool)
+            mascara[np.fromiter(candidatas, dtype=np.int64)] = True
+            manter = mascara[receitas]
+            receitas, pesos = receitas[manter], pesos[manter]
+        pontos = np.bincount(receitas, weights=pesos, minlength=len(self.nomes))
+
+        # Só as receitas que pontuaram entram na seleção (o resto é zero e empata)
+        tocadas = np.flatnonzero(pontos > minimo)
+        limite = min(limite, len(tocadas))
+        if not limite:
+            return []
+        melhores = tocadas[np.argpartition(-pontos[tocadas], limite - 1)[:limite]]
+        melhores = melhores[np.argsort(-pontos[melhores], kind="stable")]
+        return [(self.nomes[r], float(pontos[r])) for r in melhores]
+
+    @staticmethod
+    def _postagens_do_texto(csr, ids, pesos):
+        """(ids das receitas, peso de cada postagem) das listas dos trigramas `ids`, concatenadas sem laço Python."""
+        indptr, receitas = csr
+        inicios = indptr[ids]
+        tamanhos = indptr[ids + 1] - inicios
+        deslocamentos = np.repeat(inicios - np.cumsum(tamanhos) + tamanhos, tamanhos)
+        posicoes = np.arange(len(deslocamentos)) + deslocamentos
+        return receitas[posicoes], np.repeat(pesos.astype(np.float32), tamanhos)
+
+
+_EXPANSOES = {"c/": "com", "s/": "sem", "p/": "para"}
+_ABREVIACOES = re.compile(r"(?<!\w)(c/|s/|p/)")
+
+
+class CorrespondenciaReceitas:
+    """Associa texto livre (ex.: planos antigos da versao2) a receitas do catálogo, por categoria.
+
+    Um texto corresponde a uma receita quando o nome normalizado é igual, ou
+    quando todas as palavras-chave do texto aparecem no nome de exatamente uma
+    receita da categoria ("pão" -> "Pão integral com queijo e fruta").
+
+    Com uma BuscaAproximada, os textos sem correspondência (ou ambíguos) ainda
+    são aceitos quando a receita mais parecida da categoria pontua pelo menos
+    `minimo` e fica `margem` acima da segunda ("strogonof" -> "Strogonoff leve...").
+    """
+
+    def __init__(self, categorias, busca=None, minimo=0.5, margem=0.25):
+        self.categorias = {}
+        for categoria, pratos in categorias.items():
+            self.categorias[categoria] = [(nome, normalizar(nome), palavras_chave(nome)) for nome in pratos]
+        self.busca = busca
+        self.minimo = minimo
+        self.margem = margem
+        if busca is not None:
+            id_por_nome = {nome: rid for rid, nome in enumerate(busca.nomes)}
+            self._ids_busca = {
+                categoria: [id_por_nome[nome] for nome in pratos if nome in id_por_nome]
+                for categoria, pratos in categorias.items()
+            }
+
+    def encontrar(self, categoria, texto):
+        """Devolve (receita ou None, motivo); o motivo explica quando não há correspondência."""
+        receitas = self.categorias.get(categoria)
+        if receitas is None:
+            return None, "categoria desconhecida"
+        chave = normalizar(texto)
+        for nome, nome_normalizado, _ in receitas:
+            if nome_normalizado == chave:
+                return nome, ""
+        palavras = palavras_chave(texto)
+        if not palavras:
+            return None, "sem palavras-chave"
+        candidatas = [nome for nome, _, chaves in receitas if palavras <= chaves]
+        if len(candidatas) == 1:
+            return candidatas[0], ""
+        motivo = "ambíguo: " + "; ".join(candidatas) if candidatas else "sem correspondência"
+        if self.busca is not None:
+            return self._aproximada(categoria, texto, motivo)
+        return None, motivo
+
+    def _aproximada(self, categoria, texto, motivo):
+        ranking = self.busca.buscar(texto, limite=2, candidatas=self._ids_busca.get(categoria, ()))
+        if not ranking or ranking[0][1] < self.minimo:
+            return None, motivo
+        if len(ranking) > 1 and ranking[0][1] - ranking[1][1] < self.margem:
+            return None, motivo + f" (aproximadas: {ranking[0][0]}; {ranking[1][0]})"
+        return ranking[0][0], f"aproximada ({ranking[0][1]:.2f})"
@@ -0,0 +1,562 @@
+"""Catálogo de refeições compilado para agregações rápidas.
+
+O catálogo (arquivo "banco de dados/receitas.json", no mesmo formato de
+REFEICOES_COM_DETALHES / REFEICOES_BASE das versões anteriores) é convertido
+uma única vez em uma matriz esparsa receita × ingrediente (formato CSR, só com
+NumPy), com todos os textos internados em tabelas. Essa forma compilada é
+gravada em cache binário (.npz) e só é refeita quando o arquivo fonte muda.
+
+A lista de compras de qualquer conjunto de planos vira um produto
+matriz-vetor: o vetor de contagem das receitas escolhidas (ponderado por
+`people`) vezes a matriz de quantidades. As quantidades já entram na matriz
+normalizadas (gramas, mililitros ou contagem; ver o módulo `unidades`), e
+cada coluna é um item de compra (ingrediente + unidade canônica), então somar
+colunas nunca mistura unidades diferentes.
+
+Os nutrientes seguem a mesma ideia: cada receita tem um vetor (kcal,
+proteína, carboidratos, gorduras, fibras) guardado em uma matriz densa
+receita × nutriente, e os totais de um dia, da semana ou de todo o histórico
+são o produto da matriz de seleções (slots × receitas, ponderada por
+`people`) pela matriz de nutrientes.
+
+As regras de exclusão da lista de compras também são resolvidas aqui: elas
+viram expressões regulares aplicadas uma vez por texto distinto do catálogo,
+e o resultado fica guardado como uma máscara booleana, de modo que a
+agregação nunca faz comparação de strings.
+
+As opções de cada categoria (catálogo + pratos customizados) formam um
+CardapioEmCamadas: a base do catálogo é compartilhada e imutável, e os pratos
+customizados entram em camadas por cima, sem copiar as de baixo.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import numpy as np
+
+from unidades import normalizar_entradas
+
+# Colunas da matriz de nutrientes e a chave de cada uma em "nutrients" no receitas.json
+NUTRIENTES = ("kcal", "proteina", "carboidratos", "gorduras", "fibras")
+CHAVES_NUTRIENTES = {"proteina": "protein", "carboidratos": "carbs", "gorduras": "fat", "fibras": "fiber"}
+# Máscaras de exclusão guardadas no catálogo além da das regras padrão
+MAX_MASCARAS = 8
+
+
+class RegrasExclusao:
+    """Regras de exclusão da lista de compras compiladas em expressões regulares.
+
+    - substrings: o termo pode aparecer em qualquer parte do nome ou da unidade;
+    - palavras: o termo precisa aparecer como palavra inteira no nome ou na unidade;
+    - unidades: o termo só é procurado na unidade (ex.: "pitada").
+    """
+
+    def __init__(self, substrings=(), palavras=(), unidades=()):
+        self.substrings = frozenset(t.strip().lower() for t in substrings if t.strip())
+        self.palavras = frozenset(t.strip().lower() for t in palavras if t.strip())
+        self.unidades = frozenset(t.strip().lower() for t in unidades if t.strip())
+
+        # Uma regex para o nome (substrings + palavras) e outra para a unidade (as três regras).
+        alternativas = [re.escape(t) for t in sorted(self.substrings)]
+        alternativas += [rf"(?<!\w){re.escape(t)}(?!\w)" for t in sorted(self.palavras)]
+        self._regex_nome = re.compile("|".join(alternativas)) if alternativas else None
+        alternativas += [re.escape(t) for t in sorted(self.unidades)]
+        self._regex_unidade = re.compile("|".join(alternativas)) if alternativas else None
+
+    @property
+    def chave(self):
+        """Identifica o conjunto de regras (usado como chave de cache das máscaras)."""
+        return (self.substrings, self.palavras, self.unidades)
+
+    def __or__(self, outras):
+        """Combina duas regras (ex.: regras globais | regras do usuário)."""
+        return RegrasExclusao(
+            self.substrings | outras.substrings,
+            self.palavras | outras.palavras,
+            self.unidades | outras.unidades,
+        )
+
+    def exclui_nome(self, nome):
+        return self._regex_nome is not None and self._regex_nome.search(nome.lower()) is not None
+
+    def exclui_unidade(self, unidade):
+        return self._regex_unidade is not None and self._regex_unidade.search(unidade.lower()) is not None
+
+    def exclui(self, nome, unidade):
+        return self.exclui_nome(nome) or self.exclui_unidade(unidade)
+
+
+class CatalogoCompilado:
+    """Receitas e ingredientes indexados por inteiros, com quantidades em CSR.
+
+    Todos os textos ficam internados em tabelas (`receitas`, `ingredientes` e
+    `textos`); as entradas da matriz guardam apenas ids inteiros, o que permite
+    gravar o catálogo inteiro como arrays NumPy (ver `abrir_catalogo`).
+    """
+
+    # Arrays gravados no cache binário, além das tabelas de texto
+    ARRAYS = ("nutrientes", "macros_conhecidos", "indptr", "indices", "quantidades", "nome_entrada", "unidade_entrada",
+              "categoria_indptr", "categoria_receitas")
+    TABELAS = ("receitas", "ingredientes", "unidades_itens", "textos", "categorias")
+
+    def __init__(self, tabelas, arrays, exclusoes=None):
+        self.receitas = tabelas["receitas"]
+        # Uma coluna por item de compra, com a unidade canônica em que a quantidade está
+        self.ingredientes = tabelas["ingredientes"]
+        self.unidades_itens = tabelas["unidades_itens"]
+        self.textos = tabelas["textos"]
+        self.nomes_categorias = tabelas["categorias"]
+        for nome in self.ARRAYS:
+            setattr(self, nome, arrays[nome])
+        self.calorias = self.nutrientes[:, 0]
+        self.receita_id = dict(zip(self.receitas, range(len(self.receitas))))
+        self.ingrediente_id = dict(zip(self.ingredientes, range(len(self.ingredientes))))
+        # Linha (receita) de cada entrada não nula, usada no produto matriz-vetor.
+        self.linhas = np.repeat(np.arange(len(self.receitas)), np.diff(self.indptr))
+
+        # Máscara das regras padrão, fixa; as de outras regras (ex.: palavras digitadas por
+        # cada usuário) ficam só nas últimas MAX_MASCARAS usadas, já que o catálogo é
+        # compartilhado pelo processo inteiro.
+        self._mascaras = OrderedDict()
+        self._trava_mascaras = threading.Lock()
+        self.regras = exclusoes if exclusoes is not None else RegrasExclusao()
+        self.excluido = self._calcular_mascara(self.regras)
+
+    @classmethod
+    def de_dicionario(cls, refeicoes_com_detalhes, categorias=None, exclusoes=None):
+        """Compila o formato de dicionário (REFEICOES_COM_DETALHES / REFEICOES_BASE)."""
+        receitas = list(refeicoes_com_detalhes)
+        textos, texto_id = [], {}
+
+        def internar(texto):
+            tid = texto_id.get(texto)
+            if tid is None:
+                tid = texto_id[texto] = len(textos)
+                textos.append(texto)
+            return tid
+
+        indptr, entradas, nome_entrada, unidade_entrada = [0], [], [], []
+        for nome in receitas:
+            for ing in refeicoes_com_detalhes[nome]['ingredients']:
+                entradas.append((ing['name'].strip(), ing['quantity'], ing['unit']))
+                nome_entrada.append(internar(ing['name']))
+                unidade_entrada.append(internar(ing['unit']))
+            indptr.append(len(entradas))
+
+        # Unidades interpretadas uma única vez; cada (ingrediente, unidade canônica) vira uma coluna.
+        normalizadas, rotulos = normalizar_entradas(entradas)
+        colunas_por_nome = {}
+        for chave in rotulos:
+            colunas_por_nome.setdefault(chave[0], []).append(chave)
+        coluna = {}
+        ingredientes, unidades_itens = [], []
+        for nome, chaves in colunas_por_nome.items():
+            for chave in chaves:
+                coluna[chave] = len(ingredientes)
+                # O nome só ganha a unidade como sufixo quando o ingrediente tem mais de uma linha
+                ingredientes.append(nome if len(chaves) == 1 else f"{nome} ({rotulos[chave]})")
+                unidades_itens.append(rotulos[chave])
+        indices = [coluna[chave] for chave, _ in normalizadas]
+        quantidades = [valor for _, valor in normalizadas]
+
+        receita_id = {nome: i for i, nome in enumerate(receitas)}
+        categorias = categorias or {}
+        categoria_indptr, categoria_receitas = [0], []
+        for pratos in categorias.values():
+            categoria_receitas.extend(receita_id[p] for p in pratos if p in receita_id)
+            categoria_indptr.append(len(categoria_receitas))
+
+        # Receitas sem "nutrients" ficam só com as calorias (macros zerados e marcados como desconhecidos)
+        nutrientes = np.zeros((len(receitas), len(NUTRIENTES)), dtype=np.float64)
+        macros_conhecidos = np.zeros(len(receitas), dtype=bool)
+        for rid, nome in enumerate(receitas):
+            nutrientes[rid, 0] = refeicoes_com_detalhes[nome]['calories']
+            macros = refeicoes_com_detalhes[nome].get('nutrients')
+            if macros:
+                nutrientes[rid, 1:] = [macros.get(CHAVES_NUTRIENTES[n], 0) for n in NUTRIENTES[1:]]
+                macros_conhecidos[rid] = True
+
+        tabelas = {"receitas": receitas, "ingredientes": ingredientes, "unidades_itens": unidades_itens,
+                   "textos": textos, "categorias": list(categorias)}
+        arrays = {
+            "nutrientes": nutrientes,
+            "macros_conhecidos": macros_conhecidos,
+            "indptr": np.array(indptr, dtype=np.int64),
+            "indices": np.array(indices, dtype=np.int32),
+            "quantidades": np.array(quantidades, dtype=np.float64),
+            "nome_entrada": np.array(nome_entrada, dtype=np.int32),
+            "unidade_entrada": np.array(unidade_entrada, dtype=np.int32),
+            "categoria_indptr": np.array(categoria_indptr, dtype=np.int64),
+            "categoria_receitas": np.array(categoria_receitas, dtype=np.int32),
+        }
+        return cls(tabelas, arrays, exclusoes)
+
+    # --- CONSULTAS ---
+    @property
+    def shape(self):
+        return len(self.receitas), len(self.ingredientes)
+
+    @property
+    def categorias(self):
+        """{categoria: [nomes das receitas]}, no formato de REFEICOES_BASE."""
+        return {
+            categoria: [self.receitas[r] for r in self.categoria_receitas[self.categoria_indptr[i]:self.categoria_indptr[i + 1]]]
+            for i, categoria in enumerate(self.nomes_categorias)
+        }
+
+    def calorias_de(self, nome):
+        """Calorias da receita, ou None se ela não estiver no catálogo (ex.: prato customizado)."""
+        rid = self.receita_id.get(nome)
+        return None if rid is None else self.calorias[rid]
+
+    def mascara_exclusao(self, regras):
+        """Marca as entradas excluídas da lista de compras pelas regras dadas.
+
+        A das regras padrão é sempre reaproveitada; as demais ficam em um cache
+        LRU pequeno (quem precisa da máscara por mais tempo, como a
+        ListaComprasIncremental de cada sessão, guarda o resultado).
+        """
+        if regras.chave == self.regras.chave:
+            return self.excluido
+        with self._trava_mascaras:
+            mascara = self._mascaras.get(regras.chave)
+            if mascara is not None:
+                self._mascaras.move_to_end(regras.chave)
+                return mascara
+        mascara = self._calcular_mascara(regras)
+        with self._trava_mascaras:
+            self._mascaras[regras.chave] = mascara
+            while len(self._mascaras) > MAX_MASCARAS:
+                self._mascaras.popitem(last=False)
+        return mascara
+
+    def _calcular_mascara(self, regras):
+        # As regras são testadas uma vez por texto distinto; as entradas herdam o
+        # resultado por indexação nos arrays de ids.
+        no_nome = np.fromiter((regras.exclui_nome(t) for t in self.textos), dtype=bool, count=len(self.textos))
+        na_unidade = np.fromiter((regras.exclui_unidade(t) for t in self.textos), dtype=bool, count=len(self.textos))
+        return no_nome[self.nome_entrada] | na_unidade[self.unidade_entrada]
+
+    def matriz_selecoes(self, planos, dias, categorias):
+        """Seleções de um ou vários planos semanais como matriz esparsa slots × receitas.
+
+        Cada slot (plano, dia, categoria) tem no máximo uma receita, então a matriz
+        é guardada como dois arrays de forma (planos, dias, categorias): o id da
+        receita (-1 quando o slot está vazio ou o prato não é do catálogo) e o peso
+        (`people`, 0 nos slots sem receita).
+        """
+        if isinstance(planos, dict):
+            planos = [planos]
+        categorias = list(categorias)
+        ids = np.full((len(planos), len(dias), len(categorias)), -1, dtype=np.int64)
+        pessoas = np.zeros(ids.shape, dtype=np.float64)
+        for p, plano in enumerate(planos):
+            for d, dia in enumerate(dias):
+                dia_plano = plano.get(dia, {})
+                for c, categoria in enumerate(categorias):
+                    selecao = dia_plano.get(categoria, {})
+                    rid = self.receita_id.get(selecao.get('meal'))
+                    if rid is not None:
+                        ids[p, d, c] = rid
+                        pessoas[p, d, c] = selecao.get('people', 1)
+        return ids, pessoas
+
+    def vetor_selecoes(self, planos, dias, categorias):
+        """Converte um ou vários planos semanais em contagens por receita (ponderadas por pessoas)."""
+        ids, pessoas = self.matriz_selecoes(planos, dias, categorias)
+        validos = ids >= 0
+        return np.bincount(ids[validos], weights=pessoas[validos], minlength=len(self.receitas))
+
+    def nutrientes_por_slot(self, ids, pessoas, por_pessoa=False):
+        """Produto seleções × nutrientes: array (..., len(NUTRIENTES)) com o total de cada slot.
+
+        Como cada linha da matriz de seleções tem uma única receita, o produto é
+        uma indexação das linhas da matriz de nutrientes pelos ids, multiplicada
+        pelos pesos. Somar os eixos do resultado dá os totais por dia
+        (`.sum(axis=-2)`), por semana ou do histórico inteiro.
+        """
+        pesos = (ids >= 0) if por_pessoa else pessoas
+        return self.nutrientes[np.maximum(ids, 0)] * pesos[..., None]
+
+    def nutrientes_por_dia(self, planos, dias, categorias, por_pessoa=False):
+        """Totais de nutrientes de cada dia: array (planos, dias, len(NUTRIENTES))."""
+        ids, pessoas = self.matriz_selecoes(planos, dias, categorias)
+        return self.nutrientes_por_slot(ids, pessoas, por_pessoa).sum(axis=-2)
+
+    def _pesos(self, contagem, regras=None):
+        excluido = self.excluido if regras is None else self.mascara_exclusao(regras)
+        # Entradas excluídas simplesmente pesam zero.
+        return np.where(excluido, 0.0, self.quantidades * contagem[self.linhas])
+
+    def totais_ingredientes(self, contagem, regras=None):
+        """Produto vetor × matriz: quantidade total de cada ingrediente."""
+        return np.bincount(self.indices, weights=self._pesos(contagem, regras), minlength=len(self.ingredientes))
+
+    def lista_compras(self, contagem, regras=None):
+        """Retorna a tupla (ingredientes, unidades) no formato usado pela interface.
+
+        `regras` substitui as regras de exclusão padrão do catálogo (ex.: regras por usuário).
+        """
+        totais = self.totais_ingredientes(contagem, regras)
+        ingredientes = {}
+        unidades = {}
+        for col in np.flatnonzero(totais):
+            key = self.ingredientes[col]
+            ingredientes[key] = float(totais[col])
+            unidades[key] = self.unidades_itens[col]
+        return ingredientes, unidades
+
+
+def compilar_catalogo(refeicoes_com_detalhes, exclusoes=None, categorias=None):
+    """Compila o catálogo de refeições em um CatalogoCompilado."""
+    return CatalogoCompilado.de_dicionario(refeicoes_com_detalhes, categorias, exclusoes)
+
+
+# --- CATÁLOGO EXTERNO COM CACHE BINÁRIO ---
+VERSAO_CACHE = 4
+
+
+def _caminhos_cache(caminho):
+    pasta = os.path.join(os.path.dirname(os.path.abspath(caminho)), ".cache")
+    base = os.path.splitext(os.path.basename(caminho))[0]
+    return pasta, os.path.join(pasta, f"{base}.npz"), os.path.join(pasta, f"{base}.json")
+
+
+def _hash_arquivo(caminho):
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _gravar_cache(catalogo, arquivo_npz):
+    dados = {nome: getattr(catalogo, nome) for nome in CatalogoCompilado.ARRAYS}
+    tabelas = {nome: getattr(catalogo, nome) for nome in ("receitas", "ingredientes", "unidades_itens", "textos")}
+    tabelas["categorias"] = catalogo.nomes_categorias
+    for nome, tabela in tabelas.items():
+        # Cada tabela de texto vira um único blob UTF-8 separado por "\0".
+        dados[f"tabela_{nome}"] = np.frombuffer("\0".join(tabela).encode("utf-8"), dtype=np.uint8)
+        dados[f"tamanho_{nome}"] = np.array([len(tabela)])
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(arquivo_npz), suffix=".npz")
+    with os.fdopen(fd, "wb") as f:
+        np.savez(f, **dados)
+    os.replace(tmp, arquivo_npz)
+
+
+def _ler_cache(arquivo_npz, exclusoes):
+    with np.load(arquivo_npz) as dados:
+        arrays = {nome: dados[nome] for nome in CatalogoCompilado.ARRAYS}
+        tabelas = {}
+        for nome in CatalogoCompilado.TABELAS:
+            tabelas[nome] = dados[f"tabela_{nome}"].tobytes().decode("utf-8").split("\0") if dados[f"tamanho_{nome}"][0] else []
+    return CatalogoCompilado(tabelas, arrays, exclusoes)
+
+
+def abrir_catalogo(caminho, exclusoes=None):
+    """Carrega o catálogo de um arquivo JSON ({"refeicoes": ..., "categorias": ...}).
+
+    A forma compilada fica em `.cache/` ao lado do arquivo e só é refeita quando
+    o arquivo fonte muda: se o mtime/tamanho forem os mesmos do cache, ele é usado
+    direto; se mudaram, o hash do conteúdo decide se é preciso recompilar.
+    """
+    pasta, arquivo_npz, arquivo_meta = _caminhos_cache(caminho)
+    stat = os.stat(caminho)
+    assinatura = {"versao": VERSAO_CACHE, "mtime_ns": stat.st_mtime_ns, "tamanho": stat.st_size}
+
+    meta = _ler_meta(arquivo_meta) if os.path.exists(arquivo_npz) else {}
+    if meta and all(meta.get(k) == v for k, v in assinatura.items()):
+        return _ler_cache(arquivo_npz, exclusoes)
+
+    sha256 = _hash_arquivo(caminho)
+    if meta.get("versao") == VERSAO_CACHE and meta.get("sha256") == sha256:
+        catalogo = _ler_cache(arquivo_npz, exclusoes)
+    else:
+        with open(caminho, "r", encoding="utf-8") as f:
+            fonte = json.load(f)
+        catalogo = compilar_catalogo(fonte["refeicoes"], exclusoes, fonte.get("categorias"))
+        os.makedirs(pasta, exist_ok=True)
+        _gravar_cache(catalogo, arquivo_npz)
+
+    # Só o arquivo de metadados é regravado quando apenas o mtime mudou; a troca é atômica
+    # porque outros processos (app, scripts) podem estar lendo o mesmo cache.
+    os.makedirs(pasta, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=pasta, suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({**assinatura, "sha256": sha256}, f)
+    os.replace(tmp, arquivo_meta)
+    return catalogo
+
+
+def _ler_meta(arquivo_meta):
+    """Metadados do cache; ausentes ou ilegíveis (ex.: arquivo truncado) contam como cache inválido."""
+    try:
+        with open(arquivo_meta, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return meta if isinstance(meta, dict) else {}
+
+
+class ListaComprasIncremental:
+    """Lista de compras viva, mantida aplicando apenas o delta de cada slot alterado.
+
+    Um slot é qualquer chave hashable (ex.: (dia, categoria) ou (semana, dia, categoria)).
+    Trocar a refeição ou o número de pessoas de um slot custa O(ingredientes de uma receita):
+    a contribuição antiga (refeição × pessoas) é subtraída e a nova é somada.
+    """
+
+    def __init__(self, catalogo, regras=None):
+        self.catalogo = catalogo
+        self.regras = regras if regras is not None else catalogo.regras
+        # Quantidade por entrada da matriz, já zerada para os itens excluídos.
+        self._pesos = np.where(catalogo.mascara_exclusao(self.regras), 0.0, catalogo.quantidades)
+        self.totais = np.zeros(len(catalogo.ingredientes), dtype=np.float64)
+        self.slots = {}
+
+    def _aplicar(self, rid, fator):
+        ini, fim = self.catalogo.indptr[rid], self.catalogo.indptr[rid + 1]
+        np.add.at(self.totais, self.catalogo.indices[ini:fim], self._pesos[ini:fim] * fator)
+
+    def atualizar(self, slot, meal, people):
+        """Registra a seleção atual de um slot; devolve True se a lista mudou."""
+        rid = self.catalogo.receita_id.get(meal)
+        novo = (rid, people) if rid is not None else None
+        antigo = self.slots.get(slot)
+        if antigo == novo:
+            return False
+        if antigo is not None:
+            self._aplicar(antigo[0], -antigo[1])
+        if novo is not None:
+            self._aplicar(rid, people)
+            self.slots[slot] = novo
+        else:
+            self.slots.pop(slot, None)
+        return True
+
+    def carregar(self, plano, dias, categorias):
+        """Registra todos os slots de um plano semanal (usado na carga inicial)."""
+        for dia in dias:
+            dia_plano = plano.get(dia, {})
+            for categoria in categorias:
+                selecao = dia_plano.get(categoria, {})
+                self.atualizar((dia, categoria), selecao.get('meal'), selecao.get('people', 1))
+        return self
+
+    def lista_compras(self):
+        """Retorna a tupla (ingredientes, unidades) no formato usado pela interface."""
+        ingredientes = {}
+        unidades = {}
+        # Tolerância para resíduos de ponto flutuante deixados pelas subtrações.
+        for col in np.flatnonzero(self.totais > 1e-9):
+            key = self.catalogo.ingredientes[col]
+            ingredientes[key] = float(self.totais[col])
+            unidades[key] = self.catalogo.unidades_itens[col]
+        return ingredientes, unidades
+
+
+NENHUMA = "Nenhuma"
+
+
+class CardapioEmCamadas(Mapping):
+    """{categoria: pratos} formado por uma base imutável e camadas de pratos customizados.
+
+    Cada camada guarda só os pratos que acrescenta (tupla e frozenset por
+    categoria) e aponta para a camada de baixo; a pertinência consulta os
+    conjuntos da cadeia, então mesclar n pratos custa O(n) e nunca copia a
+    base. `com_pratos` não altera a visão atual: devolve uma nova camada por
+    cima (ou a própria visão, se nada foi acrescentado), de modo que uma mesma
+    visão pode ser compartilhada entre sessões.
+    """
+
+    def __init__(self, acrescimos, pai=None):
+        self._pai = pai
+        self._pratos = {categoria: tuple(pratos) for categoria, pratos in acrescimos.items()}
+        self._conjuntos = {categoria: frozenset(pratos) for categoria, pratos in self._pratos.items()}
+        self._categorias = pai._categorias if pai is not None else tuple(self._pratos)
+        self._completas = {}
+
+    @classmethod
+    def base(cls, categorias):
+        """Camada base a partir de {categoria: [pratos]} (ex.: CatalogoCompilado.categorias)."""
+        return cls({categoria: dict.fromkeys(pratos) for categoria, pratos in categorias.items()})
+
+    def contem(self, categoria, prato):
+        camada = self
+        while camada is not None:
+            if prato in camada._conjuntos.get(categoria, ()):
+                return True
+            camada = camada._pai
+        return False
+
+    def com_pratos(self, refeicoes):
+        """Nova visão com os pratos de {categoria: [pratos]}; categorias desconhecidas são ignoradas."""
+        acrescimos = {}
+        for categoria, pratos in refeicoes.items():
+            if categoria not in self._categorias:
+                continue
+            novos = [p for p in dict.fromkeys(pratos) if not self.contem(categoria, p)]
+            if novos:
+                acrescimos[categoria] = novos
+        return CardapioEmCamadas(acrescimos, self) if acrescimos else self
+
+    def __getitem__(self, categoria):
+        # A tupla completa da categoria é montada na primeira leitura e reaproveitada (a visão não muda)
+        completa = self._completas.get(categoria)
+        if completa is None:
+            if categoria not in self._categorias:
+                raise KeyError(categoria)
+            anterior = self._pai[categoria] if self._pai is not None else ()
+            completa = self._completas[categoria] = anterior + self._pratos.get(categoria, ())
+        return completa
+
+    def __iter__(self):
+        return iter(self._categorias)
+
+    def __len__(self):
+        return len(self._categorias)
+
+
+class IndiceOpcoes:
+    """Opções dos selectboxes do planner, montadas uma vez e indexadas nos dois sentidos.
+
+    Cada refeição recebe um id inteiro estável (0 é "Nenhuma"); o selectbox trabalha
+    com esses ids e o rótulo "Nome (~N kcal)" só é usado para exibição, então nunca
+    é preciso interpretar o texto de volta.
+    """
+
+    def __init__(self, refeicoes_disponiveis, catalogo):
+        self.nomes = [NENHUMA]
+        self.id_por_nome = {NENHUMA: 0}
+        self.rotulos = [NENHUMA]
+        self.opcoes = {}
+        self.nomes_opcoes = {}
+        self._posicoes = {}
+        for categoria, pratos in refeicoes_disponiveis.items():
+            ids = [0]
+            for nome in sorted(set(pratos)):
+                rid = self.id_por_nome.get(nome)
+                if rid is None:
+                    rid = self.id_por_nome[nome] = len(self.nomes)
+                    self.nomes.append(nome)
+                    calorias = catalogo.calorias_de(nome)
+                    self.rotulos.append(f"{nome} (~{calorias:.0f} kcal)" if calorias is not None else nome)
+                ids.append(rid)
+            self.opcoes[categoria] = ids
+            self.nomes_opcoes[categoria] = [self.nomes[rid] for rid in ids]
+            self._posicoes[categoria] = {rid: pos for pos, rid in enumerate(ids)}
+
+    def posicao(self, categoria, nome):
+        """Posição da refeição nas opções da categoria (0, "Nenhuma", se não estiver lá)."""
+        return self._posicoes[categoria].get(self.id_por_nome.get(nome), 0)
+
+    def rotulo(self, rid):
+        return self.rotulos[rid]
+
+    def nome(self, rid):
+        return self.nomes[rid]
@@ -0,0 +1,74 @@
+"""Constantes e rotinas comuns ao app e aos scripts de linha de comando.
+
+- os caminhos e listas fixas do planner (dias da semana, catálogo, exclusões
+  padrão da lista de compras), definidos uma única vez;
+- `listar_arquivos` e `executar_em_lote`: a distribuição de arquivos entre
+  processos usada pelo migracao.py e pelo compras.py, com um número limitado
+  de tarefas em andamento (a origem pode ter milhares de arquivos sem que a
+  lista inteira de futuros fique em memória);
+- `progresso_periodico` e `imprimir_resumo`, a saída no terminal desses scripts.
+"""
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Catálogo de refeições (quantidades, calorias, nutrientes e categorias)
+CATALOGO_FILE = os.path.join(BASE_DIR, "banco de dados", "receitas.json")
+DIAS_SEMANA = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"]
+# Itens que nunca entram na lista de compras (o RU fornece, ou a quantidade é desprezível)
+SHOPPING_LIST_EXCLUSIONS = ['arroz', 'feijão', '(ru)', 'pitada']
+
+
+# --- PROCESSAMENTO EM LOTE ---
+def listar_arquivos(origem):
+    """Gera (caminho, caminho relativo) dos .json de origem, sem montar a lista inteira."""
+    if os.path.isfile(origem):
+        yield origem, os.path.basename(origem)
+        return
+    for pasta, subpastas, arquivos in os.walk(origem):
+        subpastas.sort()
+        for nome in sorted(arquivos):
+            if nome.endswith(".json"):
+                caminho = os.path.join(pasta, nome)
+                yield caminho, os.path.relpath(caminho, origem)
+
+
+def executar_em_lote(funcao, tarefas, ao_concluir, processos=None, initializer=None, initargs=(),
+                     em_andamento_por_processo=4):
+    """Roda `funcao(*args)` para cada (chave, args) de `tarefas` em um pool de processos.
+
+    `tarefas` é consumido aos poucos: no máximo `processos × em_andamento_por_processo`
+    ficam submetidos ao mesmo tempo. Cada resultado é entregue, no processo
+    principal e na ordem de conclusão, a `ao_concluir(chave, resultado)`.
+    """
+    processos = processos or os.cpu_count() or 1
+    limite = processos * em_andamento_por_processo
+    with ProcessPoolExecutor(processos, initializer=initializer, initargs=initargs) as pool:
+        pendentes = {}
+
+        def concluir(futuros):
+            for futuro in futuros:
+                ao_concluir(pendentes.pop(futuro), futuro.result())
+
+        for chave, args in tarefas:
+            if len(pendentes) >= limite:
+                concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                concluir(concluidos)
+            pendentes[pool.submit(funcao, *args)] = chave
+        while pendentes:
+            concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+            concluir(concluidos)
+
+
+def progresso_periodico(rotulo, a_cada=500):
+    """Callback `progresso(feitos)` que imprime "N <rotulo>..." a cada `a_cada` itens."""
+    def progresso(feitos):
+        if feitos % a_cada == 0:
+            print(f"{feitos} {rotulo}...", flush=True)
+    return progresso
+
+
+def imprimir_resumo(contagens, inicio):
+    """Linha final dos scripts: "rótulo: valor | ..." e o tempo desde `inicio` (perf_counter)."""
+    print(" | ".join(f"{rotulo}: {valor}" for rotulo, valor in contagens) + f" ({time.perf_counter() - inicio:.1f} s)")
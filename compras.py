@@ -0,0 +1,181 @@
+"""Listas de compras em lote, sem interface: uma lista por arquivo de plano.
+
+    python compras.py ARQUIVO_OU_PASTA DESTINO [--formatos json,csv,pdf] [--excluir "leite, ovo"] [--processos N]
+
+Cada .json de origem é um plano semanal no formato estruturado, o mesmo que o
+app salva: o plano puro ({dia: {categoria: {"meal", "people"}}}, como o
+planner_final_selecoes.json e as saídas de migracao.py) ou o arquivo de um
+usuário ({"versao": n, "plano": {...}}, pasta "banco de dados/planos").
+Para cada plano são gravados DESTINO/<caminho relativo>_compras.<formato>.
+
+- a lista é a mesma do app: seleções × matriz de ingredientes do catálogo
+  compilado, com as exclusões padrão (arroz, feijão, itens do RU, pitadas) e
+  as palavras de `--excluir`;
+- os arquivos são distribuídos entre processos (um por núcleo, por padrão),
+  com um número limitado de tarefas em andamento; cada processo abre o
+  catálogo uma única vez, a partir do cache binário aquecido antes do pool;
+- planos que não puderem ser lidos não interrompem o lote: entram na contagem
+  de erros e no relatório DESTINO/erros_compras.csv.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from armazenamento import escrever_atomico, escrever_bytes_atomico
+from catalogo import RegrasExclusao, abrir_catalogo
+from compartilhado import (
+    CATALOGO_FILE, DIAS_SEMANA, SHOPPING_LIST_EXCLUSIONS, executar_em_lote, imprimir_resumo, listar_arquivos,
+    progresso_periodico,
+)
+from exportacao import exportar, generate_pdf_list, linhas_lista, secao_lista
+
+SUFIXO = "_compras"
+RELATORIO = "erros_compras.csv"
+
+
+# --- ESCRITA DE CADA FORMATO ---
+def escrever_json(lista, caminho, plano, data_geracao):
+    itens = [{"item": item, "quantidade": quantidade, "unidade": unidade} for item, quantidade, unidade in linhas_lista(lista)]
+    escrever_atomico(caminho, {"plano": plano, "gerada_em": data_geracao, "itens": itens})
+
+
+def escrever_csv(lista, caminho, plano, data_geracao):
+    arquivo = io.BytesIO()
+    exportar("csv", [secao_lista(lista)], arquivo)
+    escrever_bytes_atomico(caminho, arquivo.getvalue())
+
+
+def escrever_pdf(lista, caminho, plano, data_geracao):
+    escrever_bytes_atomico(caminho, generate_pdf_list(lista, data_geracao))
+
+
+ESCRITORES = {"json": escrever_json, "csv": escrever_csv, "pdf": escrever_pdf}
+
+
+# --- TRABALHO DE CADA PROCESSO ---
+_catalogo = None
+_regras = None
+
+
+def _iniciar_processo(caminho_catalogo, palavras_excluidas):
+    """Abre o catálogo compilado (e monta as regras de exclusão) uma vez por processo."""
+    global _catalogo, _regras
+    _catalogo = abrir_catalogo(caminho_catalogo, RegrasExclusao(substrings=SHOPPING_LIST_EXCLUSIONS))
+    _regras = _catalogo.regras | RegrasExclusao(palavras=palavras_excluidas)
+
+
+def plano_do_arquivo(dados):
+    """O plano semanal de um arquivo (plano puro ou {"versao", "plano"} do armazenamento por usuário)."""
+    if not isinstance(dados, dict):
+        raise ValueError("o arquivo não contém um plano")
+    plano = dados["plano"] if isinstance(dados.get("plano"), dict) else dados
+    for dia in DIAS_SEMANA:
+        refeicoes = plano.get(dia) or {}
+        if not isinstance(refeicoes, dict):
+            raise ValueError(f"{dia}: esperado um objeto {{categoria: seleção}}")
+        for categoria, selecao in refeicoes.items():
+            if isinstance(selecao, str):
+                raise ValueError("plano em texto livre (versao2); converta antes com migracao.py")
+            if not isinstance(selecao, dict):
+                raise ValueError(f"{dia} · {categoria}: seleção inválida")
+            pessoas = selecao.get("people", 1)
+            if not isinstance(selecao.get("meal", ""), str) or isinstance(pessoas, bool) \
+                    or not isinstance(pessoas, (int, float)):
+                raise ValueError(f"{dia} · {categoria}: esperado {{\"meal\": texto, \"people\": número}}")
+    return plano
+
+
+def gerar_listas(origem, base_destino, relativo, formatos, data_geracao):
+    """Lista de compras de um plano, gravada em cada formato (executado nos processos do pool)."""
+    try:
+        with open(origem, "r", encoding="utf-8") as f:
+            plano = plano_do_arquivo(json.load(f))
+        categorias = list(dict.fromkeys(c for dia in DIAS_SEMANA for c in (plano.get(dia) or {})))
+        contagem = _catalogo.vetor_selecoes(plano, DIAS_SEMANA, categorias)
+        lista = _catalogo.lista_compras(contagem, _regras)
+        os.makedirs(os.path.dirname(base_destino) or ".", exist_ok=True)
+        for formato in formatos:
+            ESCRITORES[formato](lista, f"{base_destino}.{formato}", relativo, data_geracao)
+        return {"status": "ok", "itens": len(lista[0])}
+    except (OSError, ValueError) as erro:
+        return {"status": "erro", "erro": f"{type(erro).__name__}: {erro}"}
+
+
+# --- ORQUESTRAÇÃO ---
+def gerar(origem, destino, formatos=tuple(ESCRITORES), palavras_excluidas=(), processos=None,
+          catalogo=CATALOGO_FILE, data_geracao=None, em_andamento_por_processo=4, progresso=None):
+    """Gera as listas de todos os planos de `origem`; devolve um resumo com as contagens.
+
+    `progresso(feitos)`, se dado, é chamado a cada plano concluído.
+    """
+    os.makedirs(destino, exist_ok=True)
+    data_geracao = data_geracao or datetime.now().strftime('%d/%m/%Y')
+    resumo = {"planos": 0, "erros": 0, "itens": 0}
+    erros = []
+
+    def tarefas():
+        for caminho, relativo in listar_arquivos(origem):
+            # Com DESTINO dentro da origem, as listas JSON de uma execução anterior não são planos
+            if relativo.endswith(f"{SUFIXO}.json"):
+                continue
+            base_destino = os.path.join(destino, os.path.splitext(relativo)[0] + SUFIXO)
+            yield relativo, (caminho, base_destino, relativo, formatos, data_geracao)
+
+    def registrar(relativo, resultado):
+        if resultado["status"] == "ok":
+            resumo["planos"] += 1
+            resumo["itens"] += resultado["itens"]
+        else:
+            resumo["erros"] += 1
+            erros.append((relativo, resultado["erro"]))
+        if progresso:
+            progresso(resumo["planos"] + resumo["erros"])
+
+    # Compila (ou valida) o cache binário uma vez aqui; os processos só leem o .npz
+    abrir_catalogo(catalogo)
+    executar_em_lote(
+        gerar_listas, tarefas(), registrar, processos, _iniciar_processo, (catalogo, tuple(palavras_excluidas)),
+        em_andamento_por_processo,
+    )
+
+    with open(os.path.join(destino, RELATORIO), "w", encoding="utf-8", newline="") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(("arquivo", "erro"))
+        escritor.writerows(sorted(erros))
+    return resumo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera as listas de compras de vários planos semanais, sem interface.")
+    parser.add_argument("origem", help="arquivo de plano (.json) ou pasta com vários deles")
+    parser.add_argument("destino", help="pasta onde as listas e o relatório de erros são gravados")
+    parser.add_argument("--formatos", default=",".join(ESCRITORES),
+                        help=f"formatos separados por vírgula, entre {', '.join(ESCRITORES)} (padrão: todos)")
+    parser.add_argument("--excluir", default="", help="ingredientes a ignorar, separados por vírgula (ex.: \"leite, ovo\")")
+    parser.add_argument("--processos", type=int, help="número de processos (padrão: um por núcleo)")
+    parser.add_argument("--catalogo", default=CATALOGO_FILE, help="catálogo de receitas usado nas listas")
+    args = parser.parse_args(argv)
+
+    formatos = [f.strip().lower() for f in args.formatos.split(",") if f.strip()]
+    invalidos = [f for f in formatos if f not in ESCRITORES]
+    if invalidos or not formatos:
+        parser.error(f"formatos inválidos: {', '.join(invalidos) or '(nenhum)'}")
+
+    inicio = time.perf_counter()
+    resumo = gerar(args.origem, args.destino, formatos, args.excluir.split(","), args.processos, args.catalogo,
+                   progresso=progresso_periodico("planos processados"))
+    imprimir_resumo([
+        ("Listas geradas", resumo["planos"]), ("erros", resumo["erros"]), ("itens (soma das listas)", resumo["itens"]),
+    ], inicio)
+    if resumo["erros"]:
+        print(f"Relatório de erros: {os.path.join(args.destino, RELATORIO)}")
+    return 1 if resumo["erros"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+"""Exportação do plano e da lista de compras.
+
+O PDF da lista é endereçado pelo hash do conteúdo da lista (`hash_lista`), o que
+permite guardá-lo em cache e só gerá-lo de novo quando a lista muda.
+
+Para exportações maiores (vários meses, vários usuários) há um pipeline em
+streaming: o conteúdo é descrito por seções (`Secao`) cujas linhas vêm de
+geradores (`linhas_plano`, `linhas_selecoes`, `linhas_lista`), e cada formato
+(TXT, CSV, XLSX e PDF) consome as linhas uma a uma, escrevendo direto no
+destino. TXT e CSV nunca têm o documento inteiro em memória; o XLSX usa o modo
+write-only do openpyxl, que despeja as linhas em disco à medida que chegam. O
+PDF é o único montado em memória (o fpdf2 não escreve de forma incremental),
+mas também consome as linhas sem criar listas intermediárias.
+
+A fonte Unicode (DejaVuSans, ~700 KB) é reduzida uma única vez por processo a
+um subconjunto com os glifos que o planner usa (latim + pontuação + "□"), e é
+esse arquivo menor que o FPDF analisa a cada exportação. O fpdf2 (e o
+fontTools que ele traz) só é importado na primeira exportação em PDF, para não
+pesar no início do app.
+"""
+import csv
+import functools
+import hashlib
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FONT_PATH = os.path.join(BASE_DIR, "fonte", "DejaVuSans.ttf")
+
+# Latim básico, Latin-1, Latin Extended-A/B, pontuação geral, "€" e o "□" dos itens.
+FONT_UNICODES = [*range(0x20, 0x250), *range(0x2000, 0x2070), 0x20AC, 0x25A1]
+_CARACTERES_PDF = frozenset(FONT_UNICODES)
+
+
+@functools.lru_cache(maxsize=1)
+def fonte_preprocessada():
+    """Gera (uma vez por processo) o subconjunto da fonte e devolve o caminho do .ttf."""
+    stat = os.stat(FONT_PATH)
+    cache_dir = os.path.join(tempfile.gettempdir(), "planner_saudavel")
+    destino = os.path.join(cache_dir, f"DejaVuSans-{stat.st_size}-{int(stat.st_mtime)}.ttf")
+    if os.path.exists(destino):
+        return destino
+
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+
+    opcoes = subset.Options()
+    opcoes.layout_features = []
+    opcoes.hinting = False
+    opcoes.notdef_outline = True
+    opcoes.drop_tables += ["FFTM"]
+    fonte = TTFont(FONT_PATH)
+    subsetter = subset.Subsetter(opcoes)
+    subsetter.populate(unicodes=FONT_UNICODES)
+    subsetter.subset(fonte)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Escreve em arquivo temporário e renomeia: processos concorrentes nunca veem um .ttf pela metade.
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".ttf")
+    with os.fdopen(fd, "wb") as f:
+        fonte.save(f)
+    os.replace(tmp, destino)
+    return destino
+
+
+def formatar_quantidade(quantidade):
+    """Formata a quantidade sem casas decimais desnecessárias (2 -> '2', 1.5 -> '1.50')."""
+    return f"{int(quantidade)}" if quantidade == int(quantidade) else f"{quantidade:.2f}".replace('.00', '')
+
+
+def _novo_pdf(titulo, data_geracao):
+    """PDF com a fonte Unicode (subconjunto pré-processado) e o cabeçalho padrão."""
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.add_font("DejaVu", "", fonte_preprocessada())
+
+    pdf.set_font("DejaVu", "", 16)
+    pdf.cell(0, 10, titulo, 0, 1, "C")
+
+    pdf.set_font("DejaVu", "", 10)
+    pdf.cell(0, 8, f"Gerada em: {data_geracao}", 0, 1, "C")
+    pdf.ln(10)
+    return pdf
+
+
+def _texto_pdf(texto):
+    """Remove os caracteres fora do subconjunto da fonte (ex.: emojis das categorias)."""
+    return "".join(c for c in texto if ord(c) in _CARACTERES_PDF).strip()
+
+
+def generate_pdf_list(shopping_list_data, data_geracao=None):
+    """Gera um PDF da lista de compras usando uma fonte Unicode empacotada."""
+    ingredientes, unidades = shopping_list_data
+    data_geracao = data_geracao or datetime.now().strftime('%d/%m/%Y')
+
+    pdf = _novo_pdf("Lista de Compras Semanal", data_geracao)
+    pdf.set_font("DejaVu", "", 12)
+    for item, quantidade in sorted(ingredientes.items()):
+        unidade = unidades.get(item, "unidade(s)")
+        item_line = f"□  {formatar_quantidade(quantidade)} {unidade} de {item}"
+        pdf.cell(0, 10, _texto_pdf(item_line), 0, 1)
+
+    return bytes(pdf.output(dest='S'))
+
+
+def hash_lista(shopping_list_data, data_geracao):
+    """Hash do conteúdo da lista (e da data impressa no cabeçalho) usado como chave de cache."""
+    ingredientes, unidades = shopping_list_data
+    conteudo = json.dumps([sorted(ingredientes.items()), sorted(unidades.items()), data_geracao], ensure_ascii=False)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+# --- PIPELINE DE EXPORTAÇÃO EM STREAMING ---
+class Secao:
+    """Uma tabela exportada: título, cabeçalho e linhas (iterável consumido uma única vez).
+
+    `formatar` transforma uma linha no texto usado no TXT e no PDF.
+    """
+
+    __slots__ = ("titulo", "cabecalho", "linhas", "formatar")
+
+    def __init__(self, titulo, cabecalho, linhas, formatar):
+        self.titulo = titulo
+        self.cabecalho = cabecalho
+        self.linhas = linhas
+        self.formatar = formatar
+
+
+CABECALHO_PLANO = ("Plano", "Dia", "Categoria", "Refeição", "Pessoas", "kcal")
+CABECALHO_LISTA = ("Item", "Quantidade", "Unidade")
+
+
+def _calorias(catalogo, refeicao, pessoas):
+    calorias = catalogo.calorias_de(refeicao) if catalogo is not None else None
+    return None if calorias is None else round(float(calorias) * pessoas)
+
+
+def linhas_plano(planos, dias, categorias, catalogo=None):
+    """Linhas (plano, dia, categoria, refeição, pessoas, kcal) de planos semanais.
+
+    `planos` é um iterável de (rótulo, plano semanal), ex.: uma semana por usuário.
+    Slots vazios ou em "Nenhuma" são pulados.
+    """
+    for rotulo, plano in planos:
+        for dia in dias:
+            dia_plano = plano.get(dia, {})
+            for categoria in categorias:
+                selecao = dia_plano.get(categoria) or {}
+                refeicao = selecao.get('meal')
+                if not refeicao or refeicao == "Nenhuma":
+                    continue
+                pessoas = selecao.get('people', 1)
+                yield (rotulo, dia, categoria, refeicao, pessoas, _calorias(catalogo, refeicao, pessoas))
+
+
+def linhas_selecoes(lotes, catalogo=None):
+    """Linhas no mesmo formato a partir dos lotes de ArmazenamentoSQLite.iterar_selecoes."""
+    for lote in lotes:
+        for usuario, data_iso, categoria, refeicao, pessoas in lote:
+            yield (usuario, data_iso, categoria, refeicao, pessoas, _calorias(catalogo, refeicao, pessoas))
+
+
+def linhas_lista(shopping_list_data):
+    """Linhas (item, quantidade, unidade) da lista de compras, em ordem alfabética."""
+    ingredientes, unidades = shopping_list_data
+    for item in sorted(ingredientes):
+        yield (item, round(ingredientes[item], 2), unidades.get(item, "unidade(s)"))
+
+
+def _formatar_plano(linha):
+    rotulo, dia, categoria, refeicao, pessoas, kcal = linha
+    calorias = f", ~{kcal} kcal" if kcal is not None else ""
+    return f"[{rotulo}] {dia} · {categoria}: {refeicao} ({pessoas} pessoa(s){calorias})"
+
+
+def _formatar_lista(linha):
+    item, quantidade, unidade = linha
+    return f"□  {formatar_quantidade(quantidade)} {unidade} de {item}"
+
+
+def secao_plano(linhas):
+    return Secao("Plano Alimentar", CABECALHO_PLANO, linhas, _formatar_plano)
+
+
+def secao_lista(shopping_list_data):
+    return Secao("Lista de Compras", CABECALHO_LISTA, linhas_lista(shopping_list_data), _formatar_lista)
+
+
+def _destino_texto(destino):
+    """Envolve um destino binário para escrita de texto sem fechá-lo no final."""
+    return io.TextIOWrapper(destino, encoding="utf-8", newline="", write_through=True)
+
+
+def escrever_txt(secoes, destino, data_geracao=None):
+    data_geracao = data_geracao or datetime.now().strftime('%d/%m/%Y %H:%M')
+    texto = _destino_texto(destino)
+    try:
+        texto.write(f"Exportado em: {data_geracao}\n")
+        for secao in secoes:
+            texto.write(f"\n{secao.titulo}\n" + "=" * 50 + "\n")
+            for linha in secao.linhas:
+                texto.write(secao.formatar(linha) + "\n")
+    finally:
+        texto.detach()
+
+
+def escrever_csv(secoes, destino, data_geracao=None):
+    """Um bloco por seção: título, cabeçalho e linhas, separados por uma linha em branco."""
+    texto = _destino_texto(destino)
+    try:
+        escritor = csv.writer(texto)
+        for i, secao in enumerate(secoes):
+            if i:
+                escritor.writerow(())
+            escritor.writerow((secao.titulo,))
+            escritor.writerow(secao.cabecalho)
+            escritor.writerows(secao.linhas)
+    finally:
+        texto.detach()
+
+
+def escrever_xlsx(secoes, destino, data_geracao=None):
+    """Uma planilha por seção, no modo write-only do openpyxl (linhas vão para disco ao serem anexadas)."""
+    from openpyxl import Workbook
+
+    livro = Workbook(write_only=True)
+    for secao in secoes:
+        # Nomes de planilha: até 31 caracteres, sem []:*?/\
+        planilha = livro.create_sheet(title="".join(c for c in secao.titulo if c not in "[]:*?/\\")[:31])
+        planilha.append(secao.cabecalho)
+        for linha in secao.linhas:
+            planilha.append(linha)
+    livro.save(destino)
+
+
+def escrever_pdf(secoes, destino, data_geracao=None):
+    data_geracao = data_geracao or datetime.now().strftime('%d/%m/%Y')
+    pdf = None
+    for secao in secoes:
+        if pdf is None:
+            pdf = _novo_pdf(_texto_pdf(secao.titulo), data_geracao)
+        else:
+            pdf.add_page()
+            pdf.set_font("DejaVu", "", 16)
+            pdf.cell(0, 10, _texto_pdf(secao.titulo), 0, 1, "C")
+            pdf.ln(4)
+        pdf.set_font("DejaVu", "", 11)
+        for linha in secao.linhas:
+            pdf.multi_cell(0, 8, _texto_pdf(secao.formatar(linha)), new_x="LMARGIN", new_y="NEXT")
+    if pdf is None:
+        pdf = _novo_pdf("Exportação", data_geracao)
+    destino.write(pdf.output())
+
+
+FORMATOS_EXPORTACAO = {
+    "txt": (escrever_txt, "text/plain"),
+    "csv": (escrever_csv, "text/csv"),
+    "xlsx": (escrever_xlsx, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "pdf": (escrever_pdf, "application/pdf"),
+}
+
+
+def exportar(formato, secoes, destino, data_geracao=None):
+    """Escreve as seções no formato pedido em `destino` (caminho ou arquivo binário aberto)."""
+    escrever, _ = FORMATOS_EXPORTACAO[formato]
+    if isinstance(destino, (str, os.PathLike)):
+        with open(destino, "wb") as arquivo:
+            escrever(secoes, arquivo, data_geracao)
+    else:
+        escrever(secoes, destino, data_geracao)
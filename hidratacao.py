@@ -0,0 +1,163 @@
+"""Série temporal de hidratação: um byte por dia, por usuário.
+
+Os 8 copos de um dia já ficam na sessão como bitmask (bit j = copo j); aqui a
+máscara é guardada por data real em um arquivo binário por usuário:
+
+    cabeçalho (12 bytes): "HIDR", versão, 3 bytes livres, data de origem (ordinal, uint32)
+    dados: um byte por dia a partir da origem (0 = nenhum copo)
+
+Marcar um copo grava um único byte na posição do dia (dias novos estendem o
+arquivo, os intervalos sem registro ficam zerados), então a escrita não
+depende do tamanho do histórico. Anos de registros ocupam poucos KB e são
+lidos de uma vez com NumPy; os rollups (média semanal em litros, sequências
+de dias na meta) são operações vetorizadas sobre esse array.
+"""
+import os
+import struct
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+
+from armazenamento import USUARIO_PADRAO, TravaArquivo, nome_shard
+
+COPOS_POR_DIA = 8
+LITROS_POR_COPO = 0.25
+
+_MAGICO = b"HIDR"
+_VERSAO = 1
+_CABECALHO = struct.Struct("<4sB3xI")
+# Número de copos de cada máscara possível (popcount de um byte)
+_COPOS = np.array([bin(m).count("1") for m in range(256)], dtype=np.uint8)
+
+
+class ArmazenamentoHidratacao:
+    """Máscaras diárias de hidratação em `pasta/<usuário>.hidr`."""
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+        os.makedirs(pasta, exist_ok=True)
+        self._lock = threading.Lock()
+        self._travas = {}
+
+    def _caminho(self, usuario):
+        return os.path.join(self.pasta, f"{nome_shard(usuario)}.hidr")
+
+    def _trava(self, usuario):
+        with self._lock:
+            trava = self._travas.get(usuario)
+            if trava is None:
+                trava = self._travas[usuario] = TravaArquivo(self._caminho(usuario) + ".lock")
+            return trava
+
+    def serie(self, usuario=USUARIO_PADRAO):
+        """(data de origem, array uint8 com uma máscara por dia); (None, vazio) sem registros."""
+        try:
+            with open(self._caminho(usuario), "rb") as f:
+                cabecalho = f.read(_CABECALHO.size)
+                mascaras = np.frombuffer(f.read(), dtype=np.uint8)
+        except FileNotFoundError:
+            return None, np.zeros(0, dtype=np.uint8)
+        magico, versao, origem = _CABECALHO.unpack(cabecalho)
+        if magico != _MAGICO or versao != _VERSAO:
+            raise ValueError(f"arquivo de hidratação inválido: {self._caminho(usuario)}")
+        return date.fromordinal(origem), mascaras
+
+    def carregar_periodo(self, inicio, dias, usuario=USUARIO_PADRAO):
+        """Máscaras de `dias` dias a partir de `inicio` (zeros onde não há registro)."""
+        origem, mascaras = self.serie(usuario)
+        periodo = np.zeros(dias, dtype=np.uint8)
+        if origem is None:
+            return periodo
+        deslocamento = (inicio - origem).days
+        de, ate = max(deslocamento, 0), min(deslocamento + dias, len(mascaras))
+        if de < ate:
+            periodo[de - deslocamento:ate - deslocamento] = mascaras[de:ate]
+        return periodo
+
+    def registrar(self, dia, mascara, usuario=USUARIO_PADRAO):
+        """Grava a máscara de um dia (um byte no lugar; só um dia antes da origem reescreve o arquivo)."""
+        caminho = self._caminho(usuario)
+        with self._trava(usuario):
+            origem, mascaras = self.serie(usuario)
+            if origem is None or dia < origem:
+                # Arquivo novo, ou nova origem mais antiga: reescreve com os dias anteriores zerados
+                anteriores = 1 if origem is None else (origem - dia).days
+                dados = np.concatenate((np.zeros(anteriores, dtype=np.uint8), mascaras))
+                dados[0] = mascara
+                self._reescrever(caminho, dia, dados)
+                return
+            with open(caminho, "r+b") as f:
+                # Escrever depois do fim estende o arquivo; o intervalo fica preenchido com zeros
+                f.seek(_CABECALHO.size + (dia - origem).days)
+                f.write(bytes((mascara,)))
+
+    @staticmethod
+    def _reescrever(caminho, origem, mascaras):
+        tmp = f"{caminho}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_CABECALHO.pack(_MAGICO, _VERSAO, origem.toordinal()))
+            f.write(mascaras.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, caminho)
+
+
+# --- ROLLUPS ---
+def copos(mascaras):
+    """Número de copos marcados em cada dia."""
+    return _COPOS[np.asarray(mascaras, dtype=np.uint8)]
+
+
+def litros(mascaras):
+    return copos(mascaras) * LITROS_POR_COPO
+
+
+def medias_semanais(origem, mascaras, ate=None):
+    """(início de cada semana, média de litros por dia) até `ate` (inclusive).
+
+    Semanas de segunda a domingo; dias sem registro contam como zero e dias
+    depois de `ate` (ex.: o resto da semana atual) ficam de fora da média.
+    """
+    if origem is None or not len(mascaras):
+        return [], np.zeros(0)
+    ate = ate or origem + timedelta(days=len(mascaras) - 1)
+    total_dias = (ate - origem).days + 1
+    if total_dias <= 0:
+        return [], np.zeros(0)
+    valores = np.zeros(total_dias)
+    n = min(total_dias, len(mascaras))
+    valores[:n] = litros(mascaras[:n])
+
+    # Alinha o início em uma segunda-feira e completa a última semana, marcando o que é dia real
+    antes = origem.weekday()
+    depois = -(antes + total_dias) % 7
+    valores = np.pad(valores, (antes, depois)).reshape(-1, 7)
+    reais = np.pad(np.ones(total_dias), (antes, depois)).reshape(-1, 7)
+    medias = valores.sum(axis=1) / reais.sum(axis=1)
+    primeira = origem - timedelta(days=antes)
+    return [primeira + timedelta(weeks=i) for i in range(len(medias))], medias
+
+
+def sequencias(origem, mascaras, ate, meta=COPOS_POR_DIA):
+    """(sequência atual, maior sequência) de dias seguidos com pelo menos `meta` copos.
+
+    A sequência atual termina em `ate` ou, se a meta de `ate` ainda não foi
+    batida, no dia anterior (o dia de hoje ainda está em andamento).
+    """
+    if origem is None:
+        return 0, 0
+    total_dias = (ate - origem).days + 1
+    if total_dias <= 0:
+        return 0, 0
+    na_meta = np.zeros(total_dias, dtype=np.int8)
+    n = min(total_dias, len(mascaras))
+    na_meta[:n] = copos(mascaras[:n]) >= meta
+
+    # Início e fim de cada trecho de dias na meta
+    bordas = np.diff(np.concatenate(([0], na_meta, [0])))
+    inicios, fins = np.flatnonzero(bordas == 1), np.flatnonzero(bordas == -1)
+    maior = int((fins - inicios).max()) if len(inicios) else 0
+    ultimo = total_dias if na_meta[-1] else total_dias - 1
+    atual = int(ultimo - inicios[-1]) if len(fins) and fins[-1] == ultimo else 0
+    return atual, maior
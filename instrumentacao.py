@@ -0,0 +1,173 @@
+"""Medição de tempo por execução (rerun) do app.
+
+Cada execução do script vira um registro {fase: ms}: o script abre o registro
+com `iniciar`, envolve as fases com `with medidor.fase("nome")` e fecha com
+`finalizar`, que guarda o registro nas últimas N execuções da sessão e anexa
+uma linha JSON ao arquivo de log. Fragmentos reexecutados sozinhos abrem o
+próprio registro com `execucao` (numa execução completa ele vale como fase).
+
+Desligado, `fase` devolve sempre o mesmo contexto vazio e `iniciar`/`finalizar`
+retornam na hora, então o custo é de uma chamada de método por fase.
+
+Para o início a frio (processo novo, ex.: réplica que acabou de subir),
+`perfil_importacao` roda o import dos módulos em um interpretador novo com
+`-X importtime` e devolve os mais caros, e `modulos_carregados` diz quais dos
+módulos pesados (pandas, pyarrow, fpdf...) já foram importados pelo processo.
+"""
+import contextlib
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+_NULO = contextlib.nullcontext()
+_trava_log = threading.Lock()
+
+# Módulos que o app só deve importar no primeiro uso (histórico, gráficos, PDF, XLSX)
+MODULOS_PESADOS = ("pandas", "pyarrow", "altair", "fpdf", "fontTools", "openpyxl")
+# "import time: self [us] | cumulative | imported package"
+_LINHA_IMPORTTIME = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+class _Fase:
+    __slots__ = ("medidor", "nome", "inicio")
+
+    def __init__(self, medidor, nome):
+        self.medidor = medidor
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registro = self.medidor.atual
+        if registro is not None:
+            fases = registro["fases"]
+            fases[self.nome] = fases.get(self.nome, 0.0) + (time.perf_counter() - self.inicio) * 1000
+        return False
+
+
+class MedidorTempos:
+    """Fases cronometradas de cada execução, com histórico das últimas `max_execucoes`."""
+
+    def __init__(self, ativo=False, arquivo_log=None, max_execucoes=50):
+        self.ativo = ativo
+        self.arquivo_log = arquivo_log
+        self.execucoes = deque(maxlen=max_execucoes)
+        self.atual = None
+
+    def iniciar(self, tipo="app", inicio=None):
+        """Abre o registro de uma execução (um registro aberto e não finalizado é descartado).
+
+        `inicio` (perf_counter) permite contar no total o que rodou antes do registro, como os imports.
+        """
+        if not self.ativo:
+            return
+        self.atual = {"tipo": tipo, "inicio": inicio or time.perf_counter(), "fases": {}}
+
+    def acrescentar(self, nome, ms):
+        """Soma a uma fase um tempo medido fora de `fase` (ex.: os imports do topo do script)."""
+        if self.atual is not None:
+            fases = self.atual["fases"]
+            fases[nome] = fases.get(nome, 0.0) + ms
+
+    def fase(self, nome):
+        return _Fase(self, nome) if self.ativo else _NULO
+
+    def finalizar(self):
+        """Fecha o registro aberto, guarda no histórico e anexa ao log."""
+        if not self.ativo or self.atual is None:
+            return
+        registro, self.atual = self.atual, None
+        registro["fases"]["total"] = (time.perf_counter() - registro.pop("inicio")) * 1000
+        registro["momento"] = datetime.now().isoformat(timespec="milliseconds")
+        self.execucoes.append(registro)
+        if self.arquivo_log:
+            self._gravar(registro)
+
+    @contextlib.contextmanager
+    def execucao(self, tipo):
+        """Fase dentro de uma execução completa; execução própria quando o fragmento roda sozinho."""
+        if not self.ativo:
+            yield
+            return
+        if self.atual is not None:
+            with self.fase(tipo):
+                yield
+            return
+        self.iniciar(tipo)
+        try:
+            yield
+        finally:
+            self.finalizar()
+
+    def _gravar(self, registro):
+        linha = json.dumps(
+            {"momento": registro["momento"], "tipo": registro["tipo"],
+             "fases_ms": {nome: round(ms, 3) for nome, ms in registro["fases"].items()}},
+            ensure_ascii=False,
+        )
+        os.makedirs(os.path.dirname(self.arquivo_log) or ".", exist_ok=True)
+        # Uma linha por execução; a trava evita linhas intercaladas entre sessões do mesmo processo.
+        with _trava_log, open(self.arquivo_log, "a", encoding="utf-8") as f:
+            f.write(linha + "\n")
+
+    def resumo(self):
+        """{fase: {"p50", "p95", "ultima", "n"}} sobre as execuções guardadas (em ms)."""
+        por_fase = {}
+        for registro in self.execucoes:
+            for nome, ms in registro["fases"].items():
+                por_fase.setdefault(nome, []).append(ms)
+        resumo = {}
+        for nome, valores in por_fase.items():
+            p50, p95 = np.percentile(valores, [50, 95])
+            resumo[nome] = {"p50": float(p50), "p95": float(p95), "ultima": valores[-1], "n": len(valores)}
+        return resumo
+
+
+# --- PERFIL DE INICIALIZAÇÃO ---
+def modulos_carregados(modulos=MODULOS_PESADOS):
+    """Quais dos `modulos` o processo atual já importou."""
+    return [modulo for modulo in modulos if modulo in sys.modules]
+
+
+def perfil_importacao(modulos, limite=15, cwd=None):
+    """Importa `modulos` em um interpretador novo com `-X importtime`.
+
+    Devolve (total em ms, [(módulo, ms acumulado, ms próprio)]) com os `limite`
+    módulos de maior tempo acumulado (que inclui as dependências importadas por eles).
+    """
+    # O que o interpretador importa antes do código (site, .pth) não conta
+    inicializacao = {linha[3] for linha in _importtime("pass", cwd)}
+    entradas, total_us = [], 0
+    for proprio, acumulado, recuo, nome in _importtime("import " + ", ".join(modulos), cwd):
+        if nome in inicializacao:
+            continue
+        # Sem recuo = import de primeiro nível; a soma deles é o tempo total de importação
+        if len(recuo) == 1:
+            total_us += acumulado
+        entradas.append((nome, acumulado / 1000, proprio / 1000))
+    entradas.sort(key=lambda entrada: entrada[1], reverse=True)
+    return total_us / 1000, entradas[:limite]
+
+
+def _importtime(codigo, cwd):
+    """Linhas (próprio us, acumulado us, recuo, módulo) do `-X importtime` ao rodar `codigo`."""
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo], capture_output=True, text=True, cwd=cwd, check=True
+    )
+    linhas = []
+    for linha in processo.stderr.splitlines():
+        encontrado = _LINHA_IMPORTTIME.match(linha)
+        if encontrado:
+            proprio, acumulado, recuo, nome = encontrado.groups()
+            linhas.append((int(proprio), int(acumulado), recuo, nome))
+    return linhas
@@ -0,0 +1,196 @@
+"""Migração dos planos em texto livre da versao2 (planner_data.json) para o formato estruturado.
+
+Na versao2 cada refeição é um texto livre ({dia: {refeição: "texto"}}); a
+partir da versao3 o plano guarda seleções do catálogo
+({dia: {categoria: {"meal", "people"}}}). Este script converte um arquivo ou
+uma pasta inteira de arquivos antigos:
+
+    python migracao.py ARQUIVO_OU_PASTA DESTINO [--processos N]
+
+- os arquivos são distribuídos entre processos (um por núcleo, por padrão), com
+  um número limitado de tarefas em andamento, então a pasta pode ter milhares
+  de arquivos sem que a lista inteira fique em memória;
+- cada arquivo concluído é registrado no manifesto (DESTINO/.manifesto_migracao.jsonl)
+  com a assinatura (mtime, tamanho) do original; rodar de novo pula o que já
+  foi migrado e não mudou, então uma migração interrompida continua de onde parou;
+- textos que não batem pelas palavras-chave passam pela busca aproximada
+  (trigramas de nomes e ingredientes, ver busca.BuscaAproximada), aceita só com
+  uma receita claramente à frente das outras;
+- os textos sem correspondência (ou ambíguos) ficam de fora do plano e vão para
+  o relatório DESTINO/nao_encontrados.csv, gerado a partir do manifesto.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+
+from armazenamento import escrever_atomico
+from busca import BuscaAproximada, CorrespondenciaReceitas
+from compartilhado import (
+    CATALOGO_FILE, DIAS_SEMANA, executar_em_lote, imprimir_resumo, listar_arquivos, progresso_periodico,
+)
+
+MANIFESTO = ".manifesto_migracao.jsonl"
+RELATORIO = "nao_encontrados.csv"
+
+# Categorias da versao2 que mudaram de nome no catálogo
+MAPA_CATEGORIAS = {"Ceia/Extra 🌙": "Doce ou extra 🍬"}
+
+# "2x omelete", "omelete (3 pessoas)", "omelete p/ 2"
+_PESSOAS = re.compile(r"^\s*(\d+)\s*x\s+|\(?\b(?:para|p/)\s*(\d+)\b\)?|\(?\b(\d+)\s*pessoas?\b\)?", re.IGNORECASE)
+
+
+def separar_pessoas(texto):
+    """("2x omelete") -> ("omelete", 2); sem indicação, 1 pessoa."""
+    encontrado = _PESSOAS.search(texto)
+    if not encontrado:
+        return texto.strip(), 1
+    pessoas = int(next(g for g in encontrado.groups() if g))
+    return (texto[:encontrado.start()] + texto[encontrado.end():]).strip(), max(pessoas, 1)
+
+
+# --- TRABALHO DE CADA PROCESSO ---
+_correspondencia = None
+
+
+def _iniciar_processo(caminho_catalogo):
+    """Carrega o catálogo (e monta o índice de trigramas) uma vez por processo."""
+    global _correspondencia
+    with open(caminho_catalogo, "r", encoding="utf-8") as f:
+        catalogo = json.load(f)
+    busca = BuscaAproximada.do_dicionario(catalogo["refeicoes"])
+    _correspondencia = CorrespondenciaReceitas(catalogo["categorias"], busca)
+
+
+def converter_plano(dados, correspondencia):
+    """Converte um plano da versao2; devolve (plano estruturado, lista de não encontrados)."""
+    plano = {}
+    nao_encontrados = []
+    for dia in DIAS_SEMANA:
+        for categoria_antiga, texto in (dados.get(dia) or {}).items():
+            if not isinstance(texto, str) or not texto.strip():
+                continue
+            categoria = MAPA_CATEGORIAS.get(categoria_antiga, categoria_antiga)
+            descricao, pessoas = separar_pessoas(texto)
+            refeicao, motivo = correspondencia.encontrar(categoria, descricao)
+            if refeicao is None:
+                nao_encontrados.append([dia, categoria_antiga, texto, motivo])
+            else:
+                plano.setdefault(dia, {})[categoria] = {"meal": refeicao, "people": pessoas}
+    if (dados.get("observacoes") or "").strip():
+        nao_encontrados.append(["", "observacoes", dados["observacoes"], "observações não têm campo no formato novo"])
+    return plano, nao_encontrados
+
+
+def migrar_arquivo(origem, destino):
+    """Converte um arquivo (executado nos processos do pool)."""
+    try:
+        with open(origem, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+        plano, nao_encontrados = converter_plano(dados, _correspondencia)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        escrever_atomico(destino, plano)
+        slots = sum(len(refeicoes) for refeicoes in plano.values())
+        return {"status": "ok", "slots": slots, "nao_encontrados": nao_encontrados}
+    except (OSError, ValueError) as erro:
+        return {"status": "erro", "erro": f"{type(erro).__name__}: {erro}"}
+
+
+# --- ORQUESTRAÇÃO ---
+def _assinatura(caminho):
+    stat = os.stat(caminho)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def ler_manifesto(caminho):
+    """{arquivo relativo: última entrada}; uma linha final incompleta (queda no meio) é ignorada."""
+    entradas = {}
+    if os.path.exists(caminho):
+        with open(caminho, "r", encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    entrada = json.loads(linha)
+                except ValueError:
+                    continue
+                entradas[entrada["arquivo"]] = entrada
+    return entradas
+
+
+def escrever_relatorio(entradas, caminho):
+    with open(caminho, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(("arquivo", "dia", "refeição", "texto", "motivo"))
+        for arquivo, entrada in sorted(entradas.items()):
+            if entrada["status"] == "erro":
+                escritor.writerow((arquivo, "", "", "", entrada["erro"]))
+            for linha in entrada.get("nao_encontrados", ()):
+                escritor.writerow((arquivo, *linha))
+
+
+def migrar(origem, destino, processos=None, catalogo=CATALOGO_FILE, em_andamento_por_processo=4, progresso=None):
+    """Migra `origem` (arquivo ou pasta) para `destino`; devolve um resumo com as contagens.
+
+    `progresso(feitos)`, se dado, é chamado a cada arquivo concluído.
+    """
+    os.makedirs(destino, exist_ok=True)
+    caminho_manifesto = os.path.join(destino, MANIFESTO)
+    manifesto = ler_manifesto(caminho_manifesto)
+    resumo = {"migrados": 0, "pulados": 0, "erros": 0, "slots": 0, "nao_encontrados": 0}
+
+    def tarefas():
+        for caminho, relativo in listar_arquivos(origem):
+            assinatura = _assinatura(caminho)
+            anterior = manifesto.get(relativo)
+            if anterior is not None and anterior["status"] == "ok" and anterior["assinatura"] == assinatura:
+                resumo["pulados"] += 1
+                continue
+            yield (relativo, assinatura), (caminho, os.path.join(destino, relativo))
+
+    with open(caminho_manifesto, "a", encoding="utf-8") as arquivo_manifesto:
+        def registrar(chave, resultado):
+            relativo, assinatura = chave
+            entrada = {"arquivo": relativo, "assinatura": assinatura, **resultado}
+            arquivo_manifesto.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+            arquivo_manifesto.flush()
+            manifesto[relativo] = entrada
+            if resultado["status"] == "ok":
+                resumo["migrados"] += 1
+                resumo["slots"] += resultado["slots"]
+                resumo["nao_encontrados"] += len(resultado["nao_encontrados"])
+            else:
+                resumo["erros"] += 1
+            if progresso:
+                progresso(resumo["migrados"] + resumo["erros"])
+
+        executar_em_lote(
+            migrar_arquivo, tarefas(), registrar, processos, _iniciar_processo, (catalogo,), em_andamento_por_processo
+        )
+
+    escrever_relatorio(manifesto, os.path.join(destino, RELATORIO))
+    return resumo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migra planos em texto livre (versao2) para o formato estruturado.")
+    parser.add_argument("origem", help="arquivo planner_data.json ou pasta com vários deles")
+    parser.add_argument("destino", help="pasta onde os planos convertidos, o manifesto e o relatório são gravados")
+    parser.add_argument("--processos", type=int, help="número de processos (padrão: um por núcleo)")
+    parser.add_argument("--catalogo", default=CATALOGO_FILE, help="catálogo de receitas usado na correspondência")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    resumo = migrar(args.origem, args.destino, args.processos, args.catalogo,
+                    progresso=progresso_periodico("arquivos migrados"))
+    imprimir_resumo([
+        ("Migrados", resumo["migrados"]), ("já migrados (pulados)", resumo["pulados"]), ("erros", resumo["erros"]),
+        ("refeições convertidas", resumo["slots"]), ("não encontradas", resumo["nao_encontrados"]),
+    ], inicio)
+    print(f"Relatório: {os.path.join(args.destino, RELATORIO)}")
+    return 1 if resumo["erros"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""Geração automática do plano semanal com meta diária de calorias.
+
+Cada dia é resolvido por programação dinâmica sobre as categorias: as calorias
+das receitas são arredondadas para faixas de `resolucao` kcal, e o menor custo
+de cada soma depois de cada categoria é um vetor obtido por convolução (min, +)
+com o custo das faixas disponíveis na categoria. Como a DP depende só do número
+de faixas (e não do número de receitas), a semana inteira é resolvida em poucos
+milissegundos mesmo com milhares de receitas por categoria.
+
+Restrições:
+- opções por categoria: só receitas do catálogo listadas na categoria;
+- ingredientes excluídos: `permitidas` (ids vindos de busca.IndiceIngredientes);
+- variedade: uma receita usada em um dia não volta nos `variedade - 1` dias
+  seguintes; dentro do dia, a reconstrução evita repetir a mesma receita em duas
+  categorias sempre que a soma permitir. As receitas bloqueadas não saem das
+  opções: cada uma reaproveitada custa 1, e o dia fica com a soma da janela de
+  menor custo (repete o mínimo de receitas necessário para caber na meta). Os
+  dias que repetiram alguma receita são informados em `relaxados`.
+"""
+import math
+
+import numpy as np
+
+from catalogo import NENHUMA
+
+# Custo de uma soma inalcançável (folga para somar os custos das categorias sem estourar)
+INVIAVEL = np.iinfo(np.int64).max // 4
+
+
+class GeradorPlano:
+    """Prepara as opções por categoria uma vez; `gerar` monta planos a cada mudança de restrição."""
+
+    def __init__(self, catalogo, refeicoes_disponiveis, resolucao=10):
+        self.catalogo = catalogo
+        self.resolucao = resolucao
+        self.categorias = list(refeicoes_disponiveis)
+        # Por categoria: ids das receitas do catálogo e suas faixas de calorias.
+        # Pratos customizados não têm calorias conhecidas e ficam de fora.
+        self.receitas = {}
+        self.faixas = {}
+        for categoria, pratos in refeicoes_disponiveis.items():
+            ids = sorted({catalogo.receita_id[p] for p in pratos if p in catalogo.receita_id})
+            ids = np.array(ids, dtype=np.int64)
+            self.receitas[categoria] = ids
+            self.faixas[categoria] = np.rint(catalogo.calorias[ids] / resolucao).astype(np.int64)
+
+    def gerar(self, dias, meta, tolerancia, variedade=1, permitidas=None, opcionais=(), semente=0):
+        """Monta um plano para `dias` com `meta` ± `tolerancia` kcal por dia.
+
+        `opcionais` são categorias que podem ficar em "Nenhuma". Retorna um dict com
+        `plano` ({dia: {categoria: refeição}}), `kcal` ({dia: total}), `relaxados`
+        (dias que repetiram alguma receita bloqueada pela variedade) e `fora_da_meta` (dias cujo total real de
+        calorias ficou fora da tolerância; sem solução, o dia recebe o total mais próximo possível).
+        """
+        rng = np.random.default_rng(semente)
+        limite = int(math.floor((meta + tolerancia) / self.resolucao))
+        janela = (int(math.ceil((meta - tolerancia) / self.resolucao)), limite)
+        alvo = meta / self.resolucao
+
+        # Candidatas fixas por categoria (opções + ingredientes excluídos)
+        candidatas = {}
+        for categoria in self.categorias:
+            ids, faixas = self.receitas[categoria], self.faixas[categoria]
+            manter = faixas <= limite
+            if permitidas is not None:
+                manter &= np.isin(ids, np.fromiter(permitidas, dtype=np.int64, count=len(permitidas)))
+            candidatas[categoria] = (ids[manter], faixas[manter])
+
+        resultado = {"plano": {}, "kcal": {}, "relaxados": [], "fora_da_meta": []}
+        recentes = []  # receitas usadas em cada um dos dias anteriores
+        for dia in dias:
+            bloqueadas = set().union(*recentes[-(variedade - 1):]) if variedade > 1 else set()
+            escolha = self._resolver_dia(candidatas, limite, janela, alvo, opcionais, bloqueadas, rng)
+            if escolha is None:
+                # Sem solução na tolerância: o total mais próximo abaixo do limite (todas as categorias opcionais)
+                escolha = self._resolver_dia(candidatas, limite, (0, limite), alvo, self.categorias, bloqueadas, rng)
+
+            ids = [rid for rid in escolha.values() if rid is not None]
+            if bloqueadas.intersection(ids):
+                resultado["relaxados"].append(dia)
+            resultado["plano"][dia] = {
+                categoria: NENHUMA if rid is None else self.catalogo.receitas[rid] for categoria, rid in escolha.items()
+            }
+            total = float(self.catalogo.calorias[ids].sum()) if ids else 0.0
+            resultado["kcal"][dia] = total
+            # A DP trabalha com faixas arredondadas: a soma real pode escapar da janela em até
+            # meia faixa por categoria, então a tolerância é conferida de novo com as calorias reais.
+            if abs(total - meta) > tolerancia:
+                resultado["fora_da_meta"].append(dia)
+            recentes.append(set(ids))
+        return resultado
+
+    def _resolver_dia(self, candidatas, limite, janela, alvo, opcionais, bloqueadas, rng):
+        """DP de um dia: na janela, a soma com menos receitas bloqueadas e, entre essas, a mais próxima do alvo."""
+        bloqueio = np.fromiter(bloqueadas, dtype=np.int64, count=len(bloqueadas))
+        opcoes = []
+        # custos[i][s]: menor número de receitas bloqueadas para somar s com as i primeiras categorias
+        custos = [np.full(limite + 1, INVIAVEL, dtype=np.int64)]
+        custos[0][0] = 0
+        for categoria in self.categorias:
+            ids, faixas = candidatas[categoria]
+            bloqueada = np.isin(ids, bloqueio)
+            # Custo de cada faixa: 0 se há receita livre nela, 1 se só há receitas bloqueadas
+            custo_faixa = np.full(limite + 1, INVIAVEL, dtype=np.int64)
+            np.minimum.at(custo_faixa, faixas, bloqueada.astype(np.int64))
+            # Categoria opcional, ou sem nenhuma receita depois dos filtros (opções, ingredientes
+            # excluídos, limite de calorias), pode ficar em "Nenhuma"
+            if categoria in opcionais or not len(ids):
+                custo_faixa[0] = 0
+            opcoes.append((ids, faixas, bloqueada, custo_faixa))
+            # Convolução (min, +) com as faixas disponíveis na categoria
+            anterior, proximo = custos[-1], np.full(limite + 1, INVIAVEL, dtype=np.int64)
+            for valor in np.flatnonzero(custo_faixa < INVIAVEL):
+                np.minimum(proximo[valor:], anterior[:limite + 1 - valor] + custo_faixa[valor], out=proximo[valor:])
+            custos.append(proximo)
+
+        na_janela = custos[-1][janela[0]:janela[1] + 1]
+        somas = np.flatnonzero(na_janela < INVIAVEL)
+        if not len(somas):
+            return None
+        menor_custo = na_janela[somas].min()
+        somas = somas[na_janela[somas] == menor_custo] + janela[0]
+        distancias = np.abs(somas - alvo)
+        melhores = somas[distancias == distancias.min()]
+        soma = int(rng.choice(melhores))
+        restante = int(menor_custo)
+
+        # Reconstrói de trás para frente sorteando entre as faixas que mantêm a soma com o mesmo custo
+        escolha = {}
+        usadas = set()
+        for i in range(len(self.categorias) - 1, -1, -1):
+            categoria = self.categorias[i]
+            ids, faixas, bloqueada, custo_faixa = opcoes[i]
+            anteriores = custos[i]
+            valores = np.flatnonzero(custo_faixa[:soma + 1] + anteriores[soma - np.arange(soma + 1)] == restante)
+            ja_usada = np.isin(ids, np.fromiter(usadas, dtype=np.int64, count=len(usadas)))
+            # Receitas de cada faixa com o custo dela (as livres, quando a faixa custa 0)
+            por_valor = {int(v): (faixas == v) & (~bloqueada if custo_faixa[v] == 0 else True) for v in valores}
+            # Prefere faixas com alguma receita ainda não usada no dia (ou "Nenhuma")
+            preferidos = [v for v, mascara in por_valor.items() if np.any(mascara & ~ja_usada) or not np.any(mascara)]
+            valor = int(rng.choice(preferidos or valores))
+            mascara = por_valor[valor]
+            if not np.any(mascara):
+                escolha[categoria] = None
+            else:
+                livres = ids[mascara & ~ja_usada]
+                rid = int(rng.choice(livres if len(livres) else ids[mascara]))
+                escolha[categoria] = rid
+                usadas.add(rid)
+            soma -= valor
+            restante -= int(custo_faixa[valor])
+        return {categoria: escolha[categoria] for categoria in self.categorias}
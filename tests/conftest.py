@@ -0,0 +1,50 @@
+"""Catálogo pequeno e fixo usado pelos testes (mesmo formato do banco de dados/receitas.json)."""
+import pytest
+
+from catalogo import RegrasExclusao, compilar_catalogo
+from compartilhado import SHOPPING_LIST_EXCLUSIONS
+
+REFEICOES = {
+    "Omelete": {
+        "ingredients": [
+            {"name": "Ovo", "quantity": 2, "unit": "unidades"},
+            {"name": "Leite", "quantity": 50, "unit": "ml"},
+            {"name": "Sal", "quantity": 1, "unit": "pitada"},
+        ],
+        "calories": 300,
+        "nutrients": {"protein": 20, "carbs": 5, "fat": 18, "fiber": 1},
+    },
+    "Sanduíche": {
+        "ingredients": [
+            {"name": "Pão integral", "quantity": 2, "unit": "fatias (50g)"},
+            {"name": "Queijo", "quantity": 30, "unit": "g"},
+            {"name": "Ovo", "quantity": 1, "unit": "unidade"},
+        ],
+        "calories": 310,
+    },
+    "Prato do RU": {
+        "ingredients": [
+            {"name": "Arroz", "quantity": 100, "unit": "g cozido"},
+            {"name": "Feijão", "quantity": 80, "unit": "g"},
+            {"name": "Frango", "quantity": 120, "unit": "g"},
+        ],
+        "calories": 550,
+    },
+    "Salada": {
+        "ingredients": [
+            {"name": "Alface", "quantity": 1, "unit": "porção"},
+            {"name": "Salsinha", "quantity": 5, "unit": "g"},
+            {"name": "Sal", "quantity": 1, "unit": "pitada"},
+            {"name": "Azeite", "quantity": 10, "unit": "ml"},
+        ],
+        "calories": 90,
+    },
+}
+CATEGORIAS = {"Café": ["Omelete", "Sanduíche"], "Almoço": ["Prato do RU", "Salada"]}
+DIAS = ["Segunda", "Terça"]
+
+
+@pytest.fixture
+def catalogo():
+    """Catálogo compilado com as exclusões padrão do planner (arroz, feijão, itens do RU, pitadas)."""
+    return compilar_catalogo(REFEICOES, RegrasExclusao(substrings=SHOPPING_LIST_EXCLUSIONS), CATEGORIAS)
@@ -0,0 +1,90 @@
+"""Busca aproximada por trigramas (busca.BuscaAproximada) e correspondência de texto livre."""
+from busca import BuscaAproximada, CorrespondenciaReceitas
+
+NOMES = ["Vitamina de banana", "Panqueca de banana", "Strogonoff leve de frango", "Omelete de claras", "Frango grelhado"]
+INGREDIENTES = [
+    ["Banana", "Leite", "Whey Protein"],
+    ["Banana", "Ovo", "Aveia"],
+    ["Frango", "Creme de leite light", "Champignon"],
+    ["Clara de ovo", "Espinafre"],
+    ["Frango", "Azeite"],
+]
+
+
+def nomes(resultado):
+    return [nome for nome, _ in resultado]
+
+
+def test_trigramas_ignoram_acentos_palavras_vazias_e_expandem_abreviacoes():
+    assert BuscaAproximada.trigramas("Ovo") == {" ov", "ovo", "vo "}
+    assert BuscaAproximada.trigramas("pão com ovo") == BuscaAproximada.trigramas("PAO  ovo")
+    assert BuscaAproximada.trigramas("banana c/ whey") == BuscaAproximada.trigramas("banana whey")
+
+
+def test_tolera_erros_de_digitacao():
+    busca = BuscaAproximada(NOMES, INGREDIENTES)
+    assert nomes(busca.buscar("strogonof"))[0] == "Strogonoff leve de frango"
+    assert nomes(busca.buscar("omelet clara"))[0] == "Omelete de claras"
+
+
+def test_ingredientes_desempatam_nomes_parecidos():
+    busca = BuscaAproximada(NOMES, INGREDIENTES)
+    ranking = busca.buscar("banana c/ whey")
+    assert nomes(ranking)[:2] == ["Vitamina de banana", "Panqueca de banana"]
+
+    # "whey" só aparece nos ingredientes: sem o peso deles, nenhuma receita pontua
+    assert nomes(busca.buscar("whey")) == ["Vitamina de banana"]
+    assert BuscaAproximada(NOMES, INGREDIENTES, peso_ingredientes=0).buscar("whey") == []
+
+
+def test_pontuacao_decrescente_limite_e_minimo():
+    busca = BuscaAproximada(NOMES, INGREDIENTES)
+    ranking = busca.buscar("frango", limite=10)
+    pontos = [p for _, p in ranking]
+    assert pontos == sorted(pontos, reverse=True)
+    assert set(nomes(ranking)) == {"Strogonoff leve de frango", "Frango grelhado"}
+    assert nomes(ranking)[0] == "Frango grelhado"  # nome mais curto: maior cosseno
+
+    assert len(busca.buscar("frango", limite=1)) == 1
+    assert busca.buscar("frango", minimo=pontos[0]) == []
+    assert busca.buscar("xyz") == []
+    assert busca.buscar("") == []
+
+
+def test_candidatas_restringem_o_ranking():
+    busca = BuscaAproximada(NOMES, INGREDIENTES)
+    assert nomes(busca.buscar("frango", candidatas=[2, 3])) == ["Strogonoff leve de frango"]
+    assert busca.buscar("frango", candidatas=[3]) == []
+
+
+def test_orcamento_de_postagens_mantem_o_trigrama_mais_raro():
+    # Com orçamento mínimo só o trigrama mais raro entra, e ele basta para achar a receita
+    busca = BuscaAproximada(NOMES, INGREDIENTES, max_postagens=1)
+    assert nomes(busca.buscar("champignon"))[0] == "Strogonoff leve de frango"
+
+
+def test_construtores_a_partir_do_catalogo(catalogo):
+    do_catalogo = BuscaAproximada.do_catalogo(catalogo)
+    assert do_catalogo.nomes == list(catalogo.receitas)
+    assert nomes(do_catalogo.buscar("omelet"))[0] == "Omelete"
+    # Ingredientes que o catálogo exclui da lista de compras também contam na busca
+    assert nomes(do_catalogo.buscar("feijao"))[0] == "Prato do RU"
+
+    from conftest import REFEICOES
+    assert nomes(BuscaAproximada.do_dicionario(REFEICOES).buscar("sanduiche"))[0] == "Sanduíche"
+
+
+def test_correspondencia_exata_por_palavras_e_aproximada():
+    categorias = {"Lanche": NOMES[:2], "Jantar": NOMES[2:]}
+    sem_busca = CorrespondenciaReceitas(categorias)
+    assert sem_busca.encontrar("Jantar", "frango grelhado") == ("Frango grelhado", "")
+    assert sem_busca.encontrar("Jantar", "strogonoff") == ("Strogonoff leve de frango", "")
+    assert sem_busca.encontrar("Lanche", "banana")[0] is None  # ambíguo
+    assert sem_busca.encontrar("Jantar", "strogonof") == (None, "sem correspondência")
+    assert sem_busca.encontrar("Ceia", "banana") == (None, "categoria desconhecida")
+
+    com_busca = CorrespondenciaReceitas(categorias, BuscaAproximada(NOMES, INGREDIENTES))
+    receita, motivo = com_busca.encontrar("Jantar", "strogonof")
+    assert receita == "Strogonoff leve de frango" and motivo.startswith("aproximada")
+    # A busca fica restrita à categoria: "banana" não vira um prato do jantar
+    assert com_busca.encontrar("Jantar", "banana")[0] is None
@@ -0,0 +1,60 @@
+"""Cardápio em camadas (catalogo.CardapioEmCamadas): base imutável + pratos customizados."""
+import pytest
+
+from catalogo import CardapioEmCamadas
+
+BASE = {"Café": ["Omelete", "Sanduíche"], "Almoço": ["Prato do RU"]}
+
+
+def test_base_se_comporta_como_o_dicionario():
+    cardapio = CardapioEmCamadas.base(BASE)
+    assert list(cardapio) == ["Café", "Almoço"]
+    assert len(cardapio) == 2
+    assert cardapio["Café"] == ("Omelete", "Sanduíche")
+    assert dict(cardapio) == {categoria: tuple(pratos) for categoria, pratos in BASE.items()}
+    with pytest.raises(KeyError):
+        cardapio["Ceia"]
+
+
+def test_com_pratos_nao_altera_a_visao_de_baixo():
+    base = CardapioEmCamadas.base(BASE)
+    com_tapioca = base.com_pratos({"Café": ["Tapioca"]})
+    com_sopa = com_tapioca.com_pratos({"Almoço": ["Sopa"], "Café": ["Crepioca"]})
+
+    assert base["Café"] == ("Omelete", "Sanduíche")
+    assert com_tapioca["Café"] == ("Omelete", "Sanduíche", "Tapioca")
+    assert com_tapioca["Almoço"] == ("Prato do RU",)
+    assert com_sopa["Café"] == ("Omelete", "Sanduíche", "Tapioca", "Crepioca")
+    assert com_sopa["Almoço"] == ("Prato do RU", "Sopa")
+    # Duas sessões podem partir da mesma base sem enxergar os pratos uma da outra
+    assert base.com_pratos({"Café": ["Cuscuz"]})["Café"] == ("Omelete", "Sanduíche", "Cuscuz")
+
+
+def test_sem_duplicatas_e_categorias_desconhecidas_ignoradas():
+    base = CardapioEmCamadas.base(BASE)
+    cardapio = base.com_pratos({"Café": ["Tapioca", "Omelete", "Tapioca"], "Ceia": ["Chá"]})
+
+    assert cardapio["Café"] == ("Omelete", "Sanduíche", "Tapioca")
+    assert "Ceia" not in cardapio
+    assert list(cardapio) == ["Café", "Almoço"]
+
+
+def test_nada_novo_devolve_a_propria_visao():
+    base = CardapioEmCamadas.base(BASE)
+    cardapio = base.com_pratos({"Café": ["Tapioca"]})
+    assert base.com_pratos({}) is base
+    assert base.com_pratos({"Café": ["Omelete"], "Ceia": ["Chá"]}) is base
+    assert cardapio.com_pratos({"Café": ["Tapioca", "Sanduíche"]}) is cardapio
+
+
+def test_contem_percorre_as_camadas():
+    cardapio = CardapioEmCamadas.base(BASE).com_pratos({"Café": ["Tapioca"]})
+    assert cardapio.contem("Café", "Omelete")
+    assert cardapio.contem("Café", "Tapioca")
+    assert not cardapio.contem("Almoço", "Tapioca")
+    assert not cardapio.contem("Ceia", "Omelete")
+
+
+def test_tupla_completa_e_reaproveitada():
+    cardapio = CardapioEmCamadas.base(BASE).com_pratos({"Café": ["Tapioca"]})
+    assert cardapio["Café"] is cardapio["Café"]
@@ -0,0 +1,61 @@
+"""Catálogo compilado (catalogo.CatalogoCompilado): matriz receita × ingrediente e lista de compras."""
+import numpy as np
+
+from catalogo import RegrasExclusao
+from conftest import CATEGORIAS, DIAS, REFEICOES
+
+PLANO = {
+    "Segunda": {"Café": {"meal": "Omelete", "people": 2}, "Almoço": {"meal": "Prato do RU", "people": 1}},
+    "Terça": {"Café": {"meal": "Sanduíche", "people": 1}, "Almoço": {"meal": "Salada", "people": 3}},
+}
+
+
+def lista_direta(plano, regras):
+    """A lista de compras somando as entradas do catálogo uma a uma, sem a matriz."""
+    totais = {}
+    for dia in DIAS:
+        for selecao in plano.get(dia, {}).values():
+            for ing in REFEICOES.get(selecao["meal"], {}).get("ingredients", ()):
+                if not regras.exclui(ing["name"], ing["unit"]):
+                    totais[ing["name"]] = totais.get(ing["name"], 0) + ing["quantity"] * selecao["people"]
+    return totais
+
+
+def test_matriz_tem_uma_linha_por_receita_e_uma_coluna_por_item(catalogo):
+    assert catalogo.shape == (4, 11)
+    assert catalogo.receitas == list(REFEICOES)
+    assert catalogo.categorias == CATEGORIAS
+    # Ovo aparece em duas receitas (com "unidades" e "unidade"), mas é uma coluna só
+    assert catalogo.ingredientes.count("Ovo") == 1
+    assert np.diff(catalogo.indptr).tolist() == [3, 3, 3, 4]
+
+
+def test_lista_compras_igual_a_soma_direta(catalogo):
+    regras = RegrasExclusao()
+    contagem = catalogo.vetor_selecoes(PLANO, DIAS, list(CATEGORIAS))
+    ingredientes, unidades = catalogo.lista_compras(contagem, regras)
+
+    assert ingredientes == lista_direta(PLANO, regras)
+    assert unidades["Ovo"] == "unidade(s)"
+    assert unidades["Leite"] == "ml"
+    assert unidades["Arroz"] == "g cozido"
+
+
+def test_exclusoes_padrao_ficam_fora_da_lista(catalogo):
+    contagem = catalogo.vetor_selecoes(PLANO, DIAS, list(CATEGORIAS))
+    ingredientes, _ = catalogo.lista_compras(contagem)
+
+    assert ingredientes == lista_direta(PLANO, catalogo.regras)
+    assert not {"Arroz", "Feijão", "Sal"} & set(ingredientes)
+
+
+def test_vetor_selecoes_pondera_por_pessoas_e_ignora_pratos_fora_do_catalogo(catalogo):
+    planos = [PLANO, {"Segunda": {"Café": {"meal": "Omelete", "people": 1}, "Almoço": {"meal": "Prato customizado"}}}]
+    contagem = catalogo.vetor_selecoes(planos, DIAS, list(CATEGORIAS))
+
+    assert contagem.tolist() == [3.0, 1.0, 1.0, 3.0]
+
+
+def test_plano_vazio_gera_lista_vazia(catalogo):
+    contagem = catalogo.vetor_selecoes({}, DIAS, list(CATEGORIAS))
+    assert catalogo.lista_compras(contagem) == ({}, {})
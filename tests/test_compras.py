@@ -0,0 +1,100 @@
+"""Listas de compras em lote (compras.py): planos válidos, inválidos e a linha de comando."""
+import csv
+import json
+
+import pytest
+
+import compras
+from conftest import CATEGORIAS, REFEICOES
+
+PLANO = {"Segunda": {"Café": {"meal": "Omelete", "people": 2}}, "Terça": {"Almoço": {"meal": "Prato do RU", "people": 1}}}
+
+
+@pytest.fixture
+def catalogo_json(tmp_path):
+    caminho = tmp_path / "receitas.json"
+    caminho.write_text(json.dumps({"refeicoes": REFEICOES, "categorias": CATEGORIAS}), encoding="utf-8")
+    return str(caminho)
+
+
+def gravar(caminho, conteudo):
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    caminho.write_text(conteudo if isinstance(conteudo, str) else json.dumps(conteudo), encoding="utf-8")
+
+
+def relatorio(destino):
+    with open(destino / compras.RELATORIO, encoding="utf-8", newline="") as f:
+        return list(csv.reader(f))[1:]
+
+
+def test_plano_do_arquivo_aceita_plano_puro_e_arquivo_do_usuario():
+    assert compras.plano_do_arquivo(PLANO) is PLANO
+    assert compras.plano_do_arquivo({"versao": 3, "plano": PLANO}) is PLANO
+    assert compras.plano_do_arquivo({}) == {}
+
+
+@pytest.mark.parametrize("dados, mensagem", [
+    ([PLANO], "não contém um plano"),
+    ({"Segunda": ["Omelete"]}, "esperado um objeto"),
+    ({"Segunda": {"Café": "omelete com pão"}}, "texto livre"),
+    ({"Segunda": {"Café": 3}}, "seleção inválida"),
+    ({"Segunda": {"Café": {"meal": "Omelete", "people": "2"}}}, "people"),
+    ({"Segunda": {"Café": {"meal": "Omelete", "people": True}}}, "people"),
+])
+def test_plano_do_arquivo_rejeita_formatos_invalidos(dados, mensagem):
+    with pytest.raises(ValueError, match=mensagem):
+        compras.plano_do_arquivo(dados)
+
+
+def test_lote_grava_as_listas_e_relata_os_erros_sem_parar(tmp_path, catalogo_json):
+    origem, destino = tmp_path / "planos", tmp_path / "listas"
+    gravar(origem / "ana.json", {"versao": 1, "plano": PLANO})
+    gravar(origem / "sub" / "bia.json", PLANO)
+    gravar(origem / "quebrado.json", "{ nao e json")
+    gravar(origem / "versao2.json", {"Segunda": {"Café": "omelete"}})
+    gravar(origem / "lista.json", [1, 2])
+    gravar(origem / "leia-me.txt", "ignorado")
+
+    resumo = compras.gerar(str(origem), str(destino), ("json", "csv"), processos=1, catalogo=catalogo_json,
+                           data_geracao="18/10/2026")
+
+    assert resumo["planos"] == 2 and resumo["erros"] == 3
+    assert [arquivo for arquivo, _ in relatorio(destino)] == ["lista.json", "quebrado.json", "versao2.json"]
+    assert relatorio(destino)[1][1].startswith("JSONDecodeError")
+    assert (destino / "sub" / "bia_compras.csv").exists()
+    assert not (destino / "quebrado_compras.json").exists()
+
+    lista = json.loads((destino / "ana_compras.json").read_text(encoding="utf-8"))
+    assert lista["plano"] == "ana.json" and lista["gerada_em"] == "18/10/2026"
+    itens = {item["item"] for item in lista["itens"]}
+    # Arroz, feijão e pitadas ficam de fora, como no app
+    assert {"Ovo", "Leite", "Frango"} <= itens and not {"Arroz", "Feijão", "Sal"} & itens
+    assert resumo["itens"] == 2 * len(lista["itens"])
+
+
+def test_palavras_excluidas_e_listas_anteriores_ignoradas(tmp_path, catalogo_json):
+    origem = tmp_path / "planos"
+    gravar(origem / "ana.json", PLANO)
+    compras.gerar(str(origem), str(origem), ("json",), processos=1, catalogo=catalogo_json)
+    # Segunda execução com DESTINO dentro da origem: ana_compras.json não é lido como plano
+    resumo = compras.gerar(str(origem), str(origem), ("json",), palavras_excluidas=["ovo"], processos=1,
+                           catalogo=catalogo_json)
+
+    assert resumo == {"planos": 1, "erros": 0, "itens": resumo["itens"]}
+    itens = {item["item"] for item in json.loads((origem / "ana_compras.json").read_text(encoding="utf-8"))["itens"]}
+    assert "Ovo" not in itens and "Leite" in itens
+
+
+def test_main_devolve_codigo_de_saida(tmp_path, catalogo_json, capsys):
+    origem, destino = tmp_path / "planos", tmp_path / "listas"
+    gravar(origem / "ana.json", PLANO)
+    argumentos = [str(origem), str(destino), "--formatos", "json", "--processos", "1", "--catalogo", catalogo_json]
+    assert compras.main(argumentos) == 0
+
+    gravar(origem / "quebrado.json", "[")
+    assert compras.main(argumentos) == 1
+    assert compras.RELATORIO in capsys.readouterr().out
+
+    with pytest.raises(SystemExit) as saida:
+        compras.main(argumentos[:2] + ["--formatos", "docx"])
+    assert saida.value.code == 2
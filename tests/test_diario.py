@@ -0,0 +1,99 @@
+"""Diário do plano (armazenamento.DiarioPlanner / ArmazenamentoDiario): replay, cauda inválida,
+compactação e fsync em lotes.
+
+    python -m pytest
+"""
+import os
+
+import armazenamento
+from armazenamento import ArmazenamentoDiario, DiarioPlanner, GravadorAutomatico
+
+OVO = {"meal": "Omelete (2 ovos) com legumes", "people": 2}
+WRAP = {"meal": "Wrap com ovo ou frango", "people": 1}
+
+
+def novo_diario(tmp_path, **opcoes):
+    return DiarioPlanner(str(tmp_path / "plano.json"), **opcoes)
+
+
+def test_replay_reconstroi_o_plano(tmp_path):
+    diario = novo_diario(tmp_path)
+    diario.registrar("Segunda", "Almoço 🍲", OVO)
+    diario.registrar("Terça", "Jantar 🥗", WRAP)
+    diario.registrar("Segunda", "Almoço 🍲", None)
+    diario.fechar()
+
+    assert novo_diario(tmp_path).carregar() == {"Segunda": {}, "Terça": {"Jantar 🥗": WRAP}}
+
+
+def test_cauda_incompleta_e_descartada(tmp_path):
+    diario = novo_diario(tmp_path)
+    diario.registrar("Segunda", "Almoço 🍲", OVO)
+    diario.fechar()
+    tamanho_valido = os.path.getsize(diario.journal_path)
+    with open(diario.journal_path, "ab") as f:
+        f.write(b'0badc0de\t["Ter')  # queda no meio de uma escrita
+
+    assert novo_diario(tmp_path).carregar() == {"Segunda": {"Almoço 🍲": OVO}}
+    assert os.path.getsize(diario.journal_path) == tamanho_valido
+
+
+def test_registro_com_crc_errado_encerra_o_replay(tmp_path):
+    diario = novo_diario(tmp_path)
+    diario.registrar("Segunda", "Almoço 🍲", OVO)
+    diario.fechar()
+    tamanho_valido = os.path.getsize(diario.journal_path)
+    with open(diario.journal_path, "ab") as f:
+        f.write(b'00000000\t["Ter\\u00e7a","Jantar",null]\n')
+        f.write(armazenamento._codificar_registro("Quarta", "Jantar 🥗", WRAP))
+
+    # Nada depois do registro inválido é aplicado, e ele sai do arquivo
+    assert novo_diario(tmp_path).carregar() == {"Segunda": {"Almoço 🍲": OVO}}
+    assert os.path.getsize(diario.journal_path) == tamanho_valido
+
+
+def test_compactacao_grava_snapshot_e_zera_o_diario(tmp_path):
+    diario = novo_diario(tmp_path, limite_compactacao=3)
+    diario.registrar("Segunda", "Almoço 🍲", OVO)
+    diario.registrar("Terça", "Almoço 🍲", WRAP)
+    assert os.path.getsize(diario.journal_path) > 0
+    diario.registrar("Quarta", "Almoço 🍲", OVO)
+
+    assert os.path.getsize(diario.journal_path) == 0
+    esperado = {"Segunda": {"Almoço 🍲": OVO}, "Terça": {"Almoço 🍲": WRAP}, "Quarta": {"Almoço 🍲": OVO}}
+    assert armazenamento.ler_snapshot(diario.snapshot_path) == esperado
+    diario.fechar()
+    assert novo_diario(tmp_path).carregar() == esperado
+
+
+def test_diario_antigo_reaplicado_sobre_snapshot_novo(tmp_path):
+    # Queda entre gravar o snapshot e zerar o diário: o replay não muda o resultado
+    diario = novo_diario(tmp_path)
+    diario.registrar("Segunda", "Almoço 🍲", OVO)
+    diario.registrar("Segunda", "Jantar 🥗", WRAP)
+    diario.fechar()
+    armazenamento.escrever_atomico(diario.snapshot_path, diario.carregar())
+
+    assert novo_diario(tmp_path).carregar() == {"Segunda": {"Almoço 🍲": OVO, "Jantar 🥗": WRAP}}
+
+
+def test_fsync_em_lote_e_no_salvamento_explicito(tmp_path, monkeypatch):
+    chamadas = []
+    fsync = os.fsync
+    monkeypatch.setattr(armazenamento.os, "fsync", lambda fd: (chamadas.append(fd), fsync(fd)))
+
+    backend = ArmazenamentoDiario(str(tmp_path / "plano.json"))
+    backend.diario.intervalo_fsync = 3600
+    plano = {"Segunda": {"Almoço 🍲": OVO, "Jantar 🥗": WRAP}}
+    backend.salvar(plano, {("Segunda", "Almoço 🍲")})
+    backend.salvar(plano, {("Segunda", "Jantar 🥗")})
+    assert chamadas == []  # salvamentos automáticos não forçam fsync
+
+    gravador = GravadorAutomatico(backend, debounce=3600)
+    try:
+        gravador.agendar(plano, {("Segunda", "Almoço 🍲")})
+        assert gravador.descarregar() == []
+    finally:
+        gravador.fechar()
+    assert len(chamadas) == 1
+    assert ArmazenamentoDiario(str(tmp_path / "plano.json")).carregar() == plano
@@ -0,0 +1,61 @@
+"""Regras de exclusão da lista de compras (catalogo.RegrasExclusao) e a máscara por entrada do catálogo."""
+import catalogo as modulo_catalogo
+from catalogo import RegrasExclusao
+
+
+def excluidos(catalogo, regras):
+    """Nomes dos ingredientes cujas entradas a máscara das regras marca."""
+    mascara = catalogo.mascara_exclusao(regras)
+    return {catalogo.textos[t] for t in catalogo.nome_entrada[mascara]}
+
+
+def test_substrings_palavras_e_unidades():
+    regras = RegrasExclusao(substrings=["(ru)", "arroz"], palavras=["sal"], unidades=["pitada"])
+
+    assert regras.exclui_nome("Arroz integral")
+    assert regras.exclui_nome("Feijão (RU)")
+    assert regras.exclui_nome("Sal grosso")
+    assert not regras.exclui_nome("Salsinha")  # "sal" só como palavra inteira
+    assert regras.exclui("Orégano", "pitada")
+    assert not regras.exclui_nome("pitada de canela")  # "pitada" só vale na unidade
+    assert not RegrasExclusao().exclui("Arroz", "g")
+
+
+def test_termos_sao_normalizados_e_escapados():
+    regras = RegrasExclusao(substrings=["  LEITE ", ""], palavras=["c++"])
+
+    assert regras.substrings == {"leite"}
+    assert regras.exclui_nome("Leite desnatado")
+    assert regras.exclui_nome("receita c++ de teste")
+    assert not regras.exclui_nome("c")
+
+
+def test_combinar_regras():
+    combinadas = RegrasExclusao(substrings=["arroz"]) | RegrasExclusao(palavras=["sal"])
+
+    assert combinadas.chave == (frozenset({"arroz"}), frozenset({"sal"}), frozenset())
+    assert combinadas.exclui_nome("Arroz") and combinadas.exclui_nome("Sal")
+
+
+def test_mascara_das_regras_padrao(catalogo):
+    # Exclusões padrão: arroz, feijão, (ru) e pitada (no nome ou na unidade)
+    assert excluidos(catalogo, catalogo.regras) == {"Arroz", "Feijão", "Sal"}
+    assert catalogo.mascara_exclusao(catalogo.regras) is catalogo.excluido
+
+
+def test_mascara_por_palavra_nao_pega_prefixo(catalogo):
+    assert excluidos(catalogo, RegrasExclusao(palavras=["sal"])) == {"Sal"}
+    assert excluidos(catalogo, RegrasExclusao(substrings=["sal"])) == {"Sal", "Salsinha"}
+
+
+def test_cache_de_mascaras_e_limitado(catalogo, monkeypatch):
+    monkeypatch.setattr(modulo_catalogo, "MAX_MASCARAS", 2)
+    regras = [RegrasExclusao(palavras=[p]) for p in ("ovo", "leite", "queijo")]
+    primeira = catalogo.mascara_exclusao(regras[0])
+    assert catalogo.mascara_exclusao(RegrasExclusao(palavras=["ovo"])) is primeira  # mesma chave, mesma máscara
+
+    for r in regras[1:]:
+        catalogo.mascara_exclusao(r)
+    assert len(catalogo._mascaras) == 2
+    assert regras[0].chave not in catalogo._mascaras  # a menos usada saiu
+    assert excluidos(catalogo, regras[0]) == {"Ovo"}  # e é recalculada quando volta
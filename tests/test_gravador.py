@@ -0,0 +1,136 @@
+"""Salvamento automático em segundo plano (armazenamento.GravadorAutomatico)."""
+import threading
+import time
+
+import pytest
+
+from armazenamento import GravadorAutomatico
+
+
+class Backend:
+    """Backend falso: registra cada `salvar` e pode falhar as primeiras `falhas` chamadas."""
+
+    def __init__(self, falhas=0):
+        self.falhas = falhas
+        self.chamadas = []
+        self.gravou = threading.Event()
+        self._trava = threading.Lock()
+
+    def salvar(self, plano, slots, inicio_semana=None, usuario="padrao"):
+        with self._trava:
+            self.chamadas.append((usuario, inicio_semana, set(slots)))
+            if len(self.chamadas) <= self.falhas:
+                raise OSError("disco cheio")
+        self.gravou.set()
+
+
+def esperar(condicao, timeout=5.0):
+    limite = time.monotonic() + timeout
+    while not condicao():
+        assert time.monotonic() < limite, "a condição não aconteceu a tempo"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def gravador_de():
+    criados = []
+
+    def criar(backend, **opcoes):
+        criados.append(GravadorAutomatico(backend, **opcoes))
+        return criados[-1]
+
+    yield criar
+    for gravador in criados:
+        gravador.fechar()
+
+
+def test_debounce_junta_as_alteracoes_em_uma_gravacao(gravador_de):
+    backend = Backend()
+    gravador = gravador_de(backend, debounce=0.2)
+    for dia in ("Segunda", "Terça", "Quarta"):
+        gravador.agendar({}, {(dia, "Café")}, usuario="ana")
+
+    assert backend.gravou.wait(5)
+    time.sleep(0.3)
+    assert backend.chamadas == [("ana", None, {("Segunda", "Café"), ("Terça", "Café"), ("Quarta", "Café")})]
+
+
+def test_planos_diferentes_sao_gravados_separadamente(gravador_de):
+    backend = Backend()
+    gravador = gravador_de(backend, debounce=60)
+    gravador.agendar({}, {("Segunda", "Café")}, usuario="ana")
+    gravador.agendar({}, {("Segunda", "Jantar")}, usuario="bia")
+    gravador.agendar({}, {("Segunda", "Almoço")}, inicio_semana="2026-10-12", usuario="ana")
+
+    assert gravador.descarregar() == []
+    assert sorted(backend.chamadas, key=str) == sorted([
+        ("ana", None, {("Segunda", "Café")}),
+        ("bia", None, {("Segunda", "Jantar")}),
+        ("ana", "2026-10-12", {("Segunda", "Almoço")}),
+    ], key=str)
+
+
+def test_descarregar_grava_na_hora_so_o_plano_pedido(gravador_de):
+    backend = Backend()
+    gravador = gravador_de(backend, debounce=60)
+    gravador.agendar({}, {("Segunda", "Café")}, usuario="ana")
+    gravador.agendar({}, {("Segunda", "Jantar")}, usuario="bia")
+
+    assert gravador.descarregar(usuario="ana") == []
+    assert backend.chamadas == [("ana", None, {("Segunda", "Café")})]
+    assert gravador.descarregar(usuario="ana") == []  # nada mais na fila deste plano
+    assert len(backend.chamadas) == 1
+
+
+def test_falhas_repetidas_param_a_thread_ate_o_salvamento_explicito(gravador_de):
+    backend = Backend(falhas=3)
+    gravador = gravador_de(backend, debounce=0.01, max_tentativas=3)
+    gravador.agendar({}, {("Segunda", "Café")}, usuario="ana")
+
+    esperar(lambda: gravador.falha(usuario="ana") is not None)
+    assert isinstance(gravador.falha(usuario="ana"), OSError)
+    assert len(backend.chamadas) == 3
+    time.sleep(0.2)
+    assert len(backend.chamadas) == 3  # desistiu: sem novas tentativas
+
+    assert gravador.descarregar(usuario="ana") == []
+    assert backend.chamadas[-1] == ("ana", None, {("Segunda", "Café")})
+    assert gravador.falha(usuario="ana") is None
+
+
+def test_espera_entre_tentativas_dobra(gravador_de):
+    backend = Backend(falhas=3)
+    gravador = gravador_de(backend, debounce=0.05, max_tentativas=5)
+    instantes = []
+    salvar = backend.salvar
+    backend.salvar = lambda *args: (instantes.append(time.monotonic()), salvar(*args))
+    gravador.agendar({}, {("Segunda", "Café")})
+
+    assert backend.gravou.wait(5)
+    intervalos = [b - a for a, b in zip(instantes, instantes[1:])]
+    assert len(intervalos) == 3
+    for intervalo, esperado in zip(intervalos, (0.05, 0.1, 0.2)):
+        assert intervalo >= esperado * 0.9
+
+
+def test_alteracao_nova_retoma_plano_parado_com_os_slots_antigos(gravador_de):
+    backend = Backend(falhas=1)
+    gravador = gravador_de(backend, debounce=0.01, max_tentativas=1)
+    gravador.agendar({}, {("Segunda", "Café")})
+    esperar(lambda: gravador.falha() is not None)
+
+    gravador.agendar({}, {("Terça", "Jantar")})
+    assert gravador.falha() is None
+    assert backend.gravou.wait(5)
+    assert backend.chamadas[-1][2] == {("Segunda", "Café"), ("Terça", "Jantar")}
+
+
+def test_descarregar_devolve_as_falhas(gravador_de):
+    backend = Backend(falhas=1)
+    gravador = gravador_de(backend, debounce=60)
+    gravador.agendar({}, {("Segunda", "Café")})
+
+    falhas = gravador.descarregar()
+    assert len(falhas) == 1 and isinstance(falhas[0], OSError)
+    assert gravador.descarregar() == []  # voltou para a fila e foi gravado agora
+    assert len(backend.chamadas) == 2
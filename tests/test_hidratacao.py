@@ -0,0 +1,93 @@
+"""Série de hidratação em bitmask (hidratacao.ArmazenamentoHidratacao) e seus rollups."""
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from hidratacao import ArmazenamentoHidratacao, copos, litros, medias_semanais, sequencias
+
+SEGUNDA = date(2026, 10, 12)
+CHEIO = 0xFF  # os 8 copos
+
+
+def test_registrar_e_ler_de_volta(tmp_path):
+    hidratacao = ArmazenamentoHidratacao(str(tmp_path))
+    assert hidratacao.serie()[0] is None
+
+    hidratacao.registrar(SEGUNDA, 0b101)
+    hidratacao.registrar(SEGUNDA + timedelta(days=3), CHEIO)  # pula dois dias
+    hidratacao.registrar(SEGUNDA, 0b111)  # reescreve o byte do dia
+
+    origem, mascaras = hidratacao.serie()
+    assert origem == SEGUNDA
+    assert mascaras.tolist() == [0b111, 0, 0, CHEIO]
+    assert (tmp_path / "padrao.hidr").stat().st_size == 12 + 4  # cabeçalho + um byte por dia
+
+
+def test_dia_anterior_a_origem_move_a_origem(tmp_path):
+    hidratacao = ArmazenamentoHidratacao(str(tmp_path))
+    hidratacao.registrar(SEGUNDA, 1)
+    hidratacao.registrar(SEGUNDA - timedelta(days=2), 3)
+
+    origem, mascaras = hidratacao.serie()
+    assert origem == SEGUNDA - timedelta(days=2)
+    assert mascaras.tolist() == [3, 0, 1]
+
+
+def test_carregar_periodo_completa_com_zeros(tmp_path):
+    hidratacao = ArmazenamentoHidratacao(str(tmp_path))
+    assert hidratacao.carregar_periodo(SEGUNDA, 7).tolist() == [0] * 7
+    hidratacao.registrar(SEGUNDA, 1)
+    hidratacao.registrar(SEGUNDA + timedelta(days=1), 2)
+
+    assert hidratacao.carregar_periodo(SEGUNDA - timedelta(days=2), 5).tolist() == [0, 0, 1, 2, 0]
+    assert hidratacao.carregar_periodo(SEGUNDA + timedelta(days=1), 1).tolist() == [2]
+    assert hidratacao.carregar_periodo(SEGUNDA + timedelta(days=10), 3).tolist() == [0, 0, 0]
+
+
+def test_usuarios_separados_e_arquivo_invalido(tmp_path):
+    hidratacao = ArmazenamentoHidratacao(str(tmp_path))
+    hidratacao.registrar(SEGUNDA, 1, usuario="ana")
+    hidratacao.registrar(SEGUNDA, 2, usuario="bia")
+    assert hidratacao.carregar_periodo(SEGUNDA, 1, usuario="ana").tolist() == [1]
+    assert hidratacao.carregar_periodo(SEGUNDA, 1, usuario="bia").tolist() == [2]
+
+    (tmp_path / "padrao.hidr").write_bytes(b"XXXX" + bytes(8))
+    with pytest.raises(ValueError):
+        hidratacao.serie()
+
+
+def test_copos_e_litros():
+    mascaras = np.array([0, 1, 0b1010, CHEIO], dtype=np.uint8)
+    assert copos(mascaras).tolist() == [0, 1, 2, 8]
+    assert litros(mascaras).tolist() == [0.0, 0.25, 0.5, 2.0]
+
+
+def test_medias_semanais_de_segunda_a_domingo():
+    # Origem numa quarta: a primeira semana começa na segunda anterior e só conta os dias reais
+    origem = SEGUNDA + timedelta(days=2)
+    mascaras = np.array([CHEIO] * 5 + [0b1111] * 3, dtype=np.uint8)  # qua..dom = 2 L; seg..qua = 1 L
+
+    semanas, medias = medias_semanais(origem, mascaras)
+    assert semanas == [SEGUNDA, SEGUNDA + timedelta(weeks=1)]
+    assert medias.tolist() == [2.0, 1.0]
+
+    # `ate` no meio da semana: os dias seguintes ficam fora da média; dias sem registro valem zero
+    semanas, medias = medias_semanais(origem, mascaras, ate=SEGUNDA + timedelta(days=8))
+    assert medias.tolist() == [2.0, 1.0]
+    semanas, medias = medias_semanais(origem, mascaras, ate=SEGUNDA + timedelta(days=13))
+    assert medias.tolist() == [2.0, 3 / 7]
+
+    assert medias_semanais(None, np.zeros(0, dtype=np.uint8))[0] == []
+    assert medias_semanais(origem, mascaras, ate=origem - timedelta(days=1))[0] == []
+
+
+def test_sequencias_na_meta():
+    mascaras = np.array([CHEIO, CHEIO, CHEIO, 1, CHEIO, CHEIO], dtype=np.uint8)
+    fim = SEGUNDA + timedelta(days=5)
+    assert sequencias(SEGUNDA, mascaras, fim) == (2, 3)
+    # Hoje (sem registro) ainda não bateu a meta: a sequência de ontem continua valendo
+    assert sequencias(SEGUNDA, mascaras, fim + timedelta(days=1)) == (2, 3)
+    assert sequencias(SEGUNDA, mascaras, fim + timedelta(days=2)) == (0, 3)
+    assert sequencias(SEGUNDA, mascaras, SEGUNDA + timedelta(days=3), meta=1) == (4, 4)
+    assert sequencias(None, mascaras, fim) == (0, 0)
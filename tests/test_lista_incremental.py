@@ -0,0 +1,74 @@
+"""Lista de compras incremental (catalogo.ListaComprasIncremental): delta por slot alterado."""
+import random
+
+import pytest
+
+from catalogo import ListaComprasIncremental, RegrasExclusao
+from conftest import CATEGORIAS, DIAS
+
+
+def lista_completa(catalogo, plano, regras=None):
+    return catalogo.lista_compras(catalogo.vetor_selecoes(plano, DIAS, list(CATEGORIAS)), regras)
+
+
+def test_troca_de_refeicao_e_de_pessoas(catalogo):
+    lista = ListaComprasIncremental(catalogo)
+    assert lista.atualizar(("Segunda", "Café"), "Omelete", 1)
+    assert lista.lista_compras()[0] == {"Ovo": 2.0, "Leite": 50.0}
+
+    assert lista.atualizar(("Segunda", "Café"), "Omelete", 3)
+    assert lista.lista_compras()[0] == {"Ovo": 6.0, "Leite": 150.0}
+
+    assert lista.atualizar(("Segunda", "Café"), "Sanduíche", 3)
+    assert lista.lista_compras()[0] == {"Ovo": 3.0, "Pão integral": 6.0, "Queijo": 90.0}
+
+
+def test_mesma_selecao_nao_muda_a_lista(catalogo):
+    lista = ListaComprasIncremental(catalogo)
+    lista.atualizar(("Segunda", "Café"), "Omelete", 2)
+    assert not lista.atualizar(("Segunda", "Café"), "Omelete", 2)
+
+
+def test_voltar_a_zero_remove_os_itens(catalogo):
+    lista = ListaComprasIncremental(catalogo)
+    lista.atualizar(("Segunda", "Café"), "Omelete", 2)
+    lista.atualizar(("Terça", "Café"), "Sanduíche", 1)
+
+    assert lista.atualizar(("Segunda", "Café"), "Nenhuma", 2)
+    assert lista.atualizar(("Terça", "Café"), None, 1)
+    assert lista.lista_compras() == ({}, {})
+    assert lista.slots == {}
+    # Sem resíduos de ponto flutuante deixados pelas subtrações
+    assert not lista.totais.any()
+
+
+def test_prato_fora_do_catalogo_nao_entra_na_lista(catalogo):
+    lista = ListaComprasIncremental(catalogo)
+    assert not lista.atualizar(("Segunda", "Almoço"), "Prato customizado", 2)
+    assert lista.lista_compras() == ({}, {})
+
+
+@pytest.mark.parametrize("regras", [None, RegrasExclusao(palavras=["ovo"])])
+def test_sequencia_de_alteracoes_igual_a_lista_do_zero(catalogo, regras):
+    rng = random.Random(7)
+    lista = ListaComprasIncremental(catalogo, regras)
+    plano = {}
+    for _ in range(200):
+        dia, categoria = rng.choice(DIAS), rng.choice(list(CATEGORIAS))
+        meal = rng.choice([*CATEGORIAS[categoria], "Nenhuma"])
+        people = rng.randint(1, 4)
+        plano.setdefault(dia, {})[categoria] = {"meal": meal, "people": people}
+        lista.atualizar((dia, categoria), meal, people)
+
+    ingredientes, unidades = lista.lista_compras()
+    esperado, unidades_esperadas = lista_completa(catalogo, plano, regras)
+    assert ingredientes == pytest.approx(esperado)
+    assert unidades == unidades_esperadas
+
+
+def test_carregar_plano_inteiro(catalogo):
+    plano = {dia: {c: {"meal": pratos[0], "people": 2} for c, pratos in CATEGORIAS.items()} for dia in DIAS}
+    lista = ListaComprasIncremental(catalogo).carregar(plano, DIAS, list(CATEGORIAS))
+
+    assert lista.lista_compras() == lista_completa(catalogo, plano)
+    assert len(lista.slots) == len(DIAS) * len(CATEGORIAS)
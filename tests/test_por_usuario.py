@@ -0,0 +1,78 @@
+"""Armazenamento com um arquivo por usuário (armazenamento.ArmazenamentoPorUsuario)."""
+import threading
+
+from armazenamento import USUARIO_PADRAO, ArmazenamentoPorUsuario, escrever_atomico, nome_shard
+
+CATEGORIAS = ["Café", "Almoço", "Lanche", "Jantar"]
+DIAS = ["Segunda", "Terça", "Quarta"]
+
+
+def selecao(n):
+    return {"meal": f"Prato {n}", "people": n}
+
+
+def test_salvamentos_concorrentes_nao_perdem_slots(tmp_path):
+    # Dois objetos na mesma pasta fazem o papel de dois processos: cada um tem a própria trava
+    # de arquivo e o próprio cache, e os dois salvam slots diferentes do mesmo usuário.
+    backends = [ArmazenamentoPorUsuario(str(tmp_path)), ArmazenamentoPorUsuario(str(tmp_path))]
+    slots = [(dia, categoria) for dia in DIAS for categoria in CATEGORIAS]
+    barreira = threading.Barrier(len(slots))
+
+    def salvar(i, slot):
+        plano = {slot[0]: {slot[1]: selecao(i)}}
+        barreira.wait()
+        backends[i % 2].salvar(plano, {slot}, usuario="ana")
+
+    threads = [threading.Thread(target=salvar, args=(i, slot)) for i, slot in enumerate(slots)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    esperado = {}
+    for i, (dia, categoria) in enumerate(slots):
+        esperado.setdefault(dia, {})[categoria] = selecao(i)
+    for backend in backends:
+        assert backend.carregar(usuario="ana") == esperado
+    assert ArmazenamentoPorUsuario(str(tmp_path))._ler("ana")[0] == len(slots)  # uma versão por salvamento
+
+
+def test_salvar_so_troca_os_slots_alterados(tmp_path):
+    a, b = ArmazenamentoPorUsuario(str(tmp_path)), ArmazenamentoPorUsuario(str(tmp_path))
+    a.salvar({"Segunda": {"Café": selecao(1), "Almoço": selecao(2)}}, {("Segunda", "Café"), ("Segunda", "Almoço")})
+    # b tem uma cópia antiga do plano, mas só alterou o almoço: o café gravado por a continua
+    b.salvar({"Segunda": {"Café": selecao(9), "Almoço": selecao(3)}}, {("Segunda", "Almoço")})
+
+    assert a.carregar() == {"Segunda": {"Café": selecao(1), "Almoço": selecao(3)}}
+
+
+def test_usuarios_ficam_em_arquivos_separados(tmp_path):
+    backend = ArmazenamentoPorUsuario(str(tmp_path))
+    backend.salvar({"Segunda": {"Café": selecao(1)}}, {("Segunda", "Café")}, usuario="Ana Lú")
+    backend.salvar({"Segunda": {"Café": selecao(2)}}, {("Segunda", "Café")}, usuario="ana_l_")
+
+    assert nome_shard("Ana Lú") != nome_shard("ana_l_")
+    assert backend.carregar(usuario="Ana Lú") == {"Segunda": {"Café": selecao(1)}}
+    assert backend.carregar(usuario="ana_l_") == {"Segunda": {"Café": selecao(2)}}
+    assert backend.carregar(usuario="bia") == {}
+
+
+def test_carregar_devolve_copia_e_percebe_mudanca_no_arquivo(tmp_path):
+    backend = ArmazenamentoPorUsuario(str(tmp_path))
+    backend.salvar({"Segunda": {"Café": selecao(1)}}, {("Segunda", "Café")})
+    plano = backend.carregar()
+    plano["Segunda"]["Café"]["people"] = 99
+    assert backend.carregar() == {"Segunda": {"Café": selecao(1)}}
+
+    # Outro processo reescreve o arquivo: a próxima leitura vem do disco, não do cache
+    escrever_atomico(backend._caminho(USUARIO_PADRAO), {"versao": 5, "plano": {"Terça": {"Jantar": selecao(4)}}})
+    assert backend.carregar() == {"Terça": {"Jantar": selecao(4)}}
+
+
+def test_arquivo_legado_vira_o_plano_do_usuario_padrao(tmp_path):
+    legado = tmp_path / "planner_final_selecoes.json"
+    escrever_atomico(str(legado), {"Segunda": {"Café": selecao(1)}})
+    backend = ArmazenamentoPorUsuario(str(tmp_path / "planos"), arquivo_legado=str(legado))
+
+    assert backend.carregar() == {"Segunda": {"Café": selecao(1)}}
+    assert backend.carregar(usuario="bia") == {}
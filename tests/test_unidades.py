@@ -0,0 +1,66 @@
+"""Normalização das unidades do catálogo (unidades.interpretar_unidade / normalizar_entradas)."""
+import pytest
+
+from unidades import CONTAGEM, MASSA, VOLUME, interpretar_unidade, normalizar_entradas
+
+
+@pytest.mark.parametrize("texto, quantidade, esperado", [
+    ("g", 30, (MASSA, "", 1.0, None)),
+    ("kg", 1, (MASSA, "", 1000.0, None)),
+    ("g (1 colher)", 15, (MASSA, "", 1.0, None)),
+    ("g cozido (4 colheres)", 100, (MASSA, "cozido", 1.0, None)),
+    ("ml", 200, (VOLUME, "", 1.0, None)),
+    ("L", 1, (VOLUME, "", 1000.0, None)),
+    ("fatias (50g)", 2, (CONTAGEM, "fatia", 1.0, 25.0)),
+    ("fatia (15g)", 1, (CONTAGEM, "fatia", 1.0, 15.0)),
+    ("Porções", 2, (CONTAGEM, "porcao", 1.0, None)),
+    ("colheres (sopa)", 2, (CONTAGEM, "colher", 1.0, None)),
+    ("", 1, (CONTAGEM, "unidade", 1.0, None)),
+])
+def test_interpretar_unidade(texto, quantidade, esperado):
+    canonica = interpretar_unidade(texto, quantidade)
+    assert (canonica.dimensao, canonica.tipo, canonica.fator, canonica.gramas_por_item) == esperado
+
+
+def test_fatia_com_massa_conhecida_soma_com_gramas():
+    normalizadas, rotulos = normalizar_entradas([
+        ("Queijo", 1, "fatia (15g)"),
+        ("Queijo", 30, "g"),
+        ("Queijo", 2, "fatias"),
+    ])
+    # As fatias viram gramas (15 g cada) e tudo cai na mesma linha da lista
+    assert normalizadas == [(("Queijo", MASSA, ""), 15.0), (("Queijo", MASSA, ""), 30.0), (("Queijo", MASSA, ""), 30.0)]
+    assert rotulos == {("Queijo", MASSA, ""): "g"}
+
+
+def test_contagem_sem_massa_do_ingrediente_fica_em_itens():
+    normalizadas, rotulos = normalizar_entradas([("Pão", 2, "fatias (50g)"), ("Pão", 1, "fatia")])
+
+    assert normalizadas == [(("Pão", CONTAGEM, "fatia"), 2.0), (("Pão", CONTAGEM, "fatia"), 1.0)]
+    assert rotulos == {("Pão", CONTAGEM, "fatia"): "fatia(s) (~25 g cada)"}
+
+
+def test_estado_e_dimensao_separam_linhas():
+    normalizadas, rotulos = normalizar_entradas([
+        ("Arroz", 100, "g cozido"),
+        ("Arroz", 50, "g"),
+        ("Leite", 1, "l"),
+        ("Leite", 200, "ml"),
+        ("Ovo", 2, "unidades"),
+    ])
+
+    assert [chave for chave, _ in normalizadas] == [
+        ("Arroz", MASSA, "cozido"), ("Arroz", MASSA, ""), ("Leite", VOLUME, ""), ("Leite", VOLUME, ""),
+        ("Ovo", CONTAGEM, "unidade"),
+    ]
+    assert [valor for _, valor in normalizadas] == [100.0, 50.0, 1000.0, 200.0, 2.0]
+    assert rotulos[("Arroz", MASSA, "cozido")] == "g cozido"
+    assert rotulos[("Ovo", CONTAGEM, "unidade")] == "unidade(s)"
+
+
+def test_catalogo_compilado_usa_as_unidades_canonicas(catalogo):
+    assert dict(zip(catalogo.ingredientes, catalogo.unidades_itens)) == {
+        "Ovo": "unidade(s)", "Leite": "ml", "Sal": "pitada(s)", "Pão integral": "fatia(s) (~25 g cada)",
+        "Queijo": "g", "Arroz": "g cozido", "Feijão": "g", "Frango": "g", "Alface": "porção(ões)",
+        "Salsinha": "g", "Azeite": "ml",
+    }
@@ -0,0 +1,153 @@
+"""Normalização das unidades do catálogo.
+
+As unidades do catálogo são texto livre ("fatias (50g)", "g (1 colher)",
+"g cozido (4 colheres)"). Cada quantidade é interpretada uma única vez, na
+compilação do catálogo, em um valor numérico canônico:
+
+- massa em gramas ("g", "kg", "mg");
+- volume em mililitros ("ml", "l");
+- contagem de um tipo ("unidade", "fatia", "porção", ...), guardando a massa
+  equivalente quando o texto a informa ("fatias (50g)").
+
+O que sobra do texto ("(1 colher)", "média", "opcional") não muda o que se
+compra e é descartado; a única informação aproveitada dos parênteses é a massa
+equivalente de um item contado, que aparece no rótulo da lista
+("fatia(s) (~15 g cada)").
+Qualificadores de estado ("cozido", "cru") mudam o que se compra, então fazem
+parte da unidade canônica. A agregação da lista de compras passa a ser só soma
+de números já normalizados (ver catalogo.CatalogoCompilado).
+"""
+import re
+import unicodedata
+
+MASSA, VOLUME, CONTAGEM = "massa", "volume", "contagem"
+
+# Fatores para a unidade base de cada dimensão
+FATORES_MASSA = {"g": 1.0, "kg": 1000.0, "mg": 0.001}
+FATORES_VOLUME = {"ml": 1.0, "l": 1000.0}
+
+# Tipos de contagem: forma normalizada (sem acento, singular) -> rótulo exibido
+TIPOS_CONTAGEM = {
+    "unidade": "unidade(s)",
+    "fatia": "fatia(s)",
+    "porcao": "porção(ões)",
+    "colher": "colher(es)",
+    "xicara": "xícara(s)",
+    "pitada": "pitada(s)",
+    "concha": "concha(s)",
+    "scoop": "scoop(s)",
+    "quadrado": "quadrado(s)",
+}
+QUALIFICADORES_ESTADO = {"cozido", "cozida", "cru", "crua"}
+
+_PARENTESES = re.compile(r"\(([^)]*)\)")
+_MASSA_EQUIVALENTE = re.compile(r"(\d+(?:[.,]\d+)?)\s*(kg|mg|g)\b")
+
+
+def _sem_acento(texto):
+    decomposto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def _singular(palavra):
+    """Singular simples das palavras de unidade ("fatias" -> "fatia", "porcoes" -> "porcao")."""
+    if palavra.endswith("oes"):
+        return palavra[:-3] + "ao"
+    if palavra.endswith("res"):
+        return palavra[:-2]
+    if palavra.endswith("s") and len(palavra) > 2:
+        return palavra[:-1]
+    return palavra
+
+
+class UnidadeCanonica:
+    """Resultado da interpretação de uma unidade do catálogo.
+
+    - dimensao: MASSA, VOLUME ou CONTAGEM;
+    - tipo: o tipo de contagem ("fatia"), ou o qualificador de estado da massa/volume ("cozido");
+    - fator: multiplicador da quantidade para a unidade base (g, ml ou 1 por item contado);
+    - gramas_por_item: massa de um item contado, quando o texto informa (senão None).
+    """
+
+    __slots__ = ("dimensao", "tipo", "fator", "gramas_por_item")
+
+    def __init__(self, dimensao, tipo="", fator=1.0, gramas_por_item=None):
+        self.dimensao = dimensao
+        self.tipo = tipo
+        self.fator = fator
+        self.gramas_por_item = gramas_por_item
+
+    @property
+    def chave(self):
+        return (self.dimensao, self.tipo)
+
+    @property
+    def rotulo(self):
+        """Unidade exibida na lista de compras ("g", "g cozido", "fatia(s)")."""
+        if self.dimensao == CONTAGEM:
+            return TIPOS_CONTAGEM.get(self.tipo, f"{self.tipo}(s)")
+        base = "g" if self.dimensao == MASSA else "ml"
+        return f"{base} {self.tipo}" if self.tipo else base
+
+    def __repr__(self):
+        return f"UnidadeCanonica({self.dimensao!r}, {self.tipo!r}, fator={self.fator}, gramas_por_item={self.gramas_por_item})"
+
+
+def interpretar_unidade(unidade, quantidade=1):
+    """Interpreta o texto de uma unidade (com a quantidade da entrada) em uma UnidadeCanonica."""
+    texto = _sem_acento(unidade).strip()
+    parenteses = " ".join(_PARENTESES.findall(texto))
+    principal = _PARENTESES.sub(" ", texto).replace(",", " ").split()
+
+    if not principal:
+        return UnidadeCanonica(CONTAGEM, "unidade")
+
+    primeira, resto = principal[0], principal[1:]
+    estado = " ".join(p for p in resto if p in QUALIFICADORES_ESTADO)
+    if primeira in FATORES_MASSA:
+        return UnidadeCanonica(MASSA, estado, FATORES_MASSA[primeira])
+    if primeira in FATORES_VOLUME:
+        return UnidadeCanonica(VOLUME, estado, FATORES_VOLUME[primeira])
+
+    # Contagem: a massa entre parênteses vale para a quantidade inteira ("2 fatias (50g)" = 25 g/fatia)
+    gramas_por_item = None
+    equivalente = _MASSA_EQUIVALENTE.search(parenteses)
+    if equivalente and quantidade:
+        gramas = float(equivalente.group(1).replace(",", ".")) * FATORES_MASSA[equivalente.group(2)]
+        gramas_por_item = gramas / quantidade
+    return UnidadeCanonica(CONTAGEM, _singular(primeira), 1.0, gramas_por_item)
+
+
+def normalizar_entradas(entradas):
+    """Normaliza as entradas (nome, quantidade, unidade) de um catálogo inteiro.
+
+    Devolve, para cada entrada, (chave_item, quantidade_canonica), onde
+    chave_item = (nome, dimensao, tipo), e um dict {chave_item: rótulo da unidade}.
+
+    Quando um ingrediente aparece em massa e também contado com massa conhecida
+    (ex.: "fatia (15g)" e "g (1 fatia)"), as contagens viram gramas para somar
+    tudo em uma linha só; contagens do mesmo tipo somam entre si diretamente,
+    e a massa conhecida de um item entra no rótulo ("fatia(s) (~15 g cada)").
+    """
+    interpretadas = [(nome, quantidade, interpretar_unidade(unidade, quantidade)) for nome, quantidade, unidade in entradas]
+
+    # Por ingrediente: se há entradas em massa e quanto pesa cada tipo de item contado
+    tem_massa = set()
+    gramas = {}
+    for nome, _, canonica in interpretadas:
+        if canonica.dimensao == MASSA and not canonica.tipo:
+            tem_massa.add(nome)
+        elif canonica.gramas_por_item is not None:
+            gramas.setdefault((nome, canonica.tipo), canonica.gramas_por_item)
+
+    normalizadas, rotulos = [], {}
+    for nome, quantidade, canonica in interpretadas:
+        if canonica.dimensao == CONTAGEM and nome in tem_massa and (nome, canonica.tipo) in gramas:
+            chave, valor, rotulo = (nome, MASSA, ""), quantidade * gramas[(nome, canonica.tipo)], "g"
+        else:
+            chave, valor, rotulo = (nome, *canonica.chave), quantidade * canonica.fator, canonica.rotulo
+            if canonica.dimensao == CONTAGEM and (nome, canonica.tipo) in gramas:
+                rotulo = f"{rotulo} (~{gramas[(nome, canonica.tipo)]:.0f} g cada)"
+        normalizadas.append((chave, valor))
+        rotulos.setdefault(chave, rotulo)
+    return normalizadas, rotulos
@@ -1,11 +1,33 @@
+import time
+# Marca o início do script para medir os imports (só pesam na primeira execução do processo)
+_inicio_script = time.perf_counter()
+
 import streamlit as st
-import json
+import numpy as np
 import os
-from collections import defaultdict
-from datetime import datetime
+from datetime import datetime, timedelta
 import copy
-import re
-from fpdf import FPDF
+import tempfile
+import weakref
+
+# pandas/pyarrow (histórico, grade compacta, gráficos) e fpdf (PDF) são importados
+# só no primeiro uso, para a primeira renderização não esperar por eles
+from armazenamento import (
+    USUARIO_PADRAO, GravadorAutomatico, TravaArquivo, carregar_dados, criar_armazenamento, escrever_atomico,
+    inicio_da_semana, nome_shard,
+)
+from busca import BuscaAproximada, IndiceIngredientes
+from catalogo import NUTRIENTES, CardapioEmCamadas, IndiceOpcoes, ListaComprasIncremental, RegrasExclusao, abrir_catalogo
+from compartilhado import CATALOGO_FILE, DIAS_SEMANA, SHOPPING_LIST_EXCLUSIONS
+from exportacao import (
+    FORMATOS_EXPORTACAO, exportar, formatar_quantidade, generate_pdf_list, hash_lista, linhas_plano, linhas_selecoes,
+    secao_lista, secao_plano,
+)
+from hidratacao import ArmazenamentoHidratacao, litros, medias_semanais, sequencias
+from instrumentacao import MedidorTempos, modulos_carregados
+from otimizador import GeradorPlano
+
+_importacoes_ms = (time.perf_counter() - _inicio_script) * 1000
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__)) 
 
@@ -16,379 +38,704 @@ st.set_page_config(
     layout="wide"
 )
 
-# --- BANCO DE DADOS DE REFEIÇÕES (MESMA ESTRUTURA DA VERSÃO ANTERIOR) ---
-# Fonte das quantidades: Documento fornecido pelo usuário.
-# Fonte das calorias: Pesquisa e estimativa com base nas quantidades.
-REFEICOES_COM_DETALHES = {
-    # Café da Manhã
-    "Banana com cacau, aveia e whey": {
-        "calories": 385,
-        "ingredients": [
-            {"name": "Banana", "quantity": 1, "unit": "unidade média"},
-            {"name": "Cacau 100% em pó", "quantity": 5, "unit": "g"},
-            {"name": "Leite em pó desnatado", "quantity": 20, "unit": "g"},
-            {"name": "Farelo de aveia", "quantity": 10, "unit": "g"},
-            {"name": "Whey Protein", "quantity": 30, "unit": "g"}
-        ]
-    },
-    "Pão integral com queijo e fruta": {
-        "calories": 350,
-        "ingredients": [
-            {"name": "Pão integral", "quantity": 2, "unit": "fatias (50g)"},
-            {"name": "Queijo branco ou muçarela light", "quantity": 2, "unit": "fatias (30g)"},
-            {"name": "Banana ou Maçã", "quantity": 1, "unit": "unidade pequena"}
-        ]
-    },
-    "Wrap com ovo ou frango": {
-        "calories": 320,
-        "ingredients": [
-            {"name": "Pão folha integral (wrap)", "quantity": 1, "unit": "unidade (60g)"},
-            {"name": "Ovo", "quantity": 1, "unit": "unidade"},
-            {"name": "Frango desfiado", "quantity": 60, "unit": "g (opcional)"},
-            {"name": "Queijo", "quantity": 1, "unit": "fatia (15g)"}
-        ]
-    },
-    # Lanches
-    "Fruta com chocolate 70%": {
-        "calories": 160,
-        "ingredients": [
-            {"name": "Fruta (banana, maçã ou mexerica)", "quantity": 1, "unit": "unidade pequena"},
-            {"name": "Chocolate 70%", "quantity": 10, "unit": "g"}
-        ]
-    },
-    "Torradas integrais com requeijão": {
-        "calories": 110,
-        "ingredients": [
-            {"name": "Requeijão light", "quantity": 15, "unit": "g (1 colher)"},
-            {"name": "Torrada integral", "quantity": 2, "unit": "unidades"}
-        ]
-    },
-    "Queijo com fruta": {
-        "calories": 130,
-        "ingredients": [
-            {"name": "Queijo", "quantity": 15, "unit": "g (1 fatia)"},
-            {"name": "Fruta", "quantity": 1, "unit": "unidade"}
-        ]
-    },
-    "Snack de grão-de-bico ou milho": {
-        "calories": 120,
-        "ingredients": [
-            {"name": "Grão-de-bico ou milho torrado", "quantity": 30, "unit": "g"}
-        ]
-    },
-    # Almoço
-    "Almoço no RU": {
-        "calories": 550,
-        "ingredients": [
-            {"name": "Salada crua (RU)", "quantity": 1, "unit": "porção à vontade"},
-            {"name": "Legumes cozidos (RU)", "quantity": 100, "unit": "g (1 concha)"},
-            {"name": "Arroz (RU)", "quantity": 90, "unit": "g (3 colheres)"},
-            {"name": "Feijão (RU)", "quantity": 60, "unit": "g (2 colheres)"},
-            {"name": "Proteína (RU)", "quantity": 100, "unit": "g"}
-        ]
-    },
-    "Strogonoff leve com arroz e legumes": {
-        "calories": 480,
-        "ingredients": [
-            {"name": "Frango (para strogonoff)", "quantity": 100, "unit": "g"},
-            {"name": "Iogurte/Creme de leite leve", "quantity": 30, "unit": "g"},
-            {"name": "Arroz integral", "quantity": 120, "unit": "g cozido (4 colheres)"},
-            {"name": "Legumes refogados", "quantity": 1, "unit": "porção (1/2 prato)"}
-        ]
-    },
-    "Omelete (2 ovos) com legumes": {
-        "calories": 300,
-        "ingredients": [
-            {"name": "Ovo", "quantity": 2, "unit": "unidades"},
-            {"name": "Legumes refogados", "quantity": 1, "unit": "porção (1/2 prato)"}
-        ]
-    },
-    # Jantar
-    "Jantar no RU (versão leve)": {
-        "calories": 400,
-        "ingredients": [
-            {"name": "Salada crua (RU)", "quantity": 1, "unit": "porção à vontade"},
-            {"name": "Legumes cozidos (RU)", "quantity": 100, "unit": "g"},
-            {"name": "Proteína (RU)", "quantity": 100, "unit": "g"},
-            {"name": "Arroz (RU)", "quantity": 30, "unit": "g (1 colher)"}
-        ]
-    },
-    "Marmita (proteína, legumes, carboidrato)": {
-        "calories": 350,
-        "ingredients": [
-            {"name": "Proteína leve (frango, carne magra, ovo)", "quantity": 100, "unit": "g"},
-            {"name": "Legumes", "quantity": 1, "unit": "porção (1/2 prato)"},
-            {"name": "Arroz integral ou Purê de batata doce", "quantity": 60, "unit": "g (2 colheres)"}
-        ]
-    },
-    "Sanduíche integral com ovo": {
-        "calories": 310,
-        "ingredients": [
-            {"name": "Pão integral", "quantity": 2, "unit": "fatias"},
-            {"name": "Queijo", "quantity": 1, "unit": "fatia (15g)"},
-            {"name": "Ovo", "quantity": 1, "unit": "unidade"}
-        ]
-    },
-    "Sopa de legumes com frango": {
-        "calories": 280,
-        "ingredients": [
-            {"name": "Legumes para sopa", "quantity": 1, "unit": "porção"},
-            {"name": "Frango desfiado", "quantity": 80, "unit": "g"},
-            {"name": "Arroz", "quantity": 30, "unit": "g (1 colher, opcional)"}
-        ]
-    },
-    # Doce
-    "Chocolate 70%": {
-        "calories": 55,
-        "ingredients": [{"name": "Chocolate 70%", "quantity": 10, "unit": "g (1 quadrado)"}]
-    },
-    "Brigadeiro fake": {
-        "calories": 230,
-        "ingredients": [
-            {"name": "Banana", "quantity": 1, "unit": "unidade"},
-            {"name": "Cacau 100% em pó", "quantity": 5, "unit": "g"},
-            {"name": "Adoçante", "quantity": 1, "unit": "pitada"},
-            {"name": "Whey Protein", "quantity": 15, "unit": "g (1/2 scoop)"}
-        ]
-    },
-    "Geleia sem açúcar com torrada":{
-        "calories": 90,
-        "ingredients": [
-            {"name": "Geleia sem açúcar", "quantity": 1, "unit": "colher"},
-            {"name": "Torrada integral", "quantity": 1, "unit": "unidade"}
-        ]
-    },
-    "Café com gotas de chocolate":{
-        "calories": 40,
-        "ingredients": [
-            {"name": "Café", "quantity": 1, "unit": "xícara"},
-            {"name": "Gotas de chocolate", "quantity": 3, "unit": "unidades"}
-        ]
-    }
-}
-
-
-REFEICOES_BASE = {
-    "Café da manhã 🍳": ["Banana com cacau, aveia e whey", "Pão integral com queijo e fruta", "Wrap com ovo ou frango"],
-    "Lanche da manhã 🍎": ["Fruta com chocolate 70%", "Torradas integrais com requeijão", "Queijo com fruta", "Snack de grão-de-bico ou milho"],
-    "Almoço 🍲": ["Almoço no RU", "Strogonoff leve com arroz e legumes", "Omelete (2 ovos) com legumes"],
-    "Lanche da tarde 🥪": ["Fruta com chocolate 70%", "Torradas integrais com requeijão", "Queijo com fruta", "Snack de grão-de-bico ou milho"],
-    "Jantar 🥗": ["Jantar no RU (versão leve)", "Marmita (proteína, legumes, carboidrato)", "Sanduíche integral com ovo", "Sopa de legumes com frango"],
-    "Doce ou extra 🍬": ["Chocolate 70%", "Brigadeiro fake", "Geleia sem açúcar com torrada", "Café com gotas de chocolate"]
-}
-
 # --- ARQUIVOS, CONSTANTES E FILTROS ---
 # Usa o BASE_DIR para montar o caminho completo para os arquivos na pasta "banco de dados"
 PLANNER_FILE = os.path.join(BASE_DIR, "banco de dados", "planner_final_selecoes.json")
 CUSTOM_REFEICOES_FILE = os.path.join(BASE_DIR, "banco de dados", "refeicoes_personalizadas_final.json")
-DIAS_SEMANA = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"]
-SHOPPING_LIST_EXCLUSIONS = ['arroz', 'feijão', '(ru)', 'pitada']
+# Pratos customizados de cada usuário (uma camada a mais sobre o catálogo e os pratos compartilhados)
+PERSONALIZADAS_DIR = os.path.join(BASE_DIR, "banco de dados", "personalizadas")
+# O catálogo de refeições (CATALOGO_FILE, compilado em cache binário em "banco de dados/.cache"), os dias
+# da semana e as exclusões padrão da lista de compras vêm do módulo compartilhado com os scripts
+PLANNER_DB_FILE = os.path.join(BASE_DIR, "banco de dados", "planner.sqlite3")
+HISTORICO_FILE = os.path.join(BASE_DIR, "banco de dados", "historico.parquet")
+# Imagens da interface servidas do próprio repositório (nada é buscado na rede a cada renderização).
+# assets/avatar.svg é um desenho próprio que substitui a imagem remota usada antes (vecteezy.com, menina
+# de boné e fones de ouvido), que não pôde ser copiada para o repositório; para voltar a ela, salve o
+# arquivo original em assets/ e aponte AVATAR_FILE para ele (.jpg/.png também funcionam)
+AVATAR_FILE = os.path.join(BASE_DIR, "assets", "avatar.svg")
+# Persistência do plano: "usuarios" (um arquivo por usuário, com trava e cache compartilhado),
+# "diario" (journal append-only + snapshot), "json" (reescreve o arquivo inteiro)
+# ou "sqlite" (histórico por data real em banco SQLite)
+MODO_ARMAZENAMENTO = os.environ.get("PLANNER_ARMAZENAMENTO", "usuarios")
+PLANOS_DIR = os.path.join(BASE_DIR, "banco de dados", "planos")
+# Copos de água por data real (um byte por dia, por usuário), independente do modo de armazenamento do plano
+HIDRATACAO_DIR = os.path.join(BASE_DIR, "banco de dados", "hidratacao")
+# Tempos por fase de cada execução (painel na barra lateral + log JSONL); ligado com PLANNER_TEMPOS=1
+TEMPOS_ATIVOS = os.environ.get("PLANNER_TEMPOS") == "1"
+TEMPOS_LOG_FILE = os.path.join(BASE_DIR, "logs", "tempos_execucao.jsonl")
+ROTULOS_NUTRIENTES = {"kcal": "kcal", "proteina": "Prot. (g)", "carboidratos": "Carb. (g)", "gorduras": "Gord. (g)", "fibras": "Fibras (g)"}
 
 # --- FUNÇÕES AUXILIARES ---
-# (As funções carregar_dados, salvar_dados, format_label, parse_label são mantidas da versão anterior)
-def carregar_dados(filepath):
-    if os.path.exists(filepath):
-        try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {}
-    return {}
-
-def salvar_dados(data, filepath):
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-
-def format_label(meal_name):
-    """Formata o nome da refeição para incluir calorias no selectbox."""
-    details = REFEICOES_COM_DETALHES.get(meal_name)
-    if details:
-        return f"{meal_name} (~{details['calories']} kcal)"
-    return meal_name
-
-def parse_label(formatted_label):
-    """Extrai o nome original da refeição do label formatado."""
-    return re.sub(r'\s\(~\d+\s+kcal\)$', '', formatted_label)
-def generate_pdf_list(shopping_list_data):
-    """Gera um PDF da lista de compras usando uma fonte Unicode empacotada."""
-    ingredientes, unidades = shopping_list_data
-    
-    pdf = FPDF()
-    pdf.add_page()
-    
-    # CORREÇÃO: Define o caminho para a fonte usando o BASE_DIR e a pasta "fonte"
-    font_path = os.path.join(BASE_DIR, "fonte", "DejaVuSans.ttf")
-    
-    # Adiciona a fonte Unicode ao PDF usando o caminho completo.
-    pdf.add_font("DejaVu", "", font_path)
-
-    # Usa a nova fonte "DejaVu"
-    pdf.set_font("DejaVu", "", 16)
-    pdf.cell(0, 10, "Lista de Compras Semanal", 0, 1, "C")
-    
-    pdf.set_font("DejaVu", "", 10)
-    pdf.cell(0, 8, f"Gerada em: {datetime.now().strftime('%d/%m/%Y')}", 0, 1, "C")
-    pdf.ln(10)
-
-    pdf.set_font("DejaVu", "", 12)
-    for item, quantidade in sorted(ingredientes.items()):
-        unidade = unidades.get(item, "unidade(s)")
-        quantidade_str = f"{int(quantidade)}" if quantidade == int(quantidade) else f"{quantidade:.2f}".replace('.00', '')
-        
-        item_line = f"□  {quantidade_str} {unidade} de {item}"
-        pdf.cell(0, 10, item_line, 0, 1)
-
-    return bytes(pdf.output(dest='S'))
+# (carregar_dados e salvar_dados agora ficam no módulo armazenamento)
+@st.cache_resource
+def catalogo_em_cache(mtime_ns):
+    """Catálogo compilado, compartilhado entre sessões; `mtime_ns` recarrega quando o arquivo muda."""
+    return abrir_catalogo(CATALOGO_FILE, RegrasExclusao(substrings=SHOPPING_LIST_EXCLUSIONS))
+
+def carregar_catalogo():
+    return catalogo_em_cache(os.stat(CATALOGO_FILE).st_mtime_ns)
+
+@st.cache_resource
+def indice_ingredientes_em_cache(mtime_ns):
+    """Índice invertido de ingredientes do catálogo, montado uma vez por versão do arquivo."""
+    return IndiceIngredientes(catalogo_em_cache(mtime_ns))
+
+def carregar_indice_ingredientes():
+    return indice_ingredientes_em_cache(os.stat(CATALOGO_FILE).st_mtime_ns)
+
+@st.cache_resource
+def busca_aproximada_em_cache(mtime_ns):
+    """Índice de trigramas dos nomes e ingredientes das receitas (texto livre -> receitas)."""
+    return BuscaAproximada.do_catalogo(catalogo_em_cache(mtime_ns))
+
+def carregar_busca_aproximada():
+    return busca_aproximada_em_cache(os.stat(CATALOGO_FILE).st_mtime_ns)
+
+def assinatura_arquivo(caminho):
+    """mtime do arquivo (None se não existir), usado como chave dos caches."""
+    try:
+        return os.stat(caminho).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+@st.cache_resource
+def cardapio_compartilhado(mtime_catalogo, assinatura_customizadas):
+    """Catálogo + pratos de refeicoes_personalizadas_final.json: uma visão imutável para todas as sessões."""
+    base = CardapioEmCamadas.base(catalogo_em_cache(mtime_catalogo).categorias)
+    return base.com_pratos(carregar_dados(CUSTOM_REFEICOES_FILE))
+
+@st.cache_resource(max_entries=64)
+def opcoes_em_cache(mtime_catalogo, assinatura_customizadas, arquivo_usuario, assinatura_usuario):
+    """(cardápio, IndiceOpcoes, GeradorPlano) de uma visão; sem pratos do usuário, a mesma entrada serve todas as sessões."""
+    cardapio = cardapio_compartilhado(mtime_catalogo, assinatura_customizadas)
+    if arquivo_usuario is not None:
+        cardapio = cardapio.com_pratos(carregar_dados(arquivo_usuario))
+    catalogo_atual = catalogo_em_cache(mtime_catalogo)
+    return cardapio, IndiceOpcoes(cardapio, catalogo_atual), GeradorPlano(catalogo_atual, cardapio)
+
+def arquivo_personalizadas(usuario):
+    return os.path.join(PERSONALIZADAS_DIR, f"{nome_shard(usuario)}.json")
+
+@st.cache_resource
+def obter_armazenamento():
+    """Um único backend de persistência por processo (compartilhado entre sessões)."""
+    return criar_armazenamento(MODO_ARMAZENAMENTO, PLANNER_FILE, PLANNER_DB_FILE, DIAS_SEMANA, PLANOS_DIR)
+
+@st.cache_resource
+def obter_hidratacao():
+    return ArmazenamentoHidratacao(HIDRATACAO_DIR)
+
+@st.cache_resource
+def obter_gravador():
+    """Fila de salvamento automático (thread em segundo plano) do processo."""
+    return GravadorAutomatico(obter_armazenamento())
+
+@st.cache_data(max_entries=32)
+def rollup_historico(caminho, mtime, periodo, usuario):
+    """Rollup de calorias do Parquet do histórico; `mtime` invalida o cache quando o arquivo é regerado."""
+    from analise import carregar_historico, rollup_calorias
+
+    return rollup_calorias(carregar_historico(caminho, usuario), carregar_catalogo(), periodo)
+
+@st.cache_data(max_entries=32)
+def pdf_lista_compras(chave, _shopping_list_data, data_geracao):
+    """PDF em cache pelo hash do conteúdo; `_shopping_list_data` não entra no hash do Streamlit."""
+    return generate_pdf_list(_shopping_list_data, data_geracao)
+
+@st.cache_resource
+def carregar_avatar():
+    """Avatar lido uma vez por processo: o texto do SVG ou os bytes de uma imagem (.jpg, .png)."""
+    if AVATAR_FILE.endswith(".svg"):
+        with open(AVATAR_FILE, "r", encoding="utf-8") as f:
+            return f.read()
+    with open(AVATAR_FILE, "rb") as f:
+        return f.read()
 
 
 # --- INICIALIZAÇÃO DO ESTADO DA SESSÃO ---
 # (Mantida da versão anterior)
+if 'medidor' not in st.session_state:
+    st.session_state.medidor = MedidorTempos(TEMPOS_ATIVOS, TEMPOS_LOG_FILE)
+medidor = st.session_state.medidor
+medidor.iniciar(inicio=_inicio_script)
+medidor.acrescentar("importacoes", _importacoes_ms)
+
+with medidor.fase("armazenamento"):
+    armazenamento = obter_armazenamento()
+with medidor.fase("catalogo"):
+    catalogo = carregar_catalogo()
+
+if 'semana' not in st.session_state:
+    st.session_state.semana = inicio_da_semana(datetime.now().date())
+
+if 'usuario' not in st.session_state:
+    # O usuário vem da URL (?usuario=...), para cada pessoa abrir direto o próprio plano. Nos modos
+    # com um plano só ("json", "diario") todos usam o usuário padrão, para a hidratação e os pratos
+    # customizados não ficarem separados por usuário enquanto o plano é compartilhado.
+    usuario_url = st.query_params.get("usuario") if armazenamento.por_usuario else None
+    st.session_state.usuario = usuario_url or USUARIO_PADRAO
+
 if 'selecoes' not in st.session_state:
-    st.session_state.selecoes = carregar_dados(PLANNER_FILE)
+    with medidor.fase("carregar_plano"):
+        st.session_state.selecoes = armazenamento.carregar(st.session_state.semana, st.session_state.usuario)
+    # Slots (dia, categoria) alterados desde o último salvamento
+    st.session_state.slots_alterados = set()
+
+class MarcadorSessao:
+    """Objeto guardado no estado da sessão; quando a sessão é descartada, a fila de gravação é adiantada."""
+
+if 'marcador_sessao' not in st.session_state:
+    st.session_state.marcador_sessao = MarcadorSessao()
+    weakref.finalize(st.session_state.marcador_sessao, obter_gravador().antecipar)
+
+def autosalvar():
+    """Com o salvamento automático ligado, enfileira os slots alterados (a gravação fica com a thread do gravador)."""
+    if st.session_state.get("autosave") and st.session_state.slots_alterados:
+        obter_gravador().agendar(
+            copy.deepcopy(st.session_state.selecoes), st.session_state.slots_alterados,
+            st.session_state.semana, st.session_state.usuario
+        )
+        st.session_state.slots_alterados = set()
+
+def carregar_cardapio():
+    """Opções da sessão: a visão compartilhada do cardápio, mais a camada de pratos do usuário (se houver).
+
+    Os objetos vêm do cache e são compartilhados; nenhuma sessão os altera.
+    """
+    arquivo = arquivo_personalizadas(st.session_state.usuario)
+    assinatura = assinatura_arquivo(arquivo)
+    cardapio, indice, gerador = opcoes_em_cache(
+        os.stat(CATALOGO_FILE).st_mtime_ns, assinatura_arquivo(CUSTOM_REFEICOES_FILE),
+        arquivo if assinatura is not None else None, assinatura
+    )
+    st.session_state.refeicoes_disponiveis = cardapio
+    st.session_state.indice_opcoes = indice
+    st.session_state.gerador_plano = gerador
+
+def recarregar_plano():
+    """Troca o plano da sessão (outra semana ou outro usuário) e descarta o estado derivado do anterior."""
+    st.session_state.selecoes = armazenamento.carregar(st.session_state.semana, st.session_state.usuario)
+    st.session_state.slots_alterados = set()
+    carregar_cardapio()
+    for chave in ('lista_incremental', 'hidratacao', 'grade_base', 'grade_semana'):
+        st.session_state.pop(chave, None)
+    # Descarta os valores dos widgets do plano anterior
+    for chave in [k for k in st.session_state if k.endswith(("_meal", "_people")) or k.startswith("agua_")]:
+        del st.session_state[chave]
 
 if 'refeicoes_disponiveis' not in st.session_state:
-    refeicoes_customizadas = carregar_dados(CUSTOM_REFEICOES_FILE)
-    refeicoes_merged = copy.deepcopy(REFEICOES_BASE)
-    for categoria, pratos in refeicoes_customizadas.items():
-        if categoria in refeicoes_merged:
-            for prato in pratos:
-                if prato not in refeicoes_merged[categoria]:
-                    refeicoes_merged[categoria].append(prato)
-    st.session_state.refeicoes_disponiveis = refeicoes_merged
-    
-if 'lista_compras' not in st.session_state:
-    st.session_state.lista_compras = None
+    # Opções dos selectboxes (ordenadas, com ids e rótulos) compartilhadas entre as sessões
+    with medidor.fase("mesclar_customizadas"):
+        carregar_cardapio()
 
 # --- INTERFACE ---
 st.title("🥑 Planner Alimentar Inteligente")
-st.markdown("Planeje sua semana, defina o número de pessoas, controle sua hidratação e gere a lista de compras para levar ao mercado.")
+st.markdown("Planeje sua semana, defina o número de pessoas, controle sua hidratação e acompanhe a lista de compras para levar ao mercado.")
 
 # --- BARRA LATERAL ---
 with st.sidebar:
-    st.image("https://static.vecteezy.com/system/resources/previews/010/897/232/original/avatar-icon-of-girl-in-a-baseball-cap-and-with-headphones-in-a-flat-style-vector.jpg", width=120)
+    st.image(carregar_avatar(), width=120)
     st.header("Ações")
 
+    # A troca de usuário só aparece quando o armazenamento guarda um plano por usuário
+    if armazenamento.por_usuario:
+        st.session_state.setdefault("campo_usuario", st.session_state.usuario)
+        usuario = st.text_input("Usuário", key="campo_usuario").strip() or USUARIO_PADRAO
+        if usuario != st.session_state.usuario:
+            st.session_state.usuario = usuario
+            st.query_params["usuario"] = usuario
+            recarregar_plano()
+
+    # Com histórico por data, escolhe a semana a planejar (qualquer dia dela)
+    if armazenamento.por_data:
+        semana = inicio_da_semana(st.date_input("Semana", value=datetime.now().date(), format="DD/MM/YYYY", key="data_semana"))
+        if semana != st.session_state.semana:
+            st.session_state.semana = semana
+            recarregar_plano()
+        st.caption(f"Semana de {semana.strftime('%d/%m/%Y')}")
+
+    autosave = st.toggle("Salvar automaticamente", value=False, key="autosave")
     if st.button("Salvar Plano Semanal", use_container_width=True, type="primary"):
-        salvar_dados(st.session_state.selecoes, PLANNER_FILE)
-        st.toast('Plano salvo com sucesso!', icon='✅')
-
-    if st.button("Gerar Lista de Compras", use_container_width=True):
-        aggregated_ingredients = defaultdict(float)
-        unidades = {}
-        
-        for dia in DIAS_SEMANA:
-            for categoria in st.session_state.refeicoes_disponiveis.keys():
-                selecao = st.session_state.selecoes.get(dia, {}).get(categoria, {})
-                refeicao_selecionada = selecao.get('meal')
-                num_pessoas = selecao.get('people', 1)
-
-                if refeicao_selecionada and refeicao_selecionada != "Nenhuma":
-                    detalhes = REFEICOES_COM_DETALHES.get(refeicao_selecionada)
-                    if detalhes:
-                        for ing in detalhes['ingredients']:
-                            # Lógica de exclusão da lista de compras
-                            ing_name_lower = ing['name'].lower()
-                            ing_unit_lower = ing['unit'].lower()
-                            if not any(ex in ing_name_lower or ex in ing_unit_lower for ex in SHOPPING_LIST_EXCLUSIONS):
-                                key = ing['name'].strip()
-                                aggregated_ingredients[key] += ing['quantity'] * num_pessoas
-                                unidades[key] = ing['unit']
-
-        st.session_state.lista_compras = (aggregated_ingredients, unidades)
-        st.toast('Lista de compras gerada!', icon='📝')
-    
-    # Adicionar prato customizado (opcional)
+        # Passa pela mesma fila do salvamento automático, para nunca gravar fora de ordem
+        gravador = obter_gravador()
+        gravador.agendar(
+            copy.deepcopy(st.session_state.selecoes), st.session_state.slots_alterados,
+            st.session_state.semana, st.session_state.usuario
+        )
+        falhas = gravador.descarregar(st.session_state.usuario, st.session_state.semana)
+        # Mesmo com falha as alterações ficam na fila do gravador, que tenta de novo sozinho
+        st.session_state.slots_alterados = set()
+        if falhas:
+            st.error(f"Não foi possível salvar o plano ({falhas[0]}). Uma nova tentativa será feita automaticamente.")
+        else:
+            st.toast('Plano salvo com sucesso!', icon='✅')
+    # A thread do gravador não fala com a interface: o erro de quando ela desiste vai para a sessão
+    erro = obter_gravador().falha(st.session_state.usuario, st.session_state.semana)
+    st.session_state.falha_autosave = None if erro is None else str(erro)
+    if st.session_state.falha_autosave:
+        st.error(
+            f"O salvamento em segundo plano falhou várias vezes ({st.session_state.falha_autosave}) e foi interrompido. "
+            "Clique em \"Salvar Plano Semanal\" para tentar de novo."
+        )
+    elif autosave:
+        st.caption("💾 Alterações salvas automaticamente em segundo plano.")
+
+    # Exclusões do usuário: palavras inteiras, para "sal" não excluir "salada"
+    exclusoes_usuario = st.text_input(
+        "Não incluir na lista (separe por vírgula)",
+        key="exclusoes_usuario",
+        placeholder="ex.: café, adoçante"
+    )
+
+    # Macros da semana: preenchido pelo fragmento do planner a cada mudança de refeição
+    painel_macros = st.container().empty()
+
+    # Adicionar prato customizado: vai para a camada do usuário, sem mexer no catálogo compartilhado
     with st.expander("➕ Adicionar Prato Customizado"):
-        st.info("Funcionalidade em desenvolvimento.")
-
+        categoria_nova = st.selectbox("Categoria", list(st.session_state.refeicoes_disponiveis), key="novo_prato_categoria")
+        prato_novo = st.text_input("Nome do prato", key="novo_prato_nome").strip()
+        if st.button("Adicionar prato", use_container_width=True, disabled=not prato_novo):
+            if st.session_state.refeicoes_disponiveis.contem(categoria_nova, prato_novo):
+                st.warning("Esse prato já está nessa categoria.")
+            else:
+                arquivo = arquivo_personalizadas(st.session_state.usuario)
+                os.makedirs(PERSONALIZADAS_DIR, exist_ok=True)
+                with TravaArquivo(arquivo + ".lock"):
+                    pratos = carregar_dados(arquivo)
+                    pratos.setdefault(categoria_nova, []).append(prato_novo)
+                    escrever_atomico(arquivo, pratos)
+                carregar_cardapio()
+                # Os ids das opções mudaram; os selectboxes voltam a partir das seleções salvas na sessão
+                for chave in [k for k in st.session_state if k.endswith("_meal")]:
+                    del st.session_state[chave]
+                st.toast(f'"{prato_novo}" adicionado em {categoria_nova}.', icon='➕')
+
+
+# --- LISTA DE COMPRAS INCREMENTAL ---
+# A lista é montada por completo só na primeira execução (ou quando as exclusões mudam);
+# depois disso, cada widget alterado aplica apenas o delta do seu slot.
+regras = catalogo.regras | RegrasExclusao(palavras=exclusoes_usuario.split(","))
+lista_incremental = st.session_state.get('lista_incremental')
+if lista_incremental is None or lista_incremental.regras.chave != regras.chave:
+    with medidor.fase("lista_completa"):
+        lista_incremental = ListaComprasIncremental(catalogo, regras).carregar(
+            st.session_state.selecoes, DIAS_SEMANA, st.session_state.refeicoes_disponiveis.keys()
+        )
+    st.session_state.lista_incremental = lista_incremental
 
 # --- LAYOUT PRINCIPAL (PLANNER E LISTA) ---
-main_cols = st.columns([2, 1.5]) 
-
-with main_cols[0]:
-    st.subheader("🗓️ Seu Plano Semanal")
-    dia_hoje_index = datetime.now().weekday() 
-
-    for i, dia in enumerate(DIAS_SEMANA):
-        with st.expander(f"### {dia}", expanded=(i == dia_hoje_index)):
-            # Lógica de seleção de refeições mantida da versão anterior
-            if dia not in st.session_state.selecoes:
-                st.session_state.selecoes[dia] = {}
-            
-            for categoria, opcoes in st.session_state.refeicoes_disponiveis.items():
-                if categoria not in st.session_state.selecoes[dia]:
-                     st.session_state.selecoes[dia][categoria] = {}
-
-                st.markdown(f"**{categoria}**")
-                meal_cols = st.columns([3, 1]) 
-
-                with meal_cols[0]:
-                    opcoes_formatadas = ["Nenhuma"] + [format_label(o) for o in sorted(opcoes)]
-                    
-                    selecao_atual_formatada = format_label(st.session_state.selecoes[dia][categoria].get('meal', "Nenhuma"))
-                    index_selecao = opcoes_formatadas.index(selecao_atual_formatada) if selecao_atual_formatada in opcoes_formatadas else 0
-                    
-                    escolha_formatada = st.selectbox(
-                        f"sel_{dia}_{categoria}",
-                        options=opcoes_formatadas,
-                        index=index_selecao,
-                        key=f"{dia}_{categoria}_meal",
-                        label_visibility="collapsed"
-                    )
-                    st.session_state.selecoes[dia][categoria]['meal'] = parse_label(escolha_formatada)
-
-                with meal_cols[1]:
-                    st.session_state.selecoes[dia][categoria]['people'] = st.number_input(
-                        f"num_{dia}_{categoria}",
-                        min_value=1,
-                        value=st.session_state.selecoes[dia][categoria].get('people', 1),
-                        step=1,
-                        key=f"{dia}_{categoria}_people",
-                        label_visibility="collapsed"
-                    )
-
-            # --- RASTREADOR DE HIDRATAÇÃO VISUAL ---
-            st.markdown("---")
-            st.markdown(f"💧 **Hidratação** - Meta: 2 litros (250ml por check)")
-            
-            # Inicializa o estado do contador de água para o dia
-            if f"agua_checked_{dia}" not in st.session_state:
-                st.session_state[f"agua_checked_{dia}"] = 0
-            
-            water_cols = st.columns(8)
-            num_checked = 0
-            for j in range(8):
-                if water_cols[j].checkbox(f" ", key=f"agua_{dia}_{j}"):
-                    num_checked += 1
-            
-            litros_consumidos = num_checked * 0.250
-            st.progress(litros_consumidos / 2.0)
-            st.caption(f"**Total: {litros_consumidos:.2f} / 2.00 Litros**")
-
-with main_cols[1]:
-    st.subheader("🛒 Lista de Compras da Semana")
-    if st.session_state.get('lista_compras'):
-        ingredientes, unidades = st.session_state.lista_compras
-        if not ingredientes:
-            st.info("A lista de compras está vazia. Os itens selecionados já foram filtrados ou não precisam de compra (ex: itens do RU, arroz, feijão).")
+def registrar_selecao(dia, categoria, selecao_anterior):
+    """Propaga a seleção atual de um slot para os slots pendentes de salvamento e para a lista de compras."""
+    selecao = st.session_state.selecoes[dia][categoria]
+    # Um slot ainda vazio que só recebeu os valores padrão não conta como alteração
+    refeicao_anterior, pessoas_anterior = selecao_anterior
+    if (selecao['meal'], selecao['people']) != (refeicao_anterior or "Nenhuma", pessoas_anterior or 1):
+        st.session_state.slots_alterados.add((dia, categoria))
+    st.session_state.lista_incremental.atualizar((dia, categoria), selecao['meal'], selecao['people'])
+
+def filtro_ingredientes(categoria, refeicao_atual):
+    """Filtro "com / sem ingredientes" de uma categoria; devolve (opções, posição da refeição atual).
+
+    Os termos são resolvidos no índice invertido (com prefixos pela trie), então o
+    filtro é só interseção/diferença de conjuntos de ids. Uma descrição em texto
+    livre ("banana c/ whey") ordena as opções pela busca aproximada. O filtro
+    vale para a categoria em todos os dias.
+    """
+    indice = st.session_state.indice_opcoes
+    descricao = st.text_input("Descreva a refeição", key=f"texto_livre_{categoria}", placeholder="ex.: banana c/ whey").strip()
+    com = st.text_input("Com ingredientes", key=f"filtro_com_{categoria}", placeholder="ex.: ovo, frango")
+    sem = st.text_input("Sem ingredientes", key=f"filtro_sem_{categoria}", placeholder="ex.: whey")
+    incluir = [t for t in com.split(",") if t.strip()]
+    excluir = [t for t in sem.split(",") if t.strip()]
+
+    # Sugestões para o termo que está sendo digitado
+    digitando = (incluir or excluir or [""])[-1].strip()
+    if digitando:
+        sugestoes = carregar_indice_ingredientes().sugerir(digitando)
+        st.caption("Sugestões: " + (", ".join(sugestoes) if sugestoes else "nenhum ingrediente encontrado"))
+
+    if not incluir and not excluir and not descricao:
+        return indice.opcoes[categoria], indice.posicao(categoria, refeicao_atual)
+
+    atual = indice.id_por_nome.get(refeicao_atual, 0)
+    opcoes = indice.opcoes[categoria]
+    if incluir or excluir:
+        permitidas = carregar_indice_ingredientes().filtrar(incluir, excluir)
+        # "Nenhuma" e a refeição já escolhida continuam disponíveis mesmo fora do filtro
+        opcoes = [
+            rid for rid in opcoes
+            if rid == 0 or rid == atual or catalogo.receita_id.get(indice.nome(rid)) in permitidas
+        ]
+    if descricao:
+        # Só receitas do catálogo entram no ranking; as sem nenhuma semelhança saem da lista
+        por_receita = {catalogo.receita_id[indice.nome(rid)]: rid for rid in opcoes if indice.nome(rid) in catalogo.receita_id}
+        ranking = carregar_busca_aproximada().buscar(descricao, limite=len(por_receita), candidatas=por_receita)
+        ordenadas = [por_receita[catalogo.receita_id[nome]] for nome, _ in ranking]
+        st.caption(f"Mais parecida: {ranking[0][0]}" if ranking else "Nenhuma receita parecida com a descrição")
+        opcoes = [0] + ordenadas + ([atual] if atual and atual not in ordenadas else [])
+    return opcoes, opcoes.index(atual) if atual in opcoes else 0
+
+def renderizar_dia(dia):
+    """Widgets de um único dia: refeições, número de pessoas e hidratação."""
+    if dia not in st.session_state.selecoes:
+        st.session_state.selecoes[dia] = {}
+
+    indice = st.session_state.indice_opcoes
+    for categoria in st.session_state.refeicoes_disponiveis:
+        if categoria not in st.session_state.selecoes[dia]:
+             st.session_state.selecoes[dia][categoria] = {}
+
+        selecao = st.session_state.selecoes[dia][categoria]
+        selecao_anterior = (selecao.get('meal'), selecao.get('people'))
+
+        titulo_cols = st.columns([3, 1])
+        titulo_cols[0].markdown(f"**{categoria}**")
+        with titulo_cols[1].popover("🔎 Filtrar", use_container_width=True):
+            opcoes, index_selecao = filtro_ingredientes(categoria, selecao.get('meal', "Nenhuma"))
+
+        meal_cols = st.columns([3, 1]) 
+
+        with meal_cols[0]:
+            # O selectbox trabalha com ids de refeição; o rótulo com calorias é só exibição
+            escolha = st.selectbox(
+                f"sel_{dia}_{categoria}",
+                options=opcoes,
+                index=index_selecao,
+                format_func=indice.rotulo,
+                key=f"{dia}_{categoria}_meal",
+                label_visibility="collapsed"
+            )
+            st.session_state.selecoes[dia][categoria]['meal'] = indice.nome(escolha)
+
+        with meal_cols[1]:
+            st.session_state.selecoes[dia][categoria]['people'] = st.number_input(
+                f"num_{dia}_{categoria}",
+                min_value=1,
+                value=st.session_state.selecoes[dia][categoria].get('people', 1),
+                step=1,
+                key=f"{dia}_{categoria}_people",
+                label_visibility="collapsed"
+            )
+
+        registrar_selecao(dia, categoria, selecao_anterior)
+
+    # --- RASTREADOR DE HIDRATAÇÃO VISUAL ---
+    st.markdown("---")
+    st.markdown(f"💧 **Hidratação** - Meta: 2 litros (250ml por check)")
+    
+    # Os copos ficam guardados como bitmask por dia, fora dos widgets: os checkboxes de
+    # dias não exibidos deixam de existir, mas a marcação do dia continua salva.
+    # A semana vem da série de hidratação do usuário, e cada mudança grava o byte do dia.
+    armazenamento_agua = obter_hidratacao()
+    if 'hidratacao' not in st.session_state:
+        semana = armazenamento_agua.carregar_periodo(st.session_state.semana, len(DIAS_SEMANA), st.session_state.usuario)
+        st.session_state.hidratacao = dict(zip(DIAS_SEMANA, semana.tolist()))
+    hidratacao = st.session_state.hidratacao
+    mascara_anterior = mascara = hidratacao.get(dia, 0)
+    water_cols = st.columns(8)
+    for j in range(8):
+        if water_cols[j].checkbox(f" ", value=bool(mascara >> j & 1), key=f"agua_{dia}_{j}"):
+            mascara |= 1 << j
         else:
-            # Exibe a lista
-            for item, quantidade in sorted(ingredientes.items()):
-                unidade = unidades.get(item, "unidade(s)")
-                quantidade_str = f"{int(quantidade)}" if quantidade == int(quantidade) else f"{quantidade:.2f}".replace('.00', '')
-                label = f"**{quantidade_str} {unidade}** de {item}"
-                st.checkbox(label, key=f"check_{item}")
-
-            # Botão de Exportar para PDF
-            pdf_data = generate_pdf_list(st.session_state.lista_compras)
+            mascara &= ~(1 << j)
+    hidratacao[dia] = mascara
+    if mascara != mascara_anterior:
+        data_dia = st.session_state.semana + timedelta(days=DIAS_SEMANA.index(dia))
+        armazenamento_agua.registrar(data_dia, mascara, st.session_state.usuario)
+    
+    litros_consumidos = bin(mascara).count("1") * 0.250
+    st.progress(litros_consumidos / 2.0)
+    st.caption(f"**Total: {litros_consumidos:.2f} / 2.00 Litros**")
+
+    origem, mascaras = armazenamento_agua.serie(st.session_state.usuario)
+    hoje = datetime.now().date()
+    atual, recorde = sequencias(origem, mascaras, hoje)
+    sequencia = f"Dias seguidos na meta: {atual} (recorde: {recorde})"
+    # Dias da semana ainda por vir não entram na média; semana que ainda não começou não tem média
+    dias_passados = min((hoje - st.session_state.semana).days + 1, len(DIAS_SEMANA))
+    if dias_passados > 0:
+        media_semana = litros(list(hidratacao.values())).sum() / dias_passados
+        st.caption(f"Média da semana: {media_semana:.2f} L/dia · {sequencia}")
+    else:
+        st.caption(sequencia)
+
+def renderizar_macros(dia=None):
+    """Totais de nutrientes (ponderados por pessoas) do dia aberto e da semana, no painel da barra lateral."""
+    ids, pessoas = catalogo.matriz_selecoes(
+        st.session_state.selecoes, DIAS_SEMANA, st.session_state.refeicoes_disponiveis.keys()
+    )
+    por_dia = catalogo.nutrientes_por_slot(ids, pessoas)[0].sum(axis=-2)
+    semana = por_dia.sum(axis=0)
+    dias_com_refeicao = max(int(np.count_nonzero(por_dia[:, 0])), 1)
+    linhas = [("Semana", semana), ("Média/dia", semana / dias_com_refeicao)]
+    if dia is not None:
+        linhas.insert(0, (dia, por_dia[DIAS_SEMANA.index(dia)]))
+
+    tabela = ["| | " + " | ".join(ROTULOS_NUTRIENTES[n] for n in NUTRIENTES) + " |", "|---|" + "---:|" * len(NUTRIENTES)]
+    tabela += [f"| {rotulo} | " + " | ".join(f"{v:.0f}" for v in valores) + " |" for rotulo, valores in linhas]
+    notas = ["Soma de todas as pessoas de cada refeição."]
+    sem_macros = int(np.count_nonzero((ids >= 0) & ~catalogo.macros_conhecidos[np.maximum(ids, 0)]))
+    if sem_macros:
+        notas.append(f"{sem_macros} refeição(ões) sem macros no catálogo (só kcal).")
+    painel_macros.markdown("**🥗 Macros**\n\n" + "\n".join(tabela) + "\n\n" + " ".join(f"_{n}_" for n in notas))
+
+def renderizar_grade_compacta():
+    """Modo compacto: a semana inteira em um único st.data_editor (linhas = dias)."""
+    categorias = list(st.session_state.refeicoes_disponiveis)
+    # A grade base fica fixa enquanto o modo compacto está aberto; as edições chegam
+    # em `edited_rows` e só os slots editados são aplicados.
+    if 'grade_base' not in st.session_state:
+        linhas = []
+        for dia in DIAS_SEMANA:
+            linha = {"Dia": dia}
+            for categoria in categorias:
+                selecao = st.session_state.selecoes.get(dia, {}).get(categoria, {})
+                linha[categoria] = selecao.get('meal', "Nenhuma")
+                linha[f"👥 {categoria}"] = selecao.get('people', 1)
+            linhas.append(linha)
+        import pandas as pd
+
+        st.session_state.grade_base = pd.DataFrame(linhas).set_index("Dia")
+
+    colunas = {}
+    for categoria in categorias:
+        colunas[categoria] = st.column_config.SelectboxColumn(
+            categoria, options=st.session_state.indice_opcoes.nomes_opcoes[categoria], required=True
+        )
+        colunas[f"👥 {categoria}"] = st.column_config.NumberColumn("👥", min_value=1, step=1, required=True)
+    st.data_editor(st.session_state.grade_base, column_config=colunas, key="grade_semana", use_container_width=True)
+
+    for linha, alteracoes in st.session_state.grade_semana["edited_rows"].items():
+        dia = DIAS_SEMANA[int(linha)]
+        for coluna, valor in alteracoes.items():
+            categoria = coluna.removeprefix("👥 ")
+            selecao = st.session_state.selecoes.setdefault(dia, {}).setdefault(categoria, {})
+            selecao_anterior = (selecao.get('meal'), selecao.get('people'))
+            selecao['people' if coluna != categoria else 'meal'] = valor
+            selecao.setdefault('meal', "Nenhuma")
+            selecao.setdefault('people', 1)
+            registrar_selecao(dia, categoria, selecao_anterior)
+
+def renderizar_lista_compras():
+    st.subheader("🛒 Lista de Compras da Semana")
+    lista_compras = st.session_state.lista_incremental.lista_compras()
+    ingredientes, unidades = lista_compras
+    if not ingredientes:
+        st.info("A lista de compras está vazia. Os itens selecionados já foram filtrados ou não precisam de compra (ex: itens do RU, arroz, feijão).")
+    else:
+        # Exibe a lista (sempre atualizada com o plano)
+        for item, quantidade in sorted(ingredientes.items()):
+            unidade = unidades.get(item, "unidade(s)")
+            label = f"**{formatar_quantidade(quantidade)} {unidade}** de {item}"
+            st.checkbox(label, key=f"check_{item}")
+
+        # Exportar para PDF: o documento só é gerado quando pedido, e reaproveitado enquanto a lista não mudar
+        data_geracao = datetime.now().strftime('%d/%m/%Y')
+        chave_pdf = hash_lista(lista_compras, data_geracao)
+        if st.button("📄 Preparar PDF da Lista", use_container_width=True):
+            st.session_state.pdf_solicitado = chave_pdf
+
+        if st.session_state.get('pdf_solicitado') == chave_pdf:
+            with medidor.fase("pdf"):
+                pdf_data = pdf_lista_compras(chave_pdf, lista_compras, data_geracao)
             st.download_button(
                 label="📥 Exportar Lista para PDF",
                 data=pdf_data,
                 file_name=f"lista_compras_{datetime.now().strftime('%Y-%m-%d')}.pdf",
                 mime="application/pdf",
+                on_click="ignore",
                 use_container_width=True,
                 type="secondary"
             )
 
+    renderizar_exportacao(lista_compras)
+
+def renderizar_exportacao(lista_compras):
+    """Exporta o plano (ou todo o histórico salvo) e a lista de compras em TXT, CSV, XLSX ou PDF."""
+    with st.popover("📤 Exportar plano e lista", use_container_width=True):
+        formato = st.radio("Formato", list(FORMATOS_EXPORTACAO), horizontal=True, format_func=str.upper, key="formato_exportacao")
+        historico = armazenamento.por_data and st.checkbox("Incluir todo o histórico salvo", key="exportar_historico")
+        if st.button("Preparar arquivo", use_container_width=True):
+            if historico:
+                # Lido do banco em lotes e escrito linha a linha
+                linhas = linhas_selecoes(armazenamento.iterar_selecoes(st.session_state.usuario), catalogo)
+            else:
+                linhas = linhas_plano(
+                    [(st.session_state.usuario, st.session_state.selecoes)], DIAS_SEMANA,
+                    st.session_state.refeicoes_disponiveis, catalogo
+                )
+            # O arquivo só sai da memória para o disco se passar de 8 MB
+            with tempfile.SpooledTemporaryFile(max_size=8 << 20) as arquivo:
+                exportar(formato, [secao_plano(linhas), secao_lista(lista_compras)], arquivo)
+                arquivo.seek(0)
+                dados = arquivo.read()
+            st.download_button(
+                label=f"📥 Baixar {formato.upper()}",
+                data=dados,
+                file_name=f"planner_{datetime.now().strftime('%Y-%m-%d')}.{formato}",
+                mime=FORMATOS_EXPORTACAO[formato][1],
+                on_click="ignore",
+                use_container_width=True,
+            )
+
+def aplicar_plano_gerado(plano):
+    """Copia o plano gerado para as seleções (mantendo o número de pessoas de cada slot)."""
+    for dia, refeicoes in plano.items():
+        for categoria, refeicao in refeicoes.items():
+            selecao = st.session_state.selecoes.setdefault(dia, {}).setdefault(categoria, {})
+            selecao_anterior = (selecao.get('meal'), selecao.get('people'))
+            selecao['meal'] = refeicao
+            selecao.setdefault('people', 1)
+            registrar_selecao(dia, categoria, selecao_anterior)
+    # Os widgets passam a refletir o novo plano
+    for chave in [k for k in st.session_state if k.endswith("_meal")]:
+        del st.session_state[chave]
+    for chave in ('grade_base', 'grade_semana'):
+        st.session_state.pop(chave, None)
+
+@st.fragment
+def painel_gerador():
+    """Gera um plano semanal para a meta de calorias; a prévia é recalculada a cada mudança de restrição."""
+    with medidor.execucao("painel_gerador"):
+        with st.expander("🤖 Gerar plano automático"):
+            cols = st.columns(3)
+            meta = cols[0].number_input("Meta diária (kcal)", min_value=500, max_value=5000, value=1800, step=50, key="gerador_meta")
+            tolerancia = cols[1].number_input("Tolerância (± kcal)", min_value=0, max_value=1000, value=100, step=10, key="gerador_tolerancia")
+            variedade = cols[2].number_input("Sem repetir por (dias)", min_value=1, max_value=7, value=2, step=1, key="gerador_variedade")
+            cols = st.columns(2)
+            sem = cols[0].text_input("Sem ingredientes", key="gerador_sem", placeholder="ex.: whey, frango")
+            opcionais = cols[1].multiselect(
+                "Categorias que podem ficar vazias", list(st.session_state.refeicoes_disponiveis), key="gerador_opcionais"
+            )
+
+            excluir = [t for t in sem.split(",") if t.strip()]
+            permitidas = carregar_indice_ingredientes().filtrar(excluir=excluir) if excluir else None
+            semente = st.session_state.setdefault('gerador_semente', 0)
+            inicio = time.perf_counter()
+            with medidor.fase("gerador_plano"):
+                resultado = st.session_state.gerador_plano.gerar(
+                    DIAS_SEMANA, meta, tolerancia, variedade, permitidas, set(opcionais), semente
+                )
+            duracao_ms = (time.perf_counter() - inicio) * 1000
+
+            # Prévia em tabela markdown (como o painel de macros): o gerador fica no topo da
+            # página e não deve puxar pandas/pyarrow na primeira renderização
+            categorias = list(st.session_state.refeicoes_disponiveis)
+            previa = ["| | " + " | ".join(categorias) + " | kcal |", "|---|" + "---|" * len(categorias) + "---:|"]
+            previa += [
+                f"| {dia} | " + " | ".join(refeicoes.get(c, "").replace("|", "\\|") for c in categorias)
+                + f" | {resultado['kcal'][dia]:.0f} |"
+                for dia, refeicoes in resultado["plano"].items()
+            ]
+            st.markdown("\n".join(previa))
+            st.caption(f"Plano calculado em {duracao_ms:.1f} ms.")
+            if resultado["relaxados"]:
+                st.warning(f"Sem opções suficientes para a variedade pedida em: {', '.join(resultado['relaxados'])} (houve repetição).")
+            if resultado["fora_da_meta"]:
+                st.warning(f"Total de calorias fora da tolerância em: {', '.join(resultado['fora_da_meta'])}.")
+
+            acoes = st.columns(2)
+            if acoes[0].button("🎲 Sortear outro", use_container_width=True):
+                st.session_state.gerador_semente += 1
+                st.rerun(scope="fragment")
+            if acoes[1].button("Aplicar ao planner", use_container_width=True, type="primary"):
+                aplicar_plano_gerado(resultado["plano"])
+                st.toast('Plano automático aplicado! Lembre-se de salvar.', icon='🤖')
+                st.rerun()
+
+@st.fragment
+def painel_planner():
+    """Planner + lista de compras em um fragmento: cada interação reexecuta só este trecho,
+    e só o dia escolhido tem widgets construídos."""
+    with medidor.execucao("painel_planner"):
+        main_cols = st.columns([2, 1.5]) 
+
+        with main_cols[0]:
+            st.subheader("🗓️ Seu Plano Semanal")
+            if st.toggle("Modo compacto (semana inteira em uma grade)", key="modo_compacto"):
+                dia = None
+                with medidor.fase("grade_compacta"):
+                    renderizar_grade_compacta()
+            else:
+                st.session_state.pop('grade_base', None)
+                dia = st.radio(
+                    "Dia", DIAS_SEMANA, index=datetime.now().weekday(), horizontal=True,
+                    key="dia_aberto", label_visibility="collapsed"
+                )
+                with st.container(border=True):
+                    st.markdown(f"### {dia}")
+                    with medidor.fase("renderizar_dia"):
+                        renderizar_dia(dia)
+
+        with main_cols[1]:
+            with medidor.fase("lista_compras"):
+                renderizar_lista_compras()
+
+        with medidor.fase("macros"):
+            renderizar_macros(dia)
+        autosalvar()
+
+painel_gerador()
+painel_planner()
+
+# --- HISTÓRICO DE HIDRATAÇÃO ---
+with st.expander("💧 Histórico de Hidratação"):
+    origem, mascaras = obter_hidratacao().serie(st.session_state.usuario)
+    hoje = datetime.now().date()
+    semanas, medias = medias_semanais(origem, mascaras, hoje)
+    if not semanas:
+        st.info("Nenhum copo registrado até hoje.")
     else:
-        st.info("Clique em 'Gerar Lista de Compras' na barra lateral para ver seus ingredientes.")
\ No newline at end of file
+        atual, recorde = sequencias(origem, mascaras, hoje)
+        dias = (hoje - origem).days + 1
+        st.caption(
+            f"Média geral: {litros(mascaras[:dias]).sum() / dias:.2f} L/dia desde {origem.strftime('%d/%m/%Y')} · "
+            f"dias seguidos na meta: {atual} (recorde: {recorde})"
+        )
+        # O gráfico (pandas + altair) só é montado quando pedido, não em toda renderização
+        if st.toggle("Mostrar gráfico semanal", key="grafico_hidratacao"):
+            import pandas as pd
+
+            st.bar_chart(pd.DataFrame({"litros_media_diaria": medias}, index=pd.to_datetime(semanas)))
+
+# --- HISTÓRICO DE CALORIAS (apenas com armazenamento por data) ---
+if armazenamento.por_data:
+    st.markdown("---")
+    with st.expander("📊 Histórico de Calorias"):
+        if st.button("Atualizar histórico"):
+            from analise import exportar_historico
+
+            # O Parquet guarda todos os usuários; cada sessão filtra o seu no rollup
+            linhas = exportar_historico(armazenamento, HISTORICO_FILE)
+            st.toast(f'Histórico atualizado ({linhas} registros).', icon='📊')
+
+        if not os.path.exists(HISTORICO_FILE):
+            st.info("Clique em 'Atualizar histórico' para gerar o histórico a partir dos planos salvos.")
+        # A análise (pandas + pyarrow) só é carregada quando pedida
+        elif st.toggle("Mostrar análise", key="analise_historico"):
+            periodo = st.radio("Agrupar por", ["dia", "semana", "mes"], horizontal=True,
+                               format_func=lambda p: {"dia": "Dia", "semana": "Semana", "mes": "Mês"}[p])
+            rollup = rollup_historico(HISTORICO_FILE, os.path.getmtime(HISTORICO_FILE), periodo, st.session_state.usuario)
+            if rollup.empty:
+                st.info("Nenhuma refeição registrada no histórico.")
+            else:
+                st.line_chart(rollup[["kcal_media_diaria"]])
+                dias = rollup["dias"].sum()
+                macros = " · ".join(f"{ROTULOS_NUTRIENTES[n]}: {rollup[n].sum() / dias:.0f}" for n in NUTRIENTES[1:])
+                st.caption(f"Média geral: {rollup['kcal_media_diaria'].mean():.0f} kcal/dia · {macros} (por pessoa)")
+
+autosalvar()
+medidor.finalizar()
+
+# --- PAINEL DE DESEMPENHO (apenas com PLANNER_TEMPOS=1) ---
+if medidor.ativo and medidor.execucoes:
+    with st.sidebar.expander("⏱️ Tempos por execução"):
+        # Os módulos pesados são listados antes de o próprio painel importar o pandas
+        carregados = modulos_carregados()
+        import pandas as pd
+
+        resumo = pd.DataFrame(medidor.resumo()).T[["p50", "p95", "ultima", "n"]]
+        st.dataframe(resumo.sort_values("p95", ascending=False).round(1), use_container_width=True)
+        st.caption(f"Em ms, últimas {len(medidor.execucoes)} execuções. Log: {os.path.relpath(TEMPOS_LOG_FILE, BASE_DIR)}")
+        st.caption(f"Módulos pesados já carregados: {', '.join(carregados) or 'nenhum'}. "
+                   f"Perfil de inicialização: python benchmarks/inicializacao.py")